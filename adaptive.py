@@ -0,0 +1,195 @@
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import threading
+from progress_stats import question_key
+
+# Computerized adaptive testing (CAT) under the Rasch model.
+# Each question has one difficulty b (logits), precomputed into data/week_N_items.json beside
+# the bank. The ability estimate is the EAP over a fixed quadrature grid with a standard-normal
+# prior; the log-posterior is updated in O(grid) per answer. Under Rasch an item is most
+# informative when b is closest to the current ability, so the next item is found by bisecting
+# a difficulty-sorted index (O(log n)) and picking at random among the nearest unused items,
+# which keeps every student from seeing the same sequence.
+
+GRID = [-4.0 + 0.2 * i for i in range(41)]
+MIN_ITEMS = 5
+MAX_ITEMS = 15
+TARGET_SE = 0.5 # Stop once the posterior standard deviation falls below this
+EXPOSURE_CANDIDATES = 3 # Next item is drawn from this many nearest-difficulty unused items
+MIN_ANSWERS_FOR_CALIBRATION = 30
+MAX_ABS_DIFFICULTY = 4.0
+
+def probability_correct(theta, b):
+    return 1.0 / (1.0 + math.exp(b - theta))
+
+# Log weights are rounded to 4 decimals: they live in the session cookie between answers
+def prior_log_posterior():
+    """Standard-normal prior over GRID (unnormalised log weights)."""
+    return [round(-0.5 * t * t, 4) for t in GRID]
+
+def update_log_posterior(log_post, b, correct):
+    """Folds one scored response into the log-posterior (returns a new list)."""
+    out = []
+    for lp, t in zip(log_post, GRID):
+        p = probability_correct(t, b)
+        out.append(lp + math.log(p if correct else 1.0 - p))
+    peak = max(out) # Re-centre so the values stay short however many answers are folded in
+    return [round(v - peak, 4) for v in out]
+
+def estimate(log_post):
+    """Returns (theta, standard error) as the posterior mean and standard deviation."""
+    peak = max(log_post)
+    weights = [math.exp(lp - peak) for lp in log_post]
+    total = sum(weights)
+    theta = sum(w * t for w, t in zip(weights, GRID)) / total
+    variance = sum(w * (t - theta) ** 2 for w, t in zip(weights, GRID)) / total
+    return theta, math.sqrt(variance)
+
+def difficulty_from_p(p):
+    """Rasch difficulty from a proportion correct, clipped to +/- MAX_ABS_DIFFICULTY."""
+    p = min(max(p, 0.01), 0.99)
+    return max(-MAX_ABS_DIFFICULTY, min(MAX_ABS_DIFFICULTY, math.log((1 - p) / p)))
+
+class ItemIndex:
+    """Questions of one course week sorted by difficulty, for nearest-difficulty lookups."""
+
+    def __init__(self, questions, difficulties):
+        items = [(difficulties.get(q['question_number'], 0.0), q['question_number'])
+                 for q in questions if q.get('question_number') is not None]
+        # Shuffle before the (stable) sort so equal difficulties - e.g. an uncalibrated bank,
+        # where every b is 0 - are not always served in question-number order
+        random.shuffle(items)
+        items.sort(key=lambda item: item[0])
+        self.difficulties = [b for b, _ in items]
+        self.numbers = [n for _, n in items]
+        self.difficulty_of = {n: b for b, n in items}
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def next_item(self, theta, used, rng=random):
+        """
+        Question number of an unused item with difficulty nearest theta, or None when all are used.
+        Bisects to theta, then walks outwards collecting up to EXPOSURE_CANDIDATES unused items.
+        """
+        hi = bisect.bisect_left(self.difficulties, theta)
+        lo = hi - 1
+        candidates = []
+        while len(candidates) < EXPOSURE_CANDIDATES and (lo >= 0 or hi < len(self.numbers)):
+            take_hi = lo < 0 or (hi < len(self.numbers) and
+                                 self.difficulties[hi] - theta <= theta - self.difficulties[lo])
+            if take_hi:
+                number = self.numbers[hi]; hi += 1
+            else:
+                number = self.numbers[lo]; lo -= 1
+            if number not in used:
+                candidates.append(number)
+        return rng.choice(candidates) if candidates else None
+
+def find_question(questions, number):
+    """Question with the given number from a bank sorted by question_number (O(log n))."""
+    lo, hi = 0, len(questions)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if questions[mid].get('question_number', float('inf')) < number:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo < len(questions) and questions[lo].get('question_number') == number:
+        return questions[lo]
+    return None
+
+def should_stop(answered, se, available):
+    if answered >= available or answered >= MAX_ITEMS:
+        return True
+    return answered >= MIN_ITEMS and se <= TARGET_SE
+
+# --- Item parameter files ---
+def items_path(course, week_number):
+    return os.path.join(course.data_dir, f"week_{week_number}_items.json")
+
+def load_difficulties(path):
+    """{question_number: b} from an items file; empty when there is none (every b is then 0)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {int(n): item['b'] for n, item in data.get('items', {}).items()}
+
+_index_lock = threading.Lock()
+_indexes = {} # (course slug, week) -> ((bank mtime, items mtime), ItemIndex)
+
+def _mtime(path):
+    try: return os.stat(path).st_mtime
+    except OSError: return None
+
+def get_item_index(course, week_number, questions):
+    """
+    Builds (or reuses) the sorted index for a week; rebuilt when the bank or items file changes.
+    The index holds only numbers and difficulties, never the bank itself, so it does not pin
+    banks the question-bank LRU has evicted.
+    """
+    path = items_path(course, week_number)
+    version = (_mtime(course.questions_path(week_number)), _mtime(path))
+    key = (course.slug, week_number)
+    with _index_lock:
+        cached = _indexes.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+    index = ItemIndex(questions, load_difficulties(path))
+    with _index_lock:
+        _indexes[key] = (version, index)
+    return index
+
+def calibrate_week(course, week_number, questions, analytics_rows):
+    """
+    Writes week_N_items.json from question analytics (proportion correct -> Rasch b).
+    Questions with fewer than MIN_ANSWERS_FOR_CALIBRATION answers get b = 0.
+
+    Returns:
+        int: Number of questions calibrated from data.
+    """
+    by_key = {row.question_key: row for row in analytics_rows}
+    items = {}
+    calibrated = 0
+    for q in questions:
+        if q.get('question_number') is None:
+            continue
+        row = by_key.get(question_key(q.get('question')))
+        if row is not None and row.n_answers >= MIN_ANSWERS_FOR_CALIBRATION and row.difficulty is not None:
+            items[str(q['question_number'])] = {"b": round(difficulty_from_p(row.difficulty), 3), "n": row.n_answers}
+            calibrated += 1
+        else:
+            items[str(q['question_number'])] = {"b": 0.0, "n": row.n_answers if row is not None else 0}
+    path = items_path(course, week_number)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"model": "rasch", "items": items}, f, indent=2)
+    os.replace(tmp_path, path)
+    return calibrated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate adaptive-testing item difficulties from question analytics.")
+    parser.add_argument('--course', help="Course slug (default: the default course).")
+    parser.add_argument('--weeks', type=int, nargs='+', help="Weeks to calibrate (default: all available).")
+    args = parser.parse_args()
+
+    from app import app
+    from models import QuestionAnalytics
+    with app.app_context():
+        registry = app.extensions['courses']
+        course = registry.get(args.course)
+        if course is None:
+            parser.error(f"Unknown course '{args.course}'")
+        for week in args.weeks or course.available_weeks():
+            questions = registry.load_questions(course, week)
+            if not questions:
+                print(f"Week {week}: no question bank, skipped.")
+                continue
+            rows = QuestionAnalytics.query.filter_by(course_slug=course.slug, week_number=week).all()
+            calibrated = calibrate_week(course, week, questions, rows)
+            print(f"Week {week}: {calibrated}/{len(questions)} questions calibrated -> {items_path(course, week)}")
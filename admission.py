@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, jsonify, request, session
+from instrumentation import metrics
+
+# Admission control for exam-time bursts.
+# Each session gets a token bucket on the quiz API endpoints, so one client retrying in a loop
+# cannot crowd out the rest (429 + Retry-After). Endpoints that write attempts additionally
+# pass a per-process gate: at most WRITE_CONCURRENCY run at once, up to WRITE_QUEUE_SIZE more
+# wait briefly, and anything beyond that is turned away at once with 503 + Retry-After instead
+# of queueing on SQLite's single writer lock. Admitted requests therefore wait at most
+# WRITE_QUEUE_TIMEOUT before they start, however large the burst.
+# Limits are per process: with N gunicorn workers, N * WRITE_CONCURRENCY writers can be active.
+
+logger = logging.getLogger(__name__)
+
+# Sized for one student: an adaptive quiz is up to 16 quick requests (start + 15 answers),
+# and a retry after a slow submit should not tip it over
+DEFAULT_RATE_PER_SECOND = 5.0
+DEFAULT_BURST = 30
+DEFAULT_WRITE_CONCURRENCY = 2
+DEFAULT_WRITE_QUEUE_SIZE = 16
+DEFAULT_WRITE_QUEUE_TIMEOUT = 2.0 # Seconds
+MAX_TRACKED_SESSIONS = 10000 # Least recently seen buckets are dropped beyond this
+
+RATE_LIMITED_ENDPOINTS = frozenset(('main.get_quiz_questions', 'main.submit_quiz',
+                                    'main.adaptive_start', 'main.adaptive_answer'))
+WRITE_ENDPOINTS = frozenset(('main.submit_quiz', 'main.adaptive_answer'))
+
+metrics.describe('quiz_admission_rejected_total', 'counter', "Requests turned away by admission control, by reason.")
+metrics.describe('quiz_admission_queued_total', 'counter', "Write requests that waited for a free slot.")
+metrics.describe('quiz_admission_queue_wait_seconds', 'histogram', "Time write requests spent waiting for a slot.")
+metrics.describe('quiz_admission_writes_in_flight', 'gauge', "Write requests currently holding a slot.")
+
+class TokenBuckets:
+    """Token bucket per key: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate, burst, max_keys=MAX_TRACKED_SESSIONS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict() # key -> (tokens, last refill time)
+        self._lock = threading.Lock()
+
+    def take(self, key, now=None):
+        """Takes one token. Returns 0.0 if admitted, else the seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            wait = 0.0
+            if tokens >= 1.0:
+                tokens -= 1.0
+            else:
+                wait = (1.0 - tokens) / self.rate
+            self._buckets[key] = (tokens, now) # Re-inserted at the most recently used end
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+class WriteGate:
+    """Bounded concurrency with a short, bounded wait queue."""
+
+    def __init__(self, limit, queue_size, timeout):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Returns (admitted, reason, seconds waited); reason is 'queue_full' or 'queue_timeout' when refused."""
+        with self._cond:
+            if self.in_flight < self.limit and not self.waiting:
+                self.in_flight += 1
+                return True, None, 0.0
+            if self.waiting >= self.queue_size:
+                return False, 'queue_full', 0.0
+            self.waiting += 1
+            started = time.monotonic()
+            deadline = started + self.timeout
+            try:
+                while self.in_flight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False, 'queue_timeout', time.monotonic() - started
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                return True, None, time.monotonic() - started
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+class AsyncWriteGate:
+    """WriteGate for the async serving mode (asgi.py): same limits, but waiters do not hold a thread."""
+
+    def __init__(self, limit, queue_size, timeout):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(limit)
+
+    async def acquire(self):
+        """Same contract as WriteGate.acquire()."""
+        if self.in_flight < self.limit and not self.waiting:
+            await self._slots.acquire() # A slot is free, so this does not suspend
+            self.in_flight += 1
+            return True, None, 0.0
+        if self.waiting >= self.queue_size:
+            return False, 'queue_full', 0.0
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            return False, 'queue_timeout', time.monotonic() - started
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return True, None, time.monotonic() - started
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+def rejection(status, reason, endpoint, retry_after):
+    """Counts a rejection; returns the (JSON body, headers) of its 429/503 response."""
+    metrics.inc('quiz_admission_rejected_total', {"reason": reason, "endpoint": endpoint})
+    retry_after = max(1, math.ceil(retry_after))
+    message = "Too many requests, slow down." if status == 429 else "Server busy, please retry shortly."
+    return {"error": message, "retry_after": retry_after}, {"Retry-After": str(retry_after)}
+
+def bucket_key(sid, remote_addr):
+    return f"sid:{sid}" if sid else f"addr:{remote_addr}"
+
+def _reject(status, reason, retry_after):
+    body, headers = rejection(status, reason, request.endpoint, retry_after)
+    response = jsonify(body)
+    response.status_code = status
+    response.headers.update(headers)
+    return response
+
+def init_admission(app):
+    """
+    Installs admission control on the app, configured from ADMISSION_ENABLED, RATE_LIMIT_PER_SECOND,
+    RATE_LIMIT_BURST, WRITE_CONCURRENCY, WRITE_QUEUE_SIZE and WRITE_QUEUE_TIMEOUT.
+    Register it after the blueprints so it runs after their before_request hooks.
+    """
+    if not app.config.get('ADMISSION_ENABLED', True):
+        return
+    app.extensions['admission'] = {
+        "buckets": TokenBuckets(app.config.get('RATE_LIMIT_PER_SECOND', DEFAULT_RATE_PER_SECOND),
+                                app.config.get('RATE_LIMIT_BURST', DEFAULT_BURST)),
+        "gate": WriteGate(app.config.get('WRITE_CONCURRENCY', DEFAULT_WRITE_CONCURRENCY),
+                          app.config.get('WRITE_QUEUE_SIZE', DEFAULT_WRITE_QUEUE_SIZE),
+                          app.config.get('WRITE_QUEUE_TIMEOUT', DEFAULT_WRITE_QUEUE_TIMEOUT)),
+    }
+    app.before_request(_admit)
+    app.teardown_request(_release)
+
+def _admit():
+    endpoint = request.endpoint
+    if endpoint == 'static':
+        return None
+    # A random id in the session cookie identifies the session. It is handed out on the first
+    # page load, so a client that does not send cookies back is bucketed by address instead and
+    # cannot reset its bucket by dropping the cookie.
+    sid = session.get('sid')
+    if sid is None:
+        session['sid'] = secrets.token_hex(8)
+    if endpoint not in RATE_LIMITED_ENDPOINTS:
+        return None
+    admission = current_app.extensions['admission']
+    state = g._admission = {}
+    wait = admission['buckets'].take(bucket_key(sid, request.remote_addr))
+    if wait:
+        return _reject(429, 'rate_limited', wait)
+    if endpoint in WRITE_ENDPOINTS:
+        gate = admission['gate']
+        admitted, reason, waited = gate.acquire()
+        if waited:
+            metrics.inc('quiz_admission_queued_total', {"endpoint": endpoint})
+            metrics.observe('quiz_admission_queue_wait_seconds', waited)
+        if not admitted:
+            logger.warning("admission_rejected", extra={"endpoint": endpoint, "reason": reason,
+                                                        "in_flight": gate.in_flight, "waiting": gate.waiting})
+            return _reject(503, reason, gate.timeout)
+        state['gate'] = gate
+        metrics.set_gauge('quiz_admission_writes_in_flight', gate.in_flight)
+    return None
+
+def _release(exc):
+    state = g.pop('_admission', None)
+    gate = state.get('gate') if state else None
+    if gate is not None:
+        gate.release()
+        metrics.set_gauge('quiz_admission_writes_in_flight', gate.in_flight)
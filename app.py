@@ -1,10 +1,20 @@
 # app.py (Complete - Including Notes Route)
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, g, send_from_directory # Added send_from_directory
-from database import init_app, db
-from models import User, QuizAttempt, AnswerLog # Assuming User model WITHOUT password hash/methods now
+from flask import Flask, Blueprint, current_app, render_template, request, jsonify, redirect, url_for, session, flash, g, send_from_directory, abort, Response, stream_with_context # Added send_from_directory
+from database import init_app, create_schema, db
+from models import User, QuizAttempt, AnswerLog, DEFAULT_COURSE_SLUG # Assuming User model WITHOUT password hash/methods now
+from progress_stats import record_attempt_stats, get_week_summary, get_question_stats
+from instrumentation import init_instrumentation, timed
+from grading import grade_submission, correct_option_index
+import adaptive
+from courses import Course, init_courses, DEFAULT_CACHE_BYTES
+from assets import init_assets
+import leaderboard
+import attempt_review
+import admission
 import os
 import json
 import random
+import logging
 from datetime import datetime
 # Removed werkzeug imports if not using auth
 from functools import wraps # Still needed if keeping login_required temporarily
@@ -19,39 +29,102 @@ WEEKLY_NOTES_DIR = os.path.join(BASE_DIR, 'weekly_pdfs') # Assumes 'weekly_pdfs'
 # --- End New ---
 TOTAL_WEEKS = 12
 QUESTIONS_PER_QUIZ = 10
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'default_secret_key_please_change')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DATABASE_PATH}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-# --- NEW: Store notes dir in app config ---
-app.config['WEEKLY_NOTES_DIR'] = WEEKLY_NOTES_DIR
-# --- End New ---
-
-
-# Initialize Database
-init_app(app)
+# Additional courses are listed in courses.json (see README); this one is always registered
+COURSES_FILE = os.path.join(BASE_DIR, 'courses.json')
+DEFAULT_COURSE = Course(DEFAULT_COURSE_SLUG, 'Conservation Economics', PARSED_DATA_DIR, WEEKLY_NOTES_DIR, TOTAL_WEEKS)
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('main', __name__)
+
+# --- Application Factory ---
+def create_app(config=None):
+    """
+    Builds the Flask app.
+
+    Schema creation and the question-bank warm-up happen here, so under
+    `gunicorn --preload` (see gunicorn.conf.py) they run once in the master and the
+    warmed bank is shared copy-on-write by every forked worker.
+
+    Args:
+        config (dict, optional): Overrides applied on top of the defaults/environment.
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'default_secret_key_please_change')
+    # DATABASE_URL overrides the bundled SQLite file (e.g. MySQL on PythonAnywhere, or a scratch DB for load tests)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f'sqlite:///{DATABASE_PATH}')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # --- NEW: Store notes dir in app config ---
+    app.config['WEEKLY_NOTES_DIR'] = WEEKLY_NOTES_DIR
+    # --- End New ---
+    # Request/DB/section metrics on a local /metrics endpoint (set QUIZ_METRICS_ENABLED=0 to turn off)
+    app.config['METRICS_ENABLED'] = os.environ.get('QUIZ_METRICS_ENABLED', '1') != '0'
+    # Set QUIZ_CREATE_SCHEMA=0 when the schema is managed elsewhere (e.g. created once before deploy)
+    app.config['CREATE_SCHEMA'] = os.environ.get('QUIZ_CREATE_SCHEMA', '1') != '0'
+    app.config['WARM_QUESTION_BANK'] = os.environ.get('QUIZ_WARM_QUESTION_BANK', '1') != '0'
+    app.config['COURSES_FILE'] = os.environ.get('QUIZ_COURSES_FILE', COURSES_FILE)
+    # Upper bound on parsed question banks held per process, across all courses
+    app.config['QUESTION_BANK_CACHE_BYTES'] = int(os.environ.get('QUIZ_QUESTION_BANK_CACHE_BYTES', DEFAULT_CACHE_BYTES))
+    # Seconds a worker reuses a leaderboard's top entries before re-reading them
+    app.config['LEADERBOARD_CACHE_SECONDS'] = float(os.environ.get('QUIZ_LEADERBOARD_CACHE_SECONDS', leaderboard.DEFAULT_CACHE_SECONDS))
+    # Per-session rate limit on the quiz API, and a bounded write queue per process (see admission.py)
+    app.config['ADMISSION_ENABLED'] = os.environ.get('QUIZ_ADMISSION_ENABLED', '1') != '0'
+    app.config['RATE_LIMIT_PER_SECOND'] = float(os.environ.get('QUIZ_RATE_LIMIT_PER_SECOND', admission.DEFAULT_RATE_PER_SECOND))
+    app.config['RATE_LIMIT_BURST'] = int(os.environ.get('QUIZ_RATE_LIMIT_BURST', admission.DEFAULT_BURST))
+    app.config['WRITE_CONCURRENCY'] = int(os.environ.get('QUIZ_WRITE_CONCURRENCY', admission.DEFAULT_WRITE_CONCURRENCY))
+    app.config['WRITE_QUEUE_SIZE'] = int(os.environ.get('QUIZ_WRITE_QUEUE_SIZE', admission.DEFAULT_WRITE_QUEUE_SIZE))
+    app.config['WRITE_QUEUE_TIMEOUT'] = float(os.environ.get('QUIZ_WRITE_QUEUE_TIMEOUT', admission.DEFAULT_WRITE_QUEUE_TIMEOUT))
+    # Serve the hashed, precompressed copies from build_assets.py when static/dist/ has been built
+    app.config['STATIC_FINGERPRINTS'] = os.environ.get('QUIZ_STATIC_FINGERPRINTS', '1') != '0'
+    if config:
+        app.config.update(config)
+
+    # Initialize Database
+    init_app(app)
+    if app.config['CREATE_SCHEMA']:
+        create_schema(app)
+    init_instrumentation(app)
+    init_courses(app, DEFAULT_COURSE)
+    app.register_blueprint(bp)
+    admission.init_admission(app) # After the blueprint's hooks (test user login)
+    init_assets(app)
+    if app.config['WARM_QUESTION_BANK']:
+        with app.app_context():
+            warm_question_bank()
+    return app
 
 # --- Helper to Load Questions ---
-def load_questions_for_week(week_number):
-    json_path = os.path.join(PARSED_DATA_DIR, f"week_{week_number}_questions.json")
-    if not os.path.exists(json_path):
-        print(f"Error: JSON file not found for week {week_number} at {json_path}")
-        return None
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            questions = json.load(f)
-        questions.sort(key=lambda x: x.get('question_number', float('inf')))
-        return questions
-    except Exception as e:
-        print(f"Error loading or parsing JSON for week {week_number}: {e}")
-        return None
+# Banks live in the course registry's shared LRU (courses.py), loaded on first access and
+# invalidated when the JSON file changes. Callers must treat the returned list as read-only.
+def get_course(slug=None):
+    """Returns the registered Course for a slug (default course when None), or None."""
+    return current_app.extensions['courses'].get(slug)
+
+def load_questions_for_week(week_number, course=None):
+    registry = current_app.extensions['courses']
+    return registry.load_questions(course or registry.default, week_number)
+
+def warm_question_bank():
+    """
+    Loads the default course's weeks into the cache (before forking workers).
+    Other courses stay lazy so start-up cost and memory do not grow with the registry.
+    """
+    course = current_app.extensions['courses'].default
+    loaded = 0
+    for week in course.available_weeks():
+        if load_questions_for_week(week, course) is not None:
+            loaded += 1
+    logger.info("question_bank_warmed", extra={"course": course.slug, "weeks": loaded})
+    return loaded
 
 # --- Authentication Logic / User Handling ---
 
 # Revert back to simple 'testuser' logic as requested
-@app.before_request
+@bp.before_app_request
 def before_request():
+    # Static files need no user (and must not touch the session, or they would get Vary: Cookie)
+    if request.endpoint == 'static':
+        return
     if 'user_id' not in session:
         user = User.query.filter_by(username='testuser').first()
         if not user:
@@ -61,86 +134,105 @@ def before_request():
             # from werkzeug.security import generate_password_hash
             # user.password_hash = generate_password_hash("testpassword")
             try:
-                 with app.app_context(): # Ensure context if needed
-                      db.session.add(user)
-                      db.session.commit()
-                      print(f"Test user created.")
-                      user = User.query.filter_by(username='testuser').first() # Re-fetch
+                 db.session.add(user)
+                 db.session.commit()
+                 logger.info("test_user_created")
+                 user = User.query.filter_by(username='testuser').first() # Re-fetch
             except Exception as e:
                  db.session.rollback()
-                 print(f"Error creating test user: {e}")
+                 logger.error("test_user_create_failed", extra={"error": str(e)})
                  user = None # Ensure user is None if creation failed
 
         if user:
             session['user_id'] = user.id
             session['username'] = user.username
         else:
-             print("Error: Could not find or create test user in before_request.")
+             logger.error("test_user_unavailable")
              # flash("Error setting up user session.", "error") # Careful with flash here
 
-@app.context_processor
+@bp.app_context_processor
 def inject_now():
     return {'now': datetime.utcnow()}
 
 # --- Routes ---
-@app.route('/')
-def index():
-    available_weeks = []
-    for i in range(1, TOTAL_WEEKS + 1):
-        if os.path.exists(os.path.join(PARSED_DATA_DIR, f"week_{i}_questions.json")):
-             available_weeks.append(i)
+# Every course-scoped page is reachable at its original URL (default course) and under
+# /course/<slug>/..., so existing links keep working.
+@bp.route('/', defaults={'slug': DEFAULT_COURSE_SLUG})
+@bp.route('/course/<slug>/')
+def index(slug):
+    course = get_course(slug)
+    if course is None: abort(404)
     # Pass username from session for the simple version
-    return render_template('index.html', total_weeks=TOTAL_WEEKS, available_weeks=available_weeks)
+    return render_template('index.html', course=course, courses=current_app.extensions['courses'].all(),
+                           total_weeks=course.total_weeks, available_weeks=course.available_weeks())
 
 # --- NEW ROUTE FOR VIEWING NOTES ---
-@app.route('/notes/<int:week_number>')
-def view_notes(week_number):
+@bp.route('/notes/<int:week_number>', defaults={'slug': DEFAULT_COURSE_SLUG})
+@bp.route('/course/<slug>/notes/<int:week_number>')
+def view_notes(slug, week_number):
     # You might want to add @login_required back here if notes shouldn't be public
-    if not (1 <= week_number <= TOTAL_WEEKS):
+    course = get_course(slug)
+    if course is None: abort(404)
+    if not course.has_week(week_number):
         flash("Invalid week number for notes.", "error")
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index', slug=course.slug))
 
-    filename = f"week_{week_number}.pdf" # Assuming original weekly PDFs are named this way
-    notes_directory = app.config['WEEKLY_NOTES_DIR']
+    filename = course.notes_filename(week_number) # Assuming original weekly PDFs are named this way
+    # The default course's notes dir stays overridable through app config
+    notes_directory = current_app.config['WEEKLY_NOTES_DIR'] if course.slug == DEFAULT_COURSE_SLUG else course.notes_dir
 
     # Check if the weekly_pdfs directory and the specific file exist
     if not os.path.isdir(notes_directory) or \
        not os.path.exists(os.path.join(notes_directory, filename)):
            flash(f"Notes PDF not found for Week {week_number}. Ensure 'weekly_pdfs' folder exists and contains the file.", "error")
-           return redirect(url_for('index'))
+           return redirect(url_for('main.index', slug=course.slug))
 
     try:
         # Serve the PDF file securely; as_attachment=False tries to display inline
         return send_from_directory(notes_directory, filename, as_attachment=False)
     except FileNotFoundError:
          flash(f"Notes PDF file could not be sent for Week {week_number}.", "error")
-         return redirect(url_for('index'))
+         return redirect(url_for('main.index', slug=course.slug))
     except Exception as e:
-         print(f"Error sending file {filename}: {e}")
+         logger.error("notes_send_failed", extra={"course": course.slug, "file": filename, "error": str(e)})
          flash("An error occurred while retrieving the notes.", "error")
-         return redirect(url_for('index'))
+         return redirect(url_for('main.index', slug=course.slug))
 # --- END NEW ROUTE ---
 
 
-@app.route('/quiz/<int:week_number>')
+@bp.route('/quiz/<int:week_number>', defaults={'slug': DEFAULT_COURSE_SLUG})
+@bp.route('/course/<slug>/quiz/<int:week_number>')
 # Add @login_required back if needed
-def quiz_page(week_number):
-    if not (1 <= week_number <= TOTAL_WEEKS):
+def quiz_page(slug, week_number):
+    course = get_course(slug)
+    if course is None: abort(404)
+    if not course.has_week(week_number):
         flash("Invalid week number.", "error")
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index', slug=course.slug))
 
-    questions = load_questions_for_week(week_number)
+    questions = load_questions_for_week(week_number, course)
     if questions is None:
         flash(f"Could not load questions for Week {week_number}.", "error")
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index', slug=course.slug))
     if len(questions) < QUESTIONS_PER_QUIZ:
         flash(f"Not enough questions available for Week {week_number}.", "warning")
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index', slug=course.slug))
+
+    return render_template('quiz.html', course=course, week_number=week_number)
 
-    return render_template('quiz.html', week_number=week_number)
+
+@bp.route('/adaptive/<int:week_number>', defaults={'slug': DEFAULT_COURSE_SLUG})
+@bp.route('/course/<slug>/adaptive/<int:week_number>')
+def adaptive_page(slug, week_number):
+    course = get_course(slug)
+    if course is None: abort(404)
+    if not course.has_week(week_number) or not load_questions_for_week(week_number, course):
+        flash(f"Could not load questions for Week {week_number}.", "error")
+        return redirect(url_for('main.index', slug=course.slug))
+    return render_template('adaptive.html', course=course, week_number=week_number)
 
 
-@app.route('/progress')
+@bp.route('/progress')
 # Add @login_required back if needed
 def progress_page():
      username = session.get('username', 'Test User')
@@ -148,28 +240,69 @@ def progress_page():
 
 
 # --- API Endpoints ---
-@app.route('/api/quiz/<int:week_number>', methods=['GET'])
+def quiz_session_key(course_slug, week_number):
+    # The default course keeps its original key so quizzes in flight survive a deploy
+    if course_slug == DEFAULT_COURSE_SLUG:
+        return f'quiz_week_{week_number}_questions'
+    return f'quiz_{course_slug}_week_{week_number}_questions'
+
+@bp.route('/api/quiz/<int:week_number>', methods=['GET'], defaults={'slug': DEFAULT_COURSE_SLUG})
+@bp.route('/api/course/<slug>/quiz/<int:week_number>', methods=['GET'])
 # Add @login_required back if needed
-def get_quiz_questions(week_number):
+def get_quiz_questions(slug, week_number):
+    course = get_course(slug)
+    if course is None: return jsonify({"error": "Unknown course"}), 404
     # Use simple session key if reverted from multi-user auth
-    session_key = f'quiz_week_{week_number}_questions'
+    session_key = quiz_session_key(course.slug, week_number)
 
-    if not (1 <= week_number <= TOTAL_WEEKS): return jsonify({"error": "Invalid week number"}), 400
-    all_week_questions = load_questions_for_week(week_number)
+    if not course.has_week(week_number): return jsonify({"error": "Invalid week number"}), 400
+    all_week_questions = load_questions_for_week(week_number, course)
     if all_week_questions is None: return jsonify({"error": f"Could not load questions file."}), 500
     if len(all_week_questions) < QUESTIONS_PER_QUIZ: return jsonify({"error": f"Not enough questions available."}), 500
-    try: selected_mcqs = random.sample(all_week_questions, QUESTIONS_PER_QUIZ)
+    try:
+        with timed('sampling'): selected_mcqs = random.sample(all_week_questions, QUESTIONS_PER_QUIZ)
     except ValueError: return jsonify({"error": "Sampling error."}), 500
 
     session[session_key] = selected_mcqs
+    return jsonify(frontend_questions(selected_mcqs))
+
+def frontend_questions(selected_mcqs):
+    """The served questions as the browser sees them: ids q_0, q_1, ... and no answers."""
+    return [{"id": f"q_{i}", "question": mcq.get("question", "N/A"), "options": mcq.get("options", [])}
+            for i, mcq in enumerate(selected_mcqs)]
+
+def save_attempt(user_id, course, week_number, score, total_questions, results_log, ability=None):
+    """
+    Saves a graded attempt, its answers and the progress aggregates in one transaction.
+    Returns an error message for the client, or None when saved (or when there is no user).
+    """
+    if not user_id:
+        logger.warning("attempt_not_saved_no_user", extra={"week": week_number})
+        return None
+    try:
+        attempt = QuizAttempt( user_id=user_id, course_slug=course.slug, week_number=week_number, score=score,
+            total_questions=total_questions, timestamp=datetime.utcnow(), ability=ability )
+        db.session.add(attempt); db.session.flush()
+        # Aggregates are updated in the same transaction as the attempt itself
+        record_attempt_stats(user_id, week_number, score, total_questions, results_log, attempt.timestamp, course.slug,
+                             adaptive=attempt.is_adaptive)
+        for item in results_log: # Use detailed log for DB saving
+            answer = AnswerLog(
+                attempt_id=attempt.id,
+                question_text=item["question_text"],
+                options_text=json.dumps(item["options"]), # Save options as JSON string
+                selected_option_index=item["selected_option_index"],
+                correct_option_index=item["correct_option_index"],
+                is_correct=item["is_correct"] )
+            db.session.add(answer)
+        db.session.commit();
+        logger.info("attempt_saved", extra={"user_id": user_id, "course": course.slug, "week": week_number, "score": score})
+        return None
+    except Exception as e:
+         db.session.rollback(); logger.error("attempt_save_failed", extra={"user_id": user_id, "week": week_number, "error": str(e)})
+         return "Error saving results."
 
-    frontend_mcqs = []
-    for i, mcq in enumerate(selected_mcqs):
-         frontend_mcqs.append({
-            "id": f"q_{i}", "question": mcq.get("question", "N/A"),
-            "options": mcq.get("options", []) })
-    return jsonify(frontend_mcqs)
-@app.route('/api/submit', methods=['POST'])
+@bp.route('/api/submit', methods=['POST'])
 # Add @login_required back if using authentication
 def submit_quiz():
     # Get user_id if using authentication, otherwise handle testuser
@@ -180,12 +313,14 @@ def submit_quiz():
 
     week_number = data.get('week_number')
     answers = data.get('answers') # Expected: { "q_0": 1, "q_1": 3, ... }
+    course = get_course(data.get('course'))
 
     if week_number is None or answers is None or not isinstance(answers, dict):
         return jsonify({"error": "Missing or invalid data"}), 400
+    if course is None: return jsonify({"error": "Unknown course"}), 404
 
     # Use the simpler session key for testuser logic
-    questions_key = f'quiz_week_{week_number}_questions'
+    questions_key = quiz_session_key(course.slug, week_number)
     original_mcqs_with_answers = session.get(questions_key)
 
     if not original_mcqs_with_answers: return jsonify({"error": "Quiz data/session expired"}), 400
@@ -194,79 +329,112 @@ def submit_quiz():
     if len(answers) != len(original_mcqs_with_answers):
          return jsonify({"error": "Answer count mismatch."}), 400
 
-    score = 0
     total_questions = len(original_mcqs_with_answers)
-    results_log = [] # Will store detailed results for frontend
-
-    for i, mcq in enumerate(original_mcqs_with_answers):
-        question_id = f"q_{i}"
-        selected_index = answers.get(question_id)
-        is_correct = False
-        valid_selection = False
-        correct_index = -1
-
-        # Validate selected_index
-        if selected_index is not None:
-             try: selected_index = int(selected_index); valid_selection = True
-             except (ValueError, TypeError): selected_index = None
-
-        options = mcq.get('options', [])
-        correct_text = mcq.get('correct_answer_text')
-
-        # Find correct index based on text stored during parsing
-        if correct_text and isinstance(options, list) and options:
-            try: correct_index = options.index(correct_text)
-            except ValueError: correct_index = -1
-
-        # Grade
-        if valid_selection and correct_index != -1 and selected_index == correct_index:
-            is_correct = True; score += 1
-
-        # Add detailed info to results_log for frontend display AND database saving
-        results_log.append({
-            "question_id": question_id, # Include the temporary ID
-            "question_text": mcq.get("question", "N/A"),
-            "options": options, # Send the options list
-            "selected_option_index": selected_index, # User's answer index (or None)
-            "correct_option_index": correct_index, # Correct answer index (or -1)
-            "is_correct": is_correct
-        })
+
+    with timed('grading'):
+        # results_log holds detailed results for frontend display AND database saving
+        score, results_log = grade_submission(original_mcqs_with_answers, answers)
 
     # --- Save to Database (Only if user_id exists) ---
-    db_save_error = None
-    if user_id:
-        try:
-            attempt = QuizAttempt( user_id=user_id, week_number=week_number, score=score,
-                total_questions=total_questions, timestamp=datetime.utcnow() )
-            db.session.add(attempt); db.session.flush()
-            for item in results_log: # Use detailed log for DB saving
-                answer = AnswerLog(
-                    attempt_id=attempt.id,
-                    question_text=item["question_text"],
-                    options_text=json.dumps(item["options"]), # Save options as JSON string
-                    selected_option_index=item["selected_option_index"],
-                    correct_option_index=item["correct_option_index"],
-                    is_correct=item["is_correct"] )
-                db.session.add(answer)
-            db.session.commit();
-            print(f"Attempt saved for user {user_id}, week {week_number}.")
-        except Exception as e:
-             db.session.rollback(); print(f"Error saving attempt: {e}");
-             db_save_error = "Error saving results."
-    else: print("Warning: User not in session, attempt not saved.")
+    db_save_error = save_attempt(user_id, course, week_number, score, total_questions, results_log)
     # --- End Save DB ---
 
     session.pop(questions_key, None) # Clear quiz data from session
 
     # --- Return detailed results to frontend ---
     return jsonify({
-        "message": f"Quiz submitted! {db_save_error or '(Results not saved - no user session)' if not user_id else '(Results saved)'}",
+        "message": submit_message(user_id, db_save_error),
         "score": score,
         "total_questions": total_questions,
         "results": results_log # Send the detailed log
     })
 
-@app.route('/api/progress', methods=['GET'])
+def submit_message(user_id, db_save_error):
+    return f"Quiz submitted! {db_save_error or '(Results not saved - no user session)' if not user_id else '(Results saved)'}"
+
+# --- Adaptive Testing API ---
+# One question at a time; state lives in the session under a per-course/week key.
+def adaptive_session_key(course_slug, week_number):
+    return f'adaptive_{course_slug}_week_{week_number}'
+
+def _adaptive_question(mcq, position):
+    return {"question_number": mcq.get("question_number"), "position": position,
+            "question": mcq.get("question", "N/A"), "options": mcq.get("options", [])}
+
+@bp.route('/api/adaptive/<int:week_number>/start', methods=['POST'], defaults={'slug': DEFAULT_COURSE_SLUG})
+@bp.route('/api/course/<slug>/adaptive/<int:week_number>/start', methods=['POST'])
+def adaptive_start(slug, week_number):
+    course = get_course(slug)
+    if course is None: return jsonify({"error": "Unknown course"}), 404
+    if not course.has_week(week_number): return jsonify({"error": "Invalid week number"}), 400
+    questions = load_questions_for_week(week_number, course)
+    if not questions: return jsonify({"error": "Could not load questions file."}), 500
+
+    index = adaptive.get_item_index(course, week_number, questions)
+    log_post = adaptive.prior_log_posterior()
+    theta, se = adaptive.estimate(log_post)
+    number = index.next_item(theta, ())
+    mcq = adaptive.find_question(questions, number) if number is not None else None
+    if mcq is None: return jsonify({"error": "No questions available."}), 500
+
+    session[adaptive_session_key(course.slug, week_number)] = {
+        "current": number, "log_post": log_post, "responses": []}
+    return jsonify({"ability": round(theta, 3), "standard_error": round(se, 3),
+                    "max_questions": min(adaptive.MAX_ITEMS, len(index)), "question": _adaptive_question(mcq, 1)})
+
+@bp.route('/api/adaptive/<int:week_number>/answer', methods=['POST'], defaults={'slug': DEFAULT_COURSE_SLUG})
+@bp.route('/api/course/<slug>/adaptive/<int:week_number>/answer', methods=['POST'])
+def adaptive_answer(slug, week_number):
+    course = get_course(slug)
+    if course is None: return jsonify({"error": "Unknown course"}), 404
+    key = adaptive_session_key(course.slug, week_number)
+    state = session.get(key)
+    if not state: return jsonify({"error": "Quiz data/session expired"}), 400
+    data = request.get_json(silent=True) or {}
+    selected_index = data.get('selected')
+    if selected_index is not None:
+        try: selected_index = int(selected_index)
+        except (ValueError, TypeError): selected_index = None
+
+    questions = load_questions_for_week(week_number, course)
+    if not questions: return jsonify({"error": "Could not load questions file."}), 500
+    index = adaptive.get_item_index(course, week_number, questions)
+    mcq = adaptive.find_question(questions, state["current"])
+    if mcq is None: return jsonify({"error": "Quiz data/session expired"}), 400
+
+    with timed('grading'):
+        correct_index = correct_option_index(mcq)
+        is_correct = selected_index is not None and correct_index != -1 and selected_index == correct_index
+        # Broken questions (no known answer) are served but do not move the estimate
+        log_post = state["log_post"]
+        if correct_index != -1:
+            log_post = adaptive.update_log_posterior(log_post, index.difficulty_of.get(state["current"], 0.0), is_correct)
+        theta, se = adaptive.estimate(log_post)
+    responses = state["responses"] + [[state["current"], selected_index]]
+    used = {number for number, _ in responses}
+
+    response = {"is_correct": is_correct, "correct_option_index": correct_index, "selected_option_index": selected_index,
+                "ability": round(theta, 3), "standard_error": round(se, 3), "answered": len(responses)}
+    next_number = None
+    if not adaptive.should_stop(len(responses), se, len(index)):
+        next_number = index.next_item(theta, used)
+    next_mcq = adaptive.find_question(questions, next_number) if next_number is not None else None
+    if next_mcq is not None:
+        session[key] = {"current": next_number, "log_post": log_post, "responses": responses}
+        response.update(finished=False, question=_adaptive_question(next_mcq, len(responses) + 1))
+        return jsonify(response)
+
+    # Finished: grade the served sequence the same way as a fixed quiz and save it
+    served = [adaptive.find_question(questions, number) or {} for number, _ in responses]
+    score, results_log = grade_submission(served, {f"q_{i}": selected for i, (_, selected) in enumerate(responses)})
+    db_save_error = save_attempt(session.get('user_id'), course, week_number, score, len(results_log), results_log,
+                                 ability=round(theta, 3))
+    session.pop(key, None)
+    response.update(finished=True, score=score, total_questions=len(results_log), results=results_log,
+                    message=f"Quiz finished! {db_save_error or '(Results saved)'}")
+    return jsonify(response)
+
+@bp.route('/api/progress', methods=['GET'])
 # Add @login_required back if needed
 def get_progress():
     user_id = session.get('user_id')
@@ -274,23 +442,103 @@ def get_progress():
 
     try:
         attempts = QuizAttempt.query.filter_by(user_id=user_id).order_by(QuizAttempt.timestamp.desc()).all()
-        progress_data = [{ "attempt_id": attempt.id, "week": attempt.week_number, "score": attempt.score,
-            "total": attempt.total_questions, "percentage": round((attempt.score / attempt.total_questions) * 100) if attempt.total_questions > 0 else 0,
-            "timestamp": attempt.timestamp.strftime("%Y-%m-%d %H:%M:%S UTC")
-        } for attempt in attempts]
-        return jsonify(progress_data)
+        return jsonify([progress_entry(attempt) for attempt in attempts])
     except Exception as e:
-        print(f"Error fetching progress: {e}")
+        logger.error("progress_fetch_failed", extra={"user_id": user_id, "error": str(e)})
         return jsonify({"error": "Could not retrieve progress data."}), 500
 
+def progress_entry(attempt):
+    """One /api/progress item; `attempt` is a QuizAttempt or a row with the same column names."""
+    return { "attempt_id": attempt.id, "course": attempt.course_slug, "week": attempt.week_number, "score": attempt.score,
+        "total": attempt.total_questions, "percentage": round((attempt.score / attempt.total_questions) * 100) if attempt.total_questions > 0 else 0,
+        "timestamp": attempt.timestamp.strftime("%Y-%m-%d %H:%M:%S UTC")
+    }
+
+@bp.route('/api/attempts/<int:attempt_id>', methods=['GET'])
+def get_attempt(attempt_id):
+    user_id = session.get('user_id')
+    if not user_id: return jsonify({"error": "No user session"}), 401
+    if not attempt_review.valid_id(attempt_id): return jsonify({"error": "Invalid attempt id"}), 400
+    try:
+        attempts = attempt_review.load_attempts(user_id, [attempt_id])
+    except Exception as e:
+        logger.error("attempt_fetch_failed", extra={"user_id": user_id, "attempt_id": attempt_id, "error": str(e)})
+        return jsonify({"error": "Could not retrieve the attempt."}), 500
+    if not attempts: return jsonify({"error": "Attempt not found"}), 404
+    return Response(attempt_review.attempt_json(attempts[0]), mimetype='application/json')
+
+@bp.route('/api/attempts', methods=['GET'])
+def get_attempts():
+    """Batch review: /api/attempts?ids=3,5,8. The body is streamed, two queries per 200 attempts."""
+    user_id = session.get('user_id')
+    if not user_id: return jsonify({"error": "No user session"}), 401
+    try:
+        ids = attempt_review.parse_ids(request.args.get('ids'))
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of attempt ids"}), 400
+    if not ids: return jsonify({"error": "No attempt ids given"}), 400
+    if len(ids) > attempt_review.MAX_IDS:
+        return jsonify({"error": f"At most {attempt_review.MAX_IDS} attempts per request"}), 400
+    return Response(stream_with_context(attempt_review.iter_attempts_json(user_id, ids)), mimetype='application/json')
+
+@bp.route('/api/progress/summary', methods=['GET'])
+# Add @login_required back if needed
+def get_progress_summary():
+    user_id = session.get('user_id')
+    if not user_id: return jsonify([]) # Return empty if no user
+
+    try:
+        # Reads the pre-aggregated WeekStat rows: O(weeks), independent of attempt count
+        return jsonify(get_week_summary(user_id))
+    except Exception as e:
+        logger.error("progress_summary_failed", extra={"user_id": user_id, "error": str(e)})
+        return jsonify({"error": "Could not retrieve progress summary."}), 500
+
+@bp.route('/api/stats/questions/<int:week_number>', methods=['GET'], defaults={'slug': DEFAULT_COURSE_SLUG})
+@bp.route('/api/course/<slug>/stats/questions/<int:week_number>', methods=['GET'])
+def get_week_question_stats(slug, week_number):
+    course = get_course(slug)
+    if course is None: return jsonify({"error": "Unknown course"}), 404
+    if not course.has_week(week_number): return jsonify({"error": "Invalid week number"}), 400
+    try:
+        return jsonify(get_question_stats(week_number, course.slug))
+    except Exception as e:
+        logger.error("question_stats_failed", extra={"week": week_number, "error": str(e)})
+        return jsonify({"error": "Could not retrieve question statistics."}), 500
+
+@bp.route('/api/leaderboard', methods=['GET'], defaults={'slug': DEFAULT_COURSE_SLUG, 'week_number': leaderboard.OVERALL})
+@bp.route('/api/leaderboard/<int:week_number>', methods=['GET'], defaults={'slug': DEFAULT_COURSE_SLUG})
+@bp.route('/api/course/<slug>/leaderboard', methods=['GET'], defaults={'week_number': leaderboard.OVERALL})
+@bp.route('/api/course/<slug>/leaderboard/<int:week_number>', methods=['GET'])
+def get_leaderboard(slug, week_number):
+    course = get_course(slug)
+    if course is None: return jsonify({"error": "Unknown course"}), 404
+    if week_number != leaderboard.OVERALL and not course.has_week(week_number):
+        return jsonify({"error": "Invalid week number"}), 400
+    limit = request.args.get('limit', leaderboard.DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit or leaderboard.DEFAULT_LIMIT, leaderboard.MAX_LIMIT))
+    try:
+        # Top entries come from a short-lived per-worker cache; the caller's own rank is always fresh
+        entries = leaderboard.cached_top_entries(course.slug, week_number, limit,
+                                                 current_app.config['LEADERBOARD_CACHE_SECONDS'])
+        user_id = session.get('user_id')
+        me = leaderboard.user_standing(user_id, course.slug, week_number) if user_id else None
+        return jsonify({"course": course.slug, "week": week_number or None, "entries": entries, "me": me})
+    except Exception as e:
+        logger.error("leaderboard_failed", extra={"course": course.slug, "week": week_number, "error": str(e)})
+        return jsonify({"error": "Could not retrieve the leaderboard."}), 500
+
+# Module-level app for `gunicorn app:app`, the PythonAnywhere WSGI file and the scripts
+app = create_app()
+
 # --- Main Execution ---
 if __name__ == '__main__':
     instance_path = os.path.join(BASE_DIR, 'instance')
     if not os.path.exists(instance_path):
-        try: os.makedirs(instance_path); print(f"Created instance folder: {instance_path}")
-        except OSError as e: print(f"Error creating instance folder: {e}")
+        try: os.makedirs(instance_path); logger.info("instance_folder_created", extra={"path": instance_path})
+        except OSError as e: logger.error("instance_folder_create_failed", extra={"path": instance_path, "error": str(e)})
     # Make sure the notes directory exists
     if not os.path.exists(app.config['WEEKLY_NOTES_DIR']):
-         print(f"Warning: Notes directory '{app.config['WEEKLY_NOTES_DIR']}' not found. 'View Notes' links will likely fail.")
+         logger.warning("notes_dir_missing", extra={"path": app.config['WEEKLY_NOTES_DIR']})
          # Optionally create it: os.makedirs(app.config['WEEKLY_NOTES_DIR'])
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,257 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, exists, text
+from sqlalchemy.orm import selectinload
+from database import db
+from models import QuizAttempt, AnswerLog, AnalyticsState, ArchivedAttemptSummary
+from progress_stats import percentage
+from question_analytics import JOB_NAME as ANALYTICS_JOB_NAME
+
+# Retention job for QuizAttempt/AnswerLog.
+# Attempts older than the cutoff are appended, with their answers, to gzip-compressed JSON-lines
+# partitions (one file per month) and replaced by ArchivedAttemptSummary rows, in small batches
+# that each commit quickly. Freed pages are then returned to the OS with SQLite's incremental
+# vacuum, a few pages per step, instead of one long exclusive VACUUM. Historical reports read
+# the partitions through iter_archived_attempts().
+
+# --- Configuration ---
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ARCHIVE_DIR = os.path.join(BASE_DIR, 'instance', 'archive')
+DEFAULT_RETENTION_DAYS = 365
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAUSE_SECONDS = 0.05 # Between batches/vacuum steps, so live requests get the write lock
+DEFAULT_VACUUM_PAGES = 1000
+# --- End Configuration ---
+
+def partition_path(archive_dir, month):
+    return os.path.join(archive_dir, f"attempts-{month}.jsonl.gz")
+
+def _attempt_record(attempt):
+    return {
+        "id": attempt.id, "user_id": attempt.user_id, "course_slug": attempt.course_slug,
+        "week_number": attempt.week_number, "score": attempt.score, "total_questions": attempt.total_questions,
+        "timestamp": attempt.timestamp.isoformat(), "ability": attempt.ability,
+        "answers": [{"question_text": a.question_text, "options": json.loads(a.options_text or '[]'),
+                     "selected_option_index": a.selected_option_index,
+                     "correct_option_index": a.correct_option_index, "is_correct": a.is_correct}
+                    for a in attempt.answers]
+    }
+
+def _next_batch(cutoff, after_id, batch_size, max_answer_id):
+    """Ids of the next archivable attempts (keyset pagination on id)."""
+    stmt = (select(QuizAttempt.id)
+            .where(QuizAttempt.timestamp < cutoff, QuizAttempt.id > after_id)
+            .order_by(QuizAttempt.id)
+            .limit(batch_size))
+    if max_answer_id is not None:
+        # Keep attempts whose answers the analytics job has not processed yet
+        stmt = stmt.where(~exists().where(AnswerLog.attempt_id == QuizAttempt.id, AnswerLog.id > max_answer_id))
+    return [row.id for row in db.session.execute(stmt)]
+
+def _write_partitions(archive_dir, attempts):
+    """
+    Appends attempts to their month files. Each run adds a new gzip member, which gzip readers
+    concatenate. A member is compressed in memory first and written in one go; if any write
+    fails, every file touched by the batch is truncated back to its previous size, so a torn
+    member never ends up in front of later ones (gzip readers stop at it).
+    """
+    by_month = {}
+    for attempt in attempts:
+        by_month.setdefault(attempt.timestamp.strftime('%Y-%m'), []).append(attempt)
+    written = [] # (path, size before the append)
+    try:
+        for month, items in by_month.items():
+            member = gzip.compress(b"".join((json.dumps(_attempt_record(attempt), ensure_ascii=False) + '\n').encode('utf-8')
+                                            for attempt in items), mtime=0)
+            path = partition_path(archive_dir, month)
+            with open(path, 'ab') as raw:
+                written.append((path, raw.tell()))
+                raw.write(member)
+                raw.flush()
+                os.fsync(raw.fileno()) # On disk before the rows are deleted
+    except BaseException:
+        for path, size in written:
+            with open(path, 'r+b') as raw:
+                raw.truncate(size)
+        raise
+    return by_month
+
+def _fold_summaries(by_month):
+    user_ids = {a.user_id for items in by_month.values() for a in items}
+    existing = {(s.user_id, s.course_slug, s.week_number, s.month): s
+                for s in ArchivedAttemptSummary.query.filter(ArchivedAttemptSummary.user_id.in_(user_ids),
+                                                             ArchivedAttemptSummary.month.in_(list(by_month)))}
+    for month, items in by_month.items():
+        for a in items:
+            key = (a.user_id, a.course_slug, a.week_number, month)
+            summary = existing.get(key)
+            if summary is None:
+                summary = existing[key] = ArchivedAttemptSummary(
+                    user_id=a.user_id, course_slug=a.course_slug, week_number=a.week_number, month=month,
+                    attempt_count=0, score_sum=0, question_sum=0, best_score=0, best_total=0)
+                db.session.add(summary)
+            summary.attempt_count += 1
+            summary.score_sum += a.score
+            summary.question_sum += a.total_questions
+            if summary.attempt_count == 1 or \
+               percentage(a.score, a.total_questions) > percentage(summary.best_score, summary.best_total):
+                summary.best_score, summary.best_total = a.score, a.total_questions
+            if summary.first_attempt_at is None or a.timestamp < summary.first_attempt_at:
+                summary.first_attempt_at = a.timestamp
+            if summary.last_attempt_at is None or a.timestamp > summary.last_attempt_at:
+                summary.last_attempt_at = a.timestamp
+
+def archive_attempts(cutoff, archive_dir=ARCHIVE_DIR, batch_size=DEFAULT_BATCH_SIZE,
+                     pause=DEFAULT_PAUSE_SECONDS, respect_analytics=True, dry_run=False):
+    """
+    Moves attempts older than `cutoff` to the monthly archive partitions.
+
+    Args:
+        cutoff (datetime): Attempts with an earlier timestamp are archived.
+        archive_dir (str): Directory of the attempts-YYYY-MM.jsonl.gz files.
+        batch_size (int): Attempts written, summarised and deleted per transaction.
+        pause (float): Seconds to sleep between batches.
+        respect_analytics (bool): Skip attempts with answers above the question-analytics high-water mark.
+        dry_run (bool): Only count what would be archived.
+
+    Returns:
+        int: Number of attempts archived (or archivable, for a dry run).
+    """
+    max_answer_id = None
+    if respect_analytics:
+        state = db.session.get(AnalyticsState, ANALYTICS_JOB_NAME)
+        max_answer_id = state.high_water_mark if state else 0
+    os.makedirs(archive_dir, exist_ok=True)
+
+    archived = 0
+    after_id = 0
+    while True:
+        ids = _next_batch(cutoff, after_id, batch_size, max_answer_id)
+        if not ids:
+            break
+        after_id = ids[-1]
+        if dry_run:
+            archived += len(ids)
+            continue
+        attempts = (QuizAttempt.query.options(selectinload(QuizAttempt.answers))
+                    .filter(QuizAttempt.id.in_(ids)).order_by(QuizAttempt.id).all())
+        try:
+            # A crash after this write but before the commit leaves duplicate lines for the
+            # batch once it is archived again; iter_archived_attempts() skips them by id.
+            by_month = _write_partitions(archive_dir, attempts)
+            _fold_summaries(by_month)
+            db.session.execute(delete(AnswerLog).where(AnswerLog.attempt_id.in_(ids)))
+            db.session.execute(delete(QuizAttempt).where(QuizAttempt.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        db.session.expunge_all()
+        archived += len(ids)
+        print(f"Archived {archived} attempts (up to id {after_id}).")
+        time.sleep(pause)
+    return archived
+
+def reclaim_space(pages_per_step=DEFAULT_VACUUM_PAGES, pause=DEFAULT_PAUSE_SECONDS, enable_incremental=False):
+    """
+    Returns free pages to the OS with `PRAGMA incremental_vacuum`, a few pages per step.
+    Incremental vacuum needs auto_vacuum=INCREMENTAL, which an existing database only gets from
+    one full VACUUM (`enable_incremental=True`; locks the database for its duration).
+
+    Returns:
+        int: Pages freed (SQLite only; 0 elsewhere).
+    """
+    if db.engine.dialect.name != 'sqlite':
+        print("Space reclamation is only implemented for SQLite; skipped.")
+        return 0
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if enable_incremental and conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            before = conn.execute(text("PRAGMA freelist_count")).scalar()
+            conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            conn.execute(text("VACUUM")) # One-off: rewrites the file so the new mode takes effect
+            print("Switched the database to incremental auto-vacuum (full VACUUM).")
+            return before
+        if conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            print("auto_vacuum is not INCREMENTAL; run once with --enable-incremental-vacuum (one full VACUUM).")
+            return 0
+        freed = 0
+        while True:
+            free = conn.execute(text("PRAGMA freelist_count")).scalar()
+            if not free:
+                break
+            step = min(free, pages_per_step)
+            # executescript() steps the pragma to completion; a plain execute() frees a single page
+            conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({step})")
+            freed += step
+            time.sleep(pause)
+        return freed
+
+# --- Reading archives ---
+def iter_archived_attempts(archive_dir=ARCHIVE_DIR, months=None):
+    """
+    Yields archived attempt dicts (with their 'answers'), oldest partition first.
+
+    Args:
+        months (iterable, optional): 'YYYY-MM' partitions to read (default: all).
+    """
+    wanted = set(months) if months else None
+    for path in sorted(glob.glob(os.path.join(archive_dir, 'attempts-*.jsonl.gz'))):
+        month = os.path.basename(path)[len('attempts-'):-len('.jsonl.gz')]
+        if wanted is not None and month not in wanted:
+            continue
+        seen = set()
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record["id"] in seen:
+                    continue
+                seen.add(record["id"])
+                yield record
+
+def archive_report(archive_dir=ARCHIVE_DIR, months=None):
+    """Per (month, course, week) attempt counts and average percentage, read from the archives."""
+    totals = {}
+    for record in iter_archived_attempts(archive_dir, months):
+        key = (record["timestamp"][:7], record["course_slug"], record["week_number"])
+        t = totals.setdefault(key, [0, 0, 0])
+        t[0] += 1
+        t[1] += record["score"]
+        t[2] += record["total_questions"]
+    return [{"month": month, "course": course, "week": week, "attempts": n, "average_percentage": percentage(s, q)}
+            for (month, course, week), (n, s, q) in sorted(totals.items())]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old quiz attempts to monthly gzip partitions and reclaim space.")
+    parser.add_argument('--older-than-days', type=int, default=DEFAULT_RETENTION_DAYS, help="Retention window in days.")
+    parser.add_argument('--before', help="Archive attempts before this date (YYYY-MM-DD) instead.")
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=DEFAULT_PAUSE_SECONDS, help="Seconds between batches and vacuum steps.")
+    parser.add_argument('--ignore-analytics', action='store_true',
+                        help="Also archive answers question_analytics.py has not processed yet.")
+    parser.add_argument('--dry-run', action='store_true', help="Only count archivable attempts.")
+    parser.add_argument('--no-vacuum', action='store_true', help="Skip incremental vacuum after archiving.")
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help="One-off full VACUUM that switches the database to incremental auto-vacuum.")
+    parser.add_argument('--report', nargs='*', metavar='YYYY-MM', help="Print a report from the archives (optionally for some months) and exit.")
+    args = parser.parse_args()
+
+    if args.report is not None:
+        for row in archive_report(args.archive_dir, args.report or None):
+            print(json.dumps(row))
+        raise SystemExit(0)
+
+    cutoff = datetime.strptime(args.before, '%Y-%m-%d') if args.before else datetime.utcnow() - timedelta(days=args.older_than_days)
+    from app import app
+    with app.app_context():
+        count = archive_attempts(cutoff, args.archive_dir, args.batch_size, args.pause,
+                                 respect_analytics=not args.ignore_analytics, dry_run=args.dry_run)
+        print(f"{'Would archive' if args.dry_run else 'Archived'} {count} attempts older than {cutoff:%Y-%m-%d}.")
+        if not args.dry_run and not args.no_vacuum:
+            freed = reclaim_space(pause=args.pause, enable_incremental=args.enable_incremental_vacuum)
+            print(f"Reclaimed {freed} pages.")
@@ -0,0 +1,270 @@
+import contextlib
+import logging
+import os
+import random
+import time
+import anyio
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse
+from starlette.routing import Mount, Route
+
+import admission
+from app import (app as flask_app, QUESTIONS_PER_QUIZ, frontend_questions, progress_entry, quiz_session_key,
+                 save_attempt, submit_message)
+from database import db
+from grading import grade_submission
+from instrumentation import metrics, timed, BYTES_BUCKETS
+from models import QuizAttempt, WeekStat, DEFAULT_COURSE_SLUG
+from progress_stats import summarize_week_stats
+
+# Optional async serving mode:  uvicorn asgi:app --workers 2
+# The endpoints that spend most of their time waiting are served here as async views, so a
+# request waiting on SQLite or on the disk no longer holds a worker thread:
+#   /api/quiz, /api/submit     question banks from the shared LRU; a bank not cached yet is parsed off the event loop
+#   /api/progress[/summary]    read over aiosqlite (SQLAlchemy's async engine, same models)
+#   /notes                     streamed with non-blocking file reads
+# Every other URL goes to the Flask app from app.py through a small thread pool, so pages,
+# templates, models and the signed session cookie are shared: a quiz fetched in one mode can be
+# submitted in the other. Saving an attempt reuses save_attempt() (progress and leaderboard
+# updates included) in a worker thread behind admission.AsyncWriteGate; SQLite takes one writer
+# at a time anyway, and submits waiting for a slot hold no thread.
+# Requires starlette, uvicorn, aiosqlite and a2wsgi (see requirements.txt).
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Threads serving the requests handed to the Flask app (pages, static files, other APIs)
+WSGI_THREADS = int(os.environ.get('QUIZ_ASYNC_WSGI_THREADS', '10'))
+# Waiting submits cost a coroutine here, not a thread, so the queue can be much longer than
+# QUIZ_WRITE_QUEUE_SIZE; QUIZ_WRITE_QUEUE_TIMEOUT still bounds how long any of them waits
+WRITE_QUEUE_SIZE = int(os.environ.get('QUIZ_ASYNC_WRITE_QUEUE_SIZE', '256'))
+# --- End Configuration ---
+
+registry = flask_app.extensions['courses']
+flask_asgi = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+_admission = flask_app.extensions.get('admission') # None when QUIZ_ADMISSION_ENABLED=0
+write_gate = admission.AsyncWriteGate(_admission['gate'].limit, WRITE_QUEUE_SIZE,
+                                      _admission['gate'].timeout) if _admission else None
+
+def async_database_url():
+    """QUIZ_ASYNC_DATABASE_URL, else the Flask app's SQLite database through aiosqlite."""
+    url = os.environ.get('QUIZ_ASYNC_DATABASE_URL')
+    if url:
+        return url
+    with flask_app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() != 'sqlite':
+        raise RuntimeError(f"Async mode derives its driver only for SQLite; set QUIZ_ASYNC_DATABASE_URL for {url.get_backend_name()}.")
+    return url.set(drivername='sqlite+aiosqlite')
+
+# --- Shared session cookie ---
+class FlaskSession:
+    """Reads and writes the Flask app's signed session cookie."""
+
+    def __init__(self, app):
+        self.app = app
+        self.interface = app.session_interface
+        self.serializer = self.interface.get_signing_serializer(app)
+        self.cookie_name = self.interface.get_cookie_name(app)
+        self.max_age = int(app.permanent_session_lifetime.total_seconds())
+
+    def load(self, request):
+        value = request.cookies.get(self.cookie_name)
+        if not value:
+            return {}
+        try:
+            return dict(self.serializer.loads(value, max_age=self.max_age))
+        except BadSignature:
+            return {}
+
+    def save(self, response, data):
+        app, interface = self.app, self.interface
+        path, domain = interface.get_cookie_path(app), interface.get_cookie_domain(app)
+        response.headers.append('Vary', 'Cookie')
+        if not data:
+            response.delete_cookie(self.cookie_name, path=path, domain=domain)
+            return
+        value = self.serializer.dumps(data)
+        response.set_cookie(self.cookie_name, value, max_age=self.max_age if data.get('_permanent') else None,
+                            path=path, domain=domain, secure=interface.get_cookie_secure(app),
+                            httponly=interface.get_cookie_httponly(app), samesite=interface.get_cookie_samesite(app))
+        if flask_app.config.get('METRICS_ENABLED'):
+            metrics.observe('quiz_session_cookie_bytes', len(value), buckets=BYTES_BUCKETS)
+
+sessions = FlaskSession(flask_app)
+
+class AsyncView:
+    """
+    ASGI endpoint around `view(request, session)`. Requests without a set-up session (no user or
+    admission id yet) go to the Flask app, whose before_request hooks create them; so does any
+    request the view returns None for, which it must decide before reading the body.
+    """
+
+    def __init__(self, name, view, rate_limited=False):
+        self.endpoint = f"async.{name}"
+        self.view = view
+        self.rate_limited = rate_limited
+
+    async def __call__(self, scope, receive, send):
+        started = time.perf_counter()
+        request = Request(scope, receive)
+        session = sessions.load(request)
+        if 'user_id' not in session or (_admission and 'sid' not in session):
+            await flask_asgi(scope, receive, send)
+            return
+        response = None
+        if self.rate_limited and _admission:
+            client = request.client.host if request.client else None
+            wait = _admission['buckets'].take(admission.bucket_key(session['sid'], client))
+            if wait:
+                body, headers = admission.rejection(429, 'rate_limited', self.endpoint, wait)
+                response = JSONResponse(body, status_code=429, headers=headers)
+        if response is None:
+            response = await self.view(request, session)
+        if response is None:
+            await flask_asgi(scope, receive, send)
+            return
+        await response(scope, receive, send)
+        if flask_app.config.get('METRICS_ENABLED'):
+            metrics.observe('quiz_http_request_duration_seconds', time.perf_counter() - started, {"endpoint": self.endpoint})
+            metrics.inc('quiz_http_requests_total', {"endpoint": self.endpoint, "method": request.method,
+                                                     "status": response.status_code})
+
+# --- Views ---
+async def load_questions(course, week_number):
+    questions = registry.cached_questions(course, week_number)
+    if questions is None: # Parsing a bank blocks, so it runs in a thread
+        questions = await anyio.to_thread.run_sync(registry.load_questions, course, week_number)
+    return questions
+
+async def get_quiz_questions(request, session):
+    course = registry.get(request.path_params.get('slug', DEFAULT_COURSE_SLUG))
+    week_number = request.path_params['week_number']
+    if course is None: return JSONResponse({"error": "Unknown course"}, status_code=404)
+    if not course.has_week(week_number): return JSONResponse({"error": "Invalid week number"}, status_code=400)
+    all_week_questions = await load_questions(course, week_number)
+    if all_week_questions is None: return JSONResponse({"error": "Could not load questions file."}, status_code=500)
+    if len(all_week_questions) < QUESTIONS_PER_QUIZ: return JSONResponse({"error": "Not enough questions available."}, status_code=500)
+    with timed('sampling'):
+        selected_mcqs = random.sample(all_week_questions, QUESTIONS_PER_QUIZ)
+    session[quiz_session_key(course.slug, week_number)] = selected_mcqs
+    response = JSONResponse(frontend_questions(selected_mcqs))
+    sessions.save(response, session)
+    return response
+
+def _save_attempt_sync(*args):
+    with flask_app.app_context():
+        return save_attempt(*args)
+
+async def submit_quiz(request, session):
+    user_id = session.get('user_id')
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data: return JSONResponse({"error": "No data received"}, status_code=400)
+
+    week_number = data.get('week_number')
+    answers = data.get('answers')
+    course = registry.get(data.get('course'))
+    if week_number is None or answers is None or not isinstance(answers, dict):
+        return JSONResponse({"error": "Missing or invalid data"}, status_code=400)
+    if course is None: return JSONResponse({"error": "Unknown course"}, status_code=404)
+
+    questions_key = quiz_session_key(course.slug, week_number)
+    original_mcqs_with_answers = session.get(questions_key)
+    if not original_mcqs_with_answers: return JSONResponse({"error": "Quiz data/session expired"}, status_code=400)
+    if len(answers) != len(original_mcqs_with_answers):
+        return JSONResponse({"error": "Answer count mismatch."}, status_code=400)
+
+    if write_gate:
+        admitted, reason, waited = await write_gate.acquire()
+        if waited:
+            metrics.inc('quiz_admission_queued_total', {"endpoint": "async.submit_quiz"})
+            metrics.observe('quiz_admission_queue_wait_seconds', waited)
+        if not admitted:
+            logger.warning("admission_rejected", extra={"endpoint": "async.submit_quiz", "reason": reason,
+                                                        "in_flight": write_gate.in_flight, "waiting": write_gate.waiting})
+            body, headers = admission.rejection(503, reason, "async.submit_quiz", write_gate.timeout)
+            return JSONResponse(body, status_code=503, headers=headers) # Quiz stays in the session for the retry
+    try:
+        total_questions = len(original_mcqs_with_answers)
+        with timed('grading'):
+            score, results_log = grade_submission(original_mcqs_with_answers, answers)
+        db_save_error = await anyio.to_thread.run_sync(_save_attempt_sync, user_id, course, week_number, score,
+                                                       total_questions, results_log)
+    finally:
+        if write_gate:
+            write_gate.release()
+
+    session.pop(questions_key, None)
+    response = JSONResponse({"message": submit_message(user_id, db_save_error), "score": score,
+                             "total_questions": total_questions, "results": results_log})
+    sessions.save(response, session)
+    return response
+
+async def get_progress(request, session):
+    user_id = session['user_id']
+    query = (select(QuizAttempt.id, QuizAttempt.course_slug, QuizAttempt.week_number, QuizAttempt.score,
+                    QuizAttempt.total_questions, QuizAttempt.timestamp)
+             .where(QuizAttempt.user_id == user_id).order_by(QuizAttempt.timestamp.desc()))
+    try:
+        async with request.app.state.engine.connect() as conn:
+            rows = (await conn.execute(query)).all()
+    except Exception as e:
+        logger.error("progress_fetch_failed", extra={"user_id": user_id, "error": str(e)})
+        return JSONResponse({"error": "Could not retrieve progress data."}, status_code=500)
+    return JSONResponse([progress_entry(row) for row in rows])
+
+async def get_progress_summary(request, session):
+    user_id = session['user_id']
+    query = (select(WeekStat).where(WeekStat.user_id == user_id)
+             .order_by(WeekStat.course_slug, WeekStat.week_number))
+    try:
+        async with request.app.state.sessionmaker() as db_session:
+            stats = (await db_session.scalars(query)).all()
+    except Exception as e:
+        logger.error("progress_summary_failed", extra={"user_id": user_id, "error": str(e)})
+        return JSONResponse({"error": "Could not retrieve progress summary."}, status_code=500)
+    return JSONResponse(summarize_week_stats(stats))
+
+async def view_notes(request, session):
+    # Only the file itself is served here; unknown weeks and missing files go to Flask, which flashes and redirects
+    course = registry.get(request.path_params.get('slug', DEFAULT_COURSE_SLUG))
+    week_number = request.path_params['week_number']
+    if course is None or not course.has_week(week_number):
+        return None
+    notes_directory = flask_app.config['WEEKLY_NOTES_DIR'] if course.slug == DEFAULT_COURSE_SLUG else course.notes_dir
+    path = anyio.Path(notes_directory) / course.notes_filename(week_number)
+    if not await path.is_file():
+        return None
+    return FileResponse(str(path), media_type='application/pdf')
+
+# --- App ---
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # One engine per worker process, created inside its event loop
+    app.state.engine = create_async_engine(async_database_url())
+    app.state.sessionmaker = async_sessionmaker(app.state.engine, expire_on_commit=False)
+    logger.info("async_mode_started", extra={"wsgi_threads": WSGI_THREADS, "admission": bool(_admission)})
+    yield
+    await app.state.engine.dispose()
+
+quiz_view = AsyncView('get_quiz_questions', get_quiz_questions, rate_limited=True)
+notes_view = AsyncView('view_notes', view_notes)
+
+app = Starlette(lifespan=lifespan, routes=[
+    Route('/api/quiz/{week_number:int}', quiz_view, methods=['GET']),
+    Route('/api/course/{slug}/quiz/{week_number:int}', quiz_view, methods=['GET']),
+    Route('/api/submit', AsyncView('submit_quiz', submit_quiz, rate_limited=True), methods=['POST']),
+    Route('/api/progress', AsyncView('get_progress', get_progress), methods=['GET']),
+    Route('/api/progress/summary', AsyncView('get_progress_summary', get_progress_summary), methods=['GET']),
+    Route('/notes/{week_number:int}', notes_view, methods=['GET']),
+    Route('/course/{slug}/notes/{week_number:int}', notes_view, methods=['GET']),
+    Mount('', app=flask_asgi), # Everything else: the Flask app
+])
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import logging
+import os
+from flask import current_app, request, send_from_directory
+
+# Fingerprinted, precompressed static assets (built by build_assets.py).
+# url_for('static', filename='js/quiz.js') is rewritten to the content-hashed copy in
+# static/dist/, which is served with a one-year `immutable` Cache-Control and the best
+# precompressed variant the client accepts (br, then gzip). Nothing is compressed per request,
+# and repeat page loads fetch no static bytes until a file's content (and so its name) changes.
+
+logger = logging.getLogger(__name__)
+
+DIST_DIRNAME = 'dist'
+MANIFEST_FILENAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Preferred first; the suffix is what build_assets.py appends to the hashed file
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def load_manifest(static_folder):
+    """
+    Returns {source filename: entry} for entries whose source file is unchanged since the
+    build. A stale entry (source edited without rebuilding) is dropped with a warning, so the
+    edited file is served unhashed rather than the old build.
+    """
+    path = os.path.join(static_folder, DIST_DIRNAME, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            files = json.load(f).get('files', {})
+    except (OSError, ValueError) as e:
+        logger.warning("asset_manifest_unreadable", extra={"path": path, "error": str(e)})
+        return {}
+    manifest = {}
+    for source, entry in files.items():
+        source_path = os.path.join(static_folder, source)
+        if not os.path.exists(source_path) or file_sha256(source_path) != entry.get('sha256'):
+            logger.warning("asset_manifest_stale", extra={"file": source})
+            continue
+        manifest[source] = entry
+    return manifest
+
+def _rewrite_static_url(endpoint, values):
+    # url_defaults hook: swap the filename for its hashed copy before the URL is built
+    if endpoint != 'static' or 'filename' not in values:
+        return
+    entry = current_app.extensions['assets'].get(values['filename'])
+    if entry:
+        values['filename'] = f"{DIST_DIRNAME}/{entry['path']}"
+
+def _static_view(filename):
+    """Static route: built assets get negotiated encodings and immutable caching; the rest is unchanged."""
+    if not filename.startswith(DIST_DIRNAME + '/'):
+        return current_app.send_static_file(filename)
+    dist_dir = os.path.join(current_app.static_folder, DIST_DIRNAME)
+    name = filename[len(DIST_DIRNAME) + 1:]
+    mimetype = current_app.extensions['assets_types'].get(name)
+    if mimetype is None: # The manifest itself or an unknown file: plain static handling
+        return current_app.send_static_file(filename)
+
+    encoding = None
+    for candidate, suffix in ENCODINGS:
+        if request.accept_encodings.quality(candidate) > 0 and os.path.exists(os.path.join(dist_dir, name + suffix)):
+            encoding, name = candidate, name + suffix
+            break
+    response = send_from_directory(dist_dir, name, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    response.vary.add('Accept-Encoding')
+    return response
+
+def init_assets(app):
+    """Loads the asset manifest and installs the URL rewrite and static view (if STATIC_FINGERPRINTS)."""
+    manifest = load_manifest(app.static_folder) if app.config.get('STATIC_FINGERPRINTS', True) else {}
+    app.extensions['assets'] = manifest
+    app.extensions['assets_types'] = {entry['path']: entry['mimetype'] for entry in manifest.values()}
+    if manifest:
+        app.url_defaults(_rewrite_static_url)
+        app.view_functions['static'] = _static_view
+    logger.info("assets_loaded", extra={"fingerprinted": len(manifest)})
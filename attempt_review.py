@@ -0,0 +1,75 @@
+import json
+from sqlalchemy.orm import selectinload
+from models import QuizAttempt
+from progress_stats import percentage
+
+# Review of past attempts with their answers.
+# Attempts are read in chunks of ids, each chunk with one query for the attempts and one
+# selectin query for all of their answers, so a review costs two queries per CHUNK_SIZE
+# attempts however many answers they hold. The JSON is written piece by piece for streaming,
+# and AnswerLog.options_text (already a JSON array) is spliced in as stored instead of being
+# decoded and re-encoded row by row.
+
+CHUNK_SIZE = 200 # Ids per query, well under SQLite's bound-parameter limit
+MAX_IDS = 1000 # Per batch request
+MAX_ID = 2 ** 63 - 1 # Largest SQLite INTEGER
+
+def valid_id(value):
+    return 1 <= value <= MAX_ID
+
+def parse_ids(raw, limit=MAX_IDS):
+    """
+    '3,5,8' -> [3, 5, 8] (order kept, duplicates dropped). Raises ValueError on bad input,
+    including ids outside 1..MAX_ID, which the database could not even be queried with.
+    Stops after `limit` + 1 distinct ids, so the caller can reject an oversized list without parsing all of it.
+    """
+    ids = {} # Insertion-ordered set
+    for part in (raw or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        value = int(part)
+        if not valid_id(value):
+            raise ValueError(f"attempt id out of range: {part}")
+        ids[value] = None
+        if len(ids) > limit:
+            break
+    return list(ids)
+
+def load_attempts(user_id, ids):
+    """Returns the user's attempts among `ids`, in the order given, with answers loaded in one extra query."""
+    attempts = (QuizAttempt.query.options(selectinload(QuizAttempt.answers))
+                .filter(QuizAttempt.id.in_(ids), QuizAttempt.user_id == user_id).all())
+    by_id = {attempt.id: attempt for attempt in attempts}
+    return [by_id[i] for i in ids if i in by_id]
+
+def attempt_json(attempt):
+    """Serialises one attempt and its answers, splicing the stored options JSON."""
+    head = json.dumps({
+        "attempt_id": attempt.id, "course": attempt.course_slug, "week": attempt.week_number,
+        "score": attempt.score, "total": attempt.total_questions,
+        "percentage": percentage(attempt.score, attempt.total_questions),
+        "timestamp": attempt.timestamp.strftime("%Y-%m-%d %H:%M:%S UTC"), "ability": attempt.ability
+    })
+    answers = []
+    for answer in sorted(attempt.answers, key=lambda a: a.id):
+        fields = json.dumps({
+            "question_text": answer.question_text, "selected_option_index": answer.selected_option_index,
+            "correct_option_index": answer.correct_option_index, "is_correct": answer.is_correct
+        })
+        answers.append(f'{fields[:-1]}, "options": {answer.options_text or "[]"}}}')
+    return f'{head[:-1]}, "answers": [{", ".join(answers)}]}}'
+
+def iter_attempts_json(user_id, ids):
+    """
+    Yields the body of {"attempts": [...], "missing": [...]} in pieces, CHUNK_SIZE attempts
+    per pair of queries. Ids that do not exist or belong to another user are listed as missing.
+    """
+    yield '{"attempts": ['
+    found = set()
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        for attempt in load_attempts(user_id, chunk):
+            yield (', ' if found else '') + attempt_json(attempt)
+            found.add(attempt.id)
+    yield f'], "missing": {json.dumps([i for i in ids if i not in found])}}}'
@@ -0,0 +1,68 @@
+"""
+Adaptive-testing simulation: simulated students with known abilities answer a bank of
+Rasch items, either through the adaptive selector or a fixed random quiz. Reports questions
+used, final standard error and RMSE of the ability estimate, plus time per selection step.
+
+    python -m benchmarks.adaptive --students 2000
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import adaptive
+
+def simulate(difficulties, index, students, rng, fixed_length=None):
+    """Returns (mean questions, mean SE, RMSE, seconds per selection step)."""
+    lengths, errors, ses = [], [], []
+    select_time, selections = 0.0, 0
+    numbers = list(difficulties)
+    for _ in range(students):
+        true_theta = rng.gauss(0.0, 1.0)
+        log_post = adaptive.prior_log_posterior()
+        theta, se = adaptive.estimate(log_post)
+        used = set()
+        order = rng.sample(numbers, fixed_length) if fixed_length else None
+        while True:
+            if fixed_length:
+                if len(used) >= fixed_length:
+                    break
+                number = order[len(used)]
+            else:
+                if adaptive.should_stop(len(used), se, len(index)):
+                    break
+                started = time.perf_counter()
+                number = index.next_item(theta, used, rng)
+                select_time += time.perf_counter() - started
+                selections += 1
+            used.add(number)
+            b = difficulties[number]
+            correct = rng.random() < adaptive.probability_correct(true_theta, b)
+            log_post = adaptive.update_log_posterior(log_post, b, correct)
+            theta, se = adaptive.estimate(log_post)
+        lengths.append(len(used))
+        ses.append(se)
+        errors.append((theta - true_theta) ** 2)
+    return (statistics.mean(lengths), statistics.mean(ses), math.sqrt(statistics.mean(errors)),
+            select_time / selections if selections else 0.0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare adaptive and fixed-length quizzes on simulated students.")
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--bank-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    difficulties = {n: max(-3.0, min(3.0, rng.gauss(0.0, 1.2))) for n in range(1, args.bank_size + 1)}
+    index = adaptive.ItemIndex([{"question_number": n} for n in difficulties], difficulties)
+
+    print(f"{'mode':16s} {'questions':>9s} {'mean SE':>8s} {'RMSE':>6s} {'select/step':>12s}")
+    for label, fixed in (("adaptive", None), ("fixed random 10", 10), ("fixed random 15", 15)):
+        length, se, rmse, step = simulate(difficulties, index, args.students, random.Random(args.seed), fixed)
+        step_text = f"{step * 1e6:9.1f} us" if step else f"{'-':>12s}"
+        print(f"{label:16s} {length:9.1f} {se:8.3f} {rmse:6.3f} {step_text}")
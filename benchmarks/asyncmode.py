@@ -0,0 +1,203 @@
+"""
+Concurrent-connection capacity of one worker, sync (gunicorn, app:app) vs async (uvicorn, asgi:app).
+
+Each level opens --levels simulated students at once for --duration seconds. Every student
+loops over /api/quiz/<week> -> /api/submit -> /api/progress -> /notes/<week>, one connection
+per request, downloading at --client-kbps like a student on a campus network. A sync worker is
+occupied for as long as it takes a slow client to receive the notes PDF; the async worker
+streams it from the event loop. Latency is time to the first response byte. A level is within
+capacity while its p99 stays under --slo-ms and at most 1% of requests fail (timeouts, 5xx,
+and 503s from the write queue included). Both servers get a scratch SQLite database, the same
+write queue, and a rate limit high enough not to interfere.
+
+    python -m benchmarks.asyncmode
+    python -m benchmarks.asyncmode --levels 25 100 400 --client-kbps 256 --threads 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.loadtest import PROJECT_ROOT, available_weeks, percentile, _wait_for_port
+
+SERVERS = {
+    "sync": lambda port, threads: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-w', '1',
+                                   '--threads', str(threads), '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+    "async": lambda port, threads: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                                    '--workers', '1', '--log-level', 'warning'],
+}
+MAX_ERROR_RATE = 0.01
+READ_CHUNK = 16 * 1024
+
+# --- Client ---
+async def http_request(port, method, path, cookie=None, payload=None, read_rate=0):
+    """
+    One request on its own connection, read at most `read_rate` bytes/s (0 = as fast as possible).
+    Returns (status, {lower-case header: value}, body bytes, seconds to the first response byte).
+    """
+    started = time.perf_counter()
+    sock = socket.socket()
+    if read_rate:
+        # A small receive window, so the server really waits for a slow reader instead of
+        # handing the whole response to the kernel
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, READ_CHUNK)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ('127.0.0.1', port))
+    reader, writer = await asyncio.open_connection(sock=sock, limit=READ_CHUNK)
+    try:
+        body = json.dumps(payload).encode() if payload is not None else b''
+        head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n"
+        if cookie:
+            head += f"Cookie: session={cookie}\r\n"
+        if payload is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        writer.write(head.encode() + b"\r\n" + body)
+        await writer.drain()
+        chunks = []
+        first_byte = None
+        while True:
+            chunk = await reader.read(READ_CHUNK)
+            if not chunk:
+                break
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            chunks.append(chunk)
+            if read_rate:
+                await asyncio.sleep(len(chunk) / read_rate)
+        raw = b"".join(chunks)
+    finally:
+        writer.close()
+    head, _, content = raw.partition(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.lower() == 'set-cookie' and not value.strip().startswith('session='):
+            continue
+        headers[name.strip().lower()] = value.strip()
+    return int(lines[0].split()[1]), headers, content, first_byte
+
+def _session_cookie(headers, current):
+    value = headers.get('set-cookie', '')
+    return value.split(';', 1)[0].split('=', 1)[1] if value.startswith('session=') else current
+
+class Level:
+    def __init__(self):
+        self.latencies = []
+        self.errors = Counter()
+
+async def run_student(port, cookie, weeks, deadline, args, level, rng):
+    async def call(method, path, payload=None):
+        nonlocal cookie
+        start = time.perf_counter()
+        try:
+            status, headers, body, first_byte = await asyncio.wait_for(
+                http_request(port, method, path, cookie, payload, args.client_kbps * 1024), args.timeout)
+        except (asyncio.TimeoutError, OSError, ValueError, IndexError) as e:
+            level.errors[type(e).__name__] += 1
+            level.latencies.append(time.perf_counter() - start)
+            return None
+        level.latencies.append(first_byte)
+        cookie = _session_cookie(headers, cookie)
+        if status >= 400 or b'Error saving results' in body:
+            level.errors[f"HTTP {status}" if status >= 400 else "Error saving results"] += 1
+            return None
+        return body
+
+    while time.perf_counter() < deadline:
+        week = rng.choice(weeks)
+        body = await call('GET', f'/api/quiz/{week}')
+        if body is None:
+            continue
+        questions = json.loads(body)
+        answers = {q['id']: rng.randrange(len(q['options'])) for q in questions}
+        await call('POST', '/api/submit', {"week_number": week, "answers": answers})
+        await call('GET', '/api/progress')
+        if not args.no_notes:
+            await call('GET', f'/notes/{week}')
+
+async def run_level(port, connections, weeks, args):
+    # Sessions are set up before the clock starts (the homepage logs the test user in)
+    setup = asyncio.Semaphore(20)
+    async def new_session():
+        async with setup:
+            _, headers, _, _ = await http_request(port, 'GET', '/')
+            return _session_cookie(headers, None)
+    cookies = await asyncio.gather(*(new_session() for _ in range(connections)))
+
+    level = Level()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(run_student(port, cookie, weeks, deadline, args, level, random.Random(args.seed + i))
+                           for i, cookie in enumerate(cookies)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(level.latencies)
+    requests = len(latencies)
+    return {"connections": connections, "requests": requests, "rps": round(requests / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1), "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "error_rate": round(sum(level.errors.values()) / requests, 4) if requests else 1.0,
+            "errors": dict(level.errors.most_common())}
+
+def within_capacity(result, slo_ms):
+    return result["requests"] and result["p99_ms"] <= slo_ms and result["error_rate"] <= MAX_ERROR_RATE
+
+def run_mode(mode, weeks, args):
+    scratch_dir = tempfile.mkdtemp(prefix=f'quiz_{mode}_')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(scratch_dir, 'bench.db')}",
+               QUIZ_RATE_LIMIT_PER_SECOND='1000', QUIZ_RATE_LIMIT_BURST='1000')
+    log_path = os.path.join(scratch_dir, 'server.log')
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(SERVERS[mode](args.port, args.threads), cwd=PROJECT_ROOT, env=env, stdout=log, stderr=log)
+    try:
+        if not _wait_for_port(args.port, timeout=30.0):
+            raise SystemExit(f"{mode} server did not start listening in time.")
+        time.sleep(1.0) # uvicorn listens before the app's lifespan has finished
+        results = []
+        for connections in args.levels:
+            result = asyncio.run(run_level(args.port, connections, weeks, args))
+            results.append(result)
+            print(f"  {mode:5s} {connections:6d}  {result['rps']:8.1f}  {result['p50_ms']:8.1f}  {result['p99_ms']:9.1f}"
+                  f"  {result['error_rate']:7.2%}  {', '.join(f'{e} x{n}' for e, n in result['errors'].items())}")
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        print(f"  ({mode} server log: {log_path})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare one sync worker with one async worker under rising concurrency.")
+    parser.add_argument('--modes', nargs='+', choices=tuple(SERVERS), default=list(SERVERS))
+    parser.add_argument('--levels', type=int, nargs='+', default=[10, 50, 100, 200, 400], help="Concurrent connections per level.")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per level.")
+    parser.add_argument('--client-kbps', type=float, default=1024, help="Download speed of each client in KiB/s (0 = unlimited).")
+    parser.add_argument('--no-notes', action='store_true', help="Leave out the notes download.")
+    parser.add_argument('--threads', type=int, default=1, help="Threads of the sync gunicorn worker (default 1, as deployed).")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Seconds before a request counts as failed.")
+    parser.add_argument('--slo-ms', type=float, default=1000.0, help="p99 latency a level must stay under.")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    # Importing app creates its schema: point it at a scratch database, never instance/quiz.db
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='quiz_bench_'), 'import.db')}")
+    sys.path.insert(0, PROJECT_ROOT)
+    from app import PARSED_DATA_DIR, QUESTIONS_PER_QUIZ
+    weeks = available_weeks(PARSED_DATA_DIR, QUESTIONS_PER_QUIZ)
+
+    print(f"client download {args.client_kbps:.0f} KiB/s, notes {'off' if args.no_notes else 'on'}, "
+          f"{args.duration:.0f}s per level, sync threads={args.threads}")
+    print("  mode   conns     req/s   p50 ms     p99 ms   errors")
+    capacity = {}
+    for mode in args.modes:
+        results = run_mode(mode, weeks, args)
+        passing = [r["connections"] for r in results if within_capacity(r, args.slo_ms)]
+        capacity[mode] = max(passing) if passing else 0
+    print(f"\nConnections per worker within p99 <= {args.slo_ms:.0f}ms and <= {MAX_ERROR_RATE:.0%} errors: "
+          + ", ".join(f"{mode} {count}" for mode, count in capacity.items()))
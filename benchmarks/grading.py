@@ -0,0 +1,61 @@
+"""
+Bulk grading benchmark: writes a synthetic answer CSV from the real question banks and
+imports it into a scratch SQLite database with grading.import_answer_file.
+
+    python -m benchmarks.grading --answers 1000000
+    python -m benchmarks.grading --answers 200000 --dry-run    # grading only, no inserts
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def write_answer_file(path, registry, answers, questions_per_sheet=10, students=2000, seed=1):
+    """Writes about `answers` rows: sheets of random questions from random available weeks."""
+    rng = random.Random(seed)
+    course = registry.default
+    banks = {w: [q['question_number'] for q in registry.load_questions(course, w)] for w in course.available_weeks()}
+    weeks = sorted(banks)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sheet_id', 'username', 'week', 'question_number', 'selected'])
+        for sheet in range(answers // questions_per_sheet):
+            week = rng.choice(weeks)
+            username = f"student_{rng.randrange(students)}"
+            for number in rng.sample(banks[week], questions_per_sheet):
+                writer.writerow([f"S{sheet}", username, week, number, rng.choice('ABCD')])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time grading.py on a synthetic answer file.")
+    parser.add_argument('--answers', type=int, default=1000000, help="Approximate answer rows to generate.")
+    parser.add_argument('--chunk-rows', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true', help="Grade only, do not insert.")
+    args = parser.parse_args()
+
+    # Never import into the real instance/quiz.db
+    scratch_dir = tempfile.mkdtemp(prefix='quiz_grading_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch_dir, 'grading.db')}"
+    sys.path.insert(0, PROJECT_ROOT)
+    from app import app
+    import grading
+
+    registry = app.extensions['courses']
+    csv_path = os.path.join(scratch_dir, 'answers.csv')
+    started = time.perf_counter()
+    with app.app_context():
+        write_answer_file(csv_path, registry, args.answers)
+    print(f"Wrote {csv_path} ({os.path.getsize(csv_path) / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s")
+
+    with app.app_context():
+        result = grading.import_answer_file(csv_path, registry, args.chunk_rows or grading.DEFAULT_CHUNK_ROWS,
+                                            dry_run=args.dry_run)
+    rate = result["rows"] / result["seconds"] if result["seconds"] else 0
+    print(f"{'Graded' if args.dry_run else 'Graded and imported'} {result['rows']} answers "
+          f"({result['sheets']} attempts) in {result['seconds']:.1f}s: {rate:,.0f} answers/s")
+    if result["errors"]:
+        print(f"{len(result['errors'])} warnings, first: {result['errors'][0]}")
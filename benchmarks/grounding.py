@@ -0,0 +1,59 @@
+"""
+Grounding check benchmark: builds the n-gram index of every week's notes, then scores
+--questions MCQs drawn (with repeats) from the parsed banks. Also scores each bank against
+another week's notes, where most items should be flagged, as a check that the scores separate.
+
+    python -m benchmarks.grounding --questions 50000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+import grounding
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the grounding check and compare own-week vs other-week flag rates.")
+    parser.add_argument('--questions', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    banks, indexes = {}, {}
+    started = time.perf_counter()
+    for week in range(1, grounding.TOTAL_WEEKS + 1):
+        path = os.path.join(PROJECT_ROOT, grounding.PARSED_DATA_DIR, f"week_{week}_questions.json")
+        if not os.path.exists(path):
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            index = grounding.build_week_index(week, os.path.join(PROJECT_ROOT, grounding.WEEKLY_PDF_DIR))
+        if index is None:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            banks[week] = json.load(f)
+        indexes[week] = index
+    index_time = time.perf_counter() - started
+    print(f"Indexed {len(indexes)} weeks in {index_time:.2f}s "
+          f"({sum(len(i.hashes) for i in indexes.values())} distinct n-gram hashes)")
+
+    rng = random.Random(args.seed)
+    weeks = sorted(banks)
+    sample = [(w, rng.choice(banks[w])) for w in (rng.choice(weeks) for _ in range(args.questions))]
+    started = time.perf_counter()
+    flagged = sum(1 for w, mcq in sample if grounding.check_mcqs([mcq], indexes[w])[0]["unsupported"])
+    elapsed = time.perf_counter() - started
+    print(f"Scored {len(sample)} MCQs in {elapsed:.2f}s ({len(sample) / elapsed:,.0f}/s); "
+          f"{flagged / len(sample):.1%} flagged against their own week")
+
+    own = other = total = 0
+    for position, week in enumerate(weeks):
+        other_week = weeks[(position + 6) % len(weeks)] # Far from the week, so topics differ
+        own += sum(1 for r in grounding.check_mcqs(banks[week], indexes[week]) if r["unsupported"])
+        other += sum(1 for r in grounding.check_mcqs(banks[week], indexes[other_week]) if r["unsupported"])
+        total += len(banks[week])
+    print(f"Banks flagged: {own / total:.1%} against their own notes, {other / total:.1%} against another week's notes")
@@ -0,0 +1,328 @@
+"""
+Exam-day load test: many concurrent simulated students walking the real quiz flow
+(homepage -> quiz page -> /api/quiz/<week> -> /api/submit -> /api/progress).
+
+Runs either in-process against the Flask test client or against a local gunicorn
+serving a scratch SQLite database, and reports requests/sec, p50/p95/p99 latency and
+error rates. Requests shed by admission control (429/503, see admission.py) are counted
+separately and kept out of the latency figures, which then describe admitted requests only;
+--no-admission turns admission control off for comparison. Results can be saved as a baseline and compared on later runs.
+
+    python -m benchmarks.loadtest --mode inprocess --students 20 --iterations 10
+    python -m benchmarks.loadtest --mode gunicorn --workers 4 --save-baseline benchmarks/results/gunicorn.json
+    python -m benchmarks.loadtest --mode gunicorn --workers 4 --compare benchmarks/results/gunicorn.json
+    python -m benchmarks.loadtest --mode gunicorn --workers 2 --threads 16 --students 80 [--no-admission]
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STEPS = ('home', 'quiz_page', 'get_quiz', 'submit', 'progress')
+SHED_STATUSES = (429, 503) # Turned away by admission control
+
+# --- Clients ---
+class InProcessClient:
+    """One simulated student on the Flask test client (own cookie jar)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, payload=None):
+        response = self.client.open(path, method=method, json=payload)
+        body = response.get_json(silent=True)
+        return response.status_code, body
+
+class HttpClient:
+    """One simulated student over real HTTP (own cookie jar)."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                status, raw, ctype = response.status, response.read(), response.headers.get('Content-Type', '')
+        except urllib.error.HTTPError as e:
+            status, raw, ctype = e.code, e.read(), e.headers.get('Content-Type', '')
+        body = None
+        if 'json' in ctype:
+            try: body = json.loads(raw)
+            except ValueError: body = None
+        return status, body
+
+# --- Simulation ---
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.shed = Counter()
+        self.shed_latencies = []
+        self.requests = 0
+
+    def record(self, step, elapsed, error=None, status=None):
+        with self.lock:
+            self.requests += 1
+            if status in SHED_STATUSES:
+                self.shed[f"{step} {status}"] += 1
+                self.shed_latencies.append(elapsed)
+                return
+            self.latencies[step].append(elapsed)
+            if error:
+                self.errors[error] += 1
+
+def _classify(step, status, body):
+    """Returns an error category for a response, or None if it succeeded."""
+    if isinstance(body, dict) and body.get('error'):
+        return body['error']
+    if status >= 400:
+        return f"HTTP {status}"
+    if step == 'submit' and isinstance(body, dict) and 'Error saving results' in body.get('message', ''):
+        return "Error saving results"
+    return None
+
+def run_student(client, weeks, iterations, recorder, rng):
+    for _ in range(iterations):
+        week = rng.choice(weeks)
+        flow = [('home', 'GET', '/', None), ('quiz_page', 'GET', f'/quiz/{week}', None),
+                ('get_quiz', 'GET', f'/api/quiz/{week}', None)]
+        questions = None
+        for step, method, path, payload in flow:
+            start = time.perf_counter()
+            try:
+                status, body = client.request(method, path, payload)
+                error = _classify(step, status, body)
+            except Exception as e:
+                status, body, error = 0, None, f"{type(e).__name__}: {e}"
+            recorder.record(step, time.perf_counter() - start, error, status)
+            if step == 'get_quiz':
+                questions = body if isinstance(body, list) else None
+        if not questions:
+            continue
+
+        answers = {q['id']: rng.randrange(len(q.get('options') or [0])) for q in questions}
+        for step, method, path, payload in (('submit', 'POST', '/api/submit', {"week_number": week, "answers": answers}),
+                                            ('progress', 'GET', '/api/progress', None)):
+            start = time.perf_counter()
+            try:
+                status, body = client.request(method, path, payload)
+                error = _classify(step, status, body)
+            except Exception as e:
+                status, error = 0, f"{type(e).__name__}: {e}"
+            recorder.record(step, time.perf_counter() - start, error, status)
+
+class _DbErrorHandler(logging.Handler):
+    """Counts the underlying DB error of failed saves (e.g. 'database is locked') in in-process mode."""
+
+    def __init__(self, recorder):
+        super().__init__(logging.ERROR)
+        self.recorder = recorder
+
+    def emit(self, record):
+        error = getattr(record, 'error', None)
+        if record.getMessage() == 'attempt_save_failed' and error:
+            reason = error.splitlines()[0]
+            with self.recorder.lock:
+                self.recorder.errors[f"db: {reason[:120]}"] += 1
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(recorder, duration, config):
+    def stats(values):
+        values = sorted(values)
+        return {"count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2)}
+
+    all_latencies = [v for step in STEPS for v in recorder.latencies[step]]
+    total_errors = sum(c for e, c in recorder.errors.items() if not e.startswith('db: '))
+    shed = sum(recorder.shed.values())
+    return {
+        "config": config,
+        "duration_s": round(duration, 3),
+        "requests": recorder.requests,
+        "rps": round(recorder.requests / duration, 2) if duration else 0.0,
+        "error_rate": round(total_errors / recorder.requests, 4) if recorder.requests else 0.0,
+        "shed_rate": round(shed / recorder.requests, 4) if recorder.requests else 0.0,
+        "latency": stats(all_latencies),
+        "steps": {step: stats(recorder.latencies[step]) for step in STEPS},
+        "errors": dict(recorder.errors.most_common()),
+        "shed": dict(recorder.shed.most_common()),
+        "shed_latency": stats(recorder.shed_latencies),
+    }
+
+def available_weeks(data_dir, min_questions):
+    weeks = []
+    for name in os.listdir(data_dir):
+        if name.startswith('week_') and name.endswith('_questions.json'):
+            with open(os.path.join(data_dir, name), encoding='utf-8') as f:
+                if len(json.load(f)) >= min_questions:
+                    weeks.append(int(name.split('_')[1]))
+    return sorted(weeks)
+
+def _wait_for_port(port, timeout=20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(('127.0.0.1', port)) == 0:
+                return True
+        time.sleep(0.1)
+    return False
+
+def run_load(args):
+    # Never load-test the real instance/quiz.db: point the app at a scratch database first
+    scratch_dir = tempfile.mkdtemp(prefix='quiz_loadtest_')
+    db_url = args.database_url or f"sqlite:///{os.path.join(scratch_dir, 'loadtest.db')}"
+    os.environ['DATABASE_URL'] = db_url
+    if args.no_admission:
+        os.environ['QUIZ_ADMISSION_ENABLED'] = '0'
+    sys.path.insert(0, PROJECT_ROOT)
+    import app as app_module # Creates the schema in the scratch database
+    logging.getLogger().setLevel(logging.ERROR)
+
+    weeks = [args.week] if args.week else available_weeks(app_module.PARSED_DATA_DIR, app_module.QUESTIONS_PER_QUIZ)
+    recorder = Recorder()
+    server = None
+    if args.mode == 'inprocess':
+        logging.getLogger('app').addHandler(_DbErrorHandler(recorder))
+        make_client = lambda: InProcessClient(app_module.app)
+    else:
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-w', str(args.workers), '--threads', str(args.threads),
+             '-b', f'127.0.0.1:{args.port}', '--log-level', 'warning', 'app:app'],
+            cwd=PROJECT_ROOT, env=dict(os.environ, DATABASE_URL=db_url))
+        if not _wait_for_port(args.port):
+            server.terminate()
+            raise SystemExit("gunicorn did not start listening in time.")
+        base_url = f"http://127.0.0.1:{args.port}"
+        make_client = lambda: HttpClient(base_url)
+
+    config = {"mode": args.mode, "students": args.students, "iterations": args.iterations,
+              "workers": args.workers if args.mode == 'gunicorn' else None,
+              "threads": args.threads if args.mode == 'gunicorn' else None,
+              "admission": admission_settings(app_module.app.config), "weeks": weeks}
+    threads = []
+    try:
+        start = time.perf_counter()
+        for i in range(args.students):
+            t = threading.Thread(target=run_student,
+                                 args=(make_client(), weeks, args.iterations, recorder, random.Random(args.seed + i)))
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+        duration = time.perf_counter() - start
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+    return summarize(recorder, duration, config)
+
+def admission_settings(config):
+    """The app's admission control settings (None when it is off), as recorded with the results."""
+    if not config.get('ADMISSION_ENABLED', True):
+        return None
+    return {"rate_per_second": config['RATE_LIMIT_PER_SECOND'], "burst": config['RATE_LIMIT_BURST'],
+            "write_concurrency": config['WRITE_CONCURRENCY'], "write_queue_size": config['WRITE_QUEUE_SIZE']}
+
+def admission_label(settings):
+    if not settings:
+        return "off"
+    if not isinstance(settings, dict): # Baselines recorded before the settings were
+        return "on"
+    return (f"{settings['rate_per_second']:g}/s burst {settings['burst']} per session, "
+            f"{settings['write_concurrency']} writers + {settings['write_queue_size']} queued per worker")
+
+def compare(result, baseline, tolerance):
+    """Prints deltas against a baseline. Returns False on a regression beyond `tolerance`."""
+    ok = True
+    if result["config"]["mode"] != baseline["config"]["mode"]:
+        print(f"  Warning: baseline was recorded in {baseline['config']['mode']} mode, this run is {result['config']['mode']}.")
+    if result["config"].get("admission") != baseline["config"].get("admission"):
+        print(f"  Warning: baseline admission control was {admission_label(baseline['config'].get('admission'))}, "
+              f"this run is {admission_label(result['config'].get('admission'))}.")
+    checks = [("rps", result["rps"], baseline["rps"], True),
+              ("p50_ms", result["latency"]["p50_ms"], baseline["latency"]["p50_ms"], False),
+              ("p95_ms", result["latency"]["p95_ms"], baseline["latency"]["p95_ms"], False),
+              ("p99_ms", result["latency"]["p99_ms"], baseline["latency"]["p99_ms"], False)]
+    for name, now, before, higher_is_better in checks:
+        change = (now - before) / before if before else 0.0
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        ok = ok and not regressed
+        print(f"  {name:8s} {before:>10} -> {now:>10}  ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    if result["error_rate"] > baseline["error_rate"] + 0.01:
+        print(f"  error_rate {baseline['error_rate']} -> {result['error_rate']}  REGRESSION")
+        ok = False
+    return ok
+
+def print_report(result):
+    print(f"\nMode: {result['config']['mode']}  students={result['config']['students']}  "
+          f"iterations={result['config']['iterations']}  weeks={result['config']['weeks']}")
+    print(f"Admission control: {admission_label(result['config'].get('admission'))}")
+    print(f"Requests: {result['requests']} in {result['duration_s']}s  ->  {result['rps']} req/s")
+    print(f"Latency (all): p50={result['latency']['p50_ms']}ms  p95={result['latency']['p95_ms']}ms  p99={result['latency']['p99_ms']}ms")
+    for step in STEPS:
+        s = result['steps'][step]
+        print(f"  {step:10s} n={s['count']:<6} p50={s['p50_ms']}ms  p95={s['p95_ms']}ms  p99={s['p99_ms']}ms")
+    print(f"Error rate: {result['error_rate']:.2%}")
+    for error, count in result['errors'].items():
+        print(f"  {count:6d}  {error}")
+    if result.get('shed'):
+        s = result['shed_latency']
+        print(f"Shed by admission control: {result['shed_rate']:.2%}  (answered in p50={s['p50_ms']}ms  p99={s['p99_ms']}ms)")
+        for what, count in result['shed'].items():
+            print(f"  {count:6d}  {what}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate exam-day traffic against the quiz app.")
+    parser.add_argument('--mode', choices=('inprocess', 'gunicorn'), default='inprocess')
+    parser.add_argument('--students', type=int, default=20, help="Concurrent simulated students.")
+    parser.add_argument('--iterations', type=int, default=5, help="Quizzes taken by each student.")
+    parser.add_argument('--week', type=int, help="Only use this week (default: every week with enough questions).")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers (gunicorn mode).")
+    parser.add_argument('--threads', type=int, default=1, help="Threads per gunicorn worker (gunicorn mode).")
+    parser.add_argument('--no-admission', action='store_true', help="Turn admission control off (QUIZ_ADMISSION_ENABLED=0).")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--database-url', help="Database to run against (default: a scratch SQLite file).")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--save-baseline', metavar='PATH', help="Write the results as a JSON baseline.")
+    parser.add_argument('--compare', metavar='PATH', help="Compare against a saved baseline; exit 1 on regression.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative regression (default 0.2).")
+    args = parser.parse_args()
+
+    result = run_load(args)
+    print_report(result)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare}:")
+        if not compare(result, baseline, args.tolerance):
+            sys.exit(1)
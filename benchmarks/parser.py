@@ -0,0 +1,54 @@
+"""
+MCQ parser benchmark: runs the text and layout parsers of utils.mcq_parser over every
+week_N_mcqs.pdf and reports time per PDF and valid questions recovered, plus how many
+questions both parsers kept but with different text (wrapped lines the text parser cut off).
+
+    python -m benchmarks.parser
+    python -m benchmarks.parser --repeat 5 --weeks 5 6
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from utils.mcq_parser import parse_mcq_pdf
+
+def timed_parse(pdf_path, mode, repeat):
+    """Returns (best seconds over `repeat` runs, parsed MCQs). Parser output is silenced."""
+    best, mcqs = None, []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            mcqs = parse_mcq_pdf(pdf_path, mode)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, mcqs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the text and layout MCQ parsers for speed and recall.")
+    parser.add_argument('--mcq-dir', default=os.path.join(PROJECT_ROOT, 'mcq_pdfs'))
+    parser.add_argument('--weeks', type=int, nargs='+', default=list(range(1, 13)))
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per PDF and parser; the best time is reported.")
+    args = parser.parse_args()
+
+    print(f"{'week':>4s} {'text ms':>8s} {'layout ms':>9s} {'text Qs':>7s} {'layout Qs':>9s} {'recovered':>9s} {'fuller':>6s}")
+    totals = [0.0, 0.0, 0, 0, 0, 0]
+    for week in args.weeks:
+        pdf_path = os.path.join(args.mcq_dir, f"week_{week}_mcqs.pdf")
+        if not os.path.exists(pdf_path):
+            print(f"{week:4d}  (missing {pdf_path})")
+            continue
+        text_time, text_mcqs = timed_parse(pdf_path, 'text', args.repeat)
+        layout_time, layout_mcqs = timed_parse(pdf_path, 'layout', args.repeat)
+        text_by_number = {m['question_number']: m for m in text_mcqs}
+        recovered = sum(1 for m in layout_mcqs if m['question_number'] not in text_by_number)
+        fuller = sum(1 for m in layout_mcqs
+                     if m['question_number'] in text_by_number and m != text_by_number[m['question_number']])
+        row = [text_time, layout_time, len(text_mcqs), len(layout_mcqs), recovered, fuller]
+        totals = [t + r for t, r in zip(totals, row)]
+        print(f"{week:4d} {text_time * 1e3:8.1f} {layout_time * 1e3:9.1f} {len(text_mcqs):7d} {len(layout_mcqs):9d} {recovered:9d} {fuller:6d}")
+    print(f"{'all':>4s} {totals[0] * 1e3:8.1f} {totals[1] * 1e3:9.1f} {totals[2]:7d} {totals[3]:9d} {totals[4]:9d} {totals[5]:6d}")
@@ -0,0 +1,67 @@
+"""
+Startup benchmark: wall time of fresh interpreters importing the web app and
+running the offline scripts with --help (median of several runs).
+
+    python -m benchmarks.startup --runs 7
+    python -m benchmarks.startup --importtime    # also list the slowest imports of `app`
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _commands(scratch_db_url):
+    return [
+        ("python -c pass (interpreter baseline)", [sys.executable, '-c', 'pass'], {}),
+        ("import app (create_app + warm-up)", [sys.executable, '-c', 'import app'], {"DATABASE_URL": scratch_db_url}),
+        ("import app (no warm-up)", [sys.executable, '-c', 'import app'],
+         {"DATABASE_URL": scratch_db_url, "QUIZ_WARM_QUESTION_BANK": "0"}),
+        ("nlp.py --help", [sys.executable, 'nlp.py', '--help'], {}),
+        ("filter.py --help", [sys.executable, 'filter.py', '--help'], {}),
+        ("import utils.mcq_parser", [sys.executable, '-c', 'import utils.mcq_parser'], {}),
+    ]
+
+def time_command(argv, extra_env, runs):
+    env = dict(os.environ, **extra_env)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), min(samples)
+
+def slowest_imports(scratch_db_url, top=15):
+    """Runs `python -X importtime -c 'import app'` and returns the slowest cumulative imports."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=PROJECT_ROOT,
+                            env=dict(os.environ, DATABASE_URL=scratch_db_url), capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # Format: "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative_us, name = line.split('|', 2)
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import/startup time of the app and CLI tools.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--importtime', action='store_true', help="Also show the slowest imports of `app`.")
+    args = parser.parse_args()
+
+    scratch_db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='quiz_startup_'), 'startup.db')}"
+    print(f"{'command':42s} {'median':>9s} {'min':>9s}")
+    for label, argv, extra_env in _commands(scratch_db_url):
+        median, best = time_command(argv, extra_env, args.runs)
+        print(f"{label:42s} {median * 1000:8.1f}ms {best * 1000:8.1f}ms")
+
+    if args.importtime:
+        print("\nSlowest imports of `app` (cumulative):")
+        for cumulative_us, name in slowest_imports(scratch_db_url):
+            print(f"  {cumulative_us / 1000:8.1f}ms  {name}")
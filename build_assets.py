@@ -0,0 +1,98 @@
+import argparse
+import gzip
+import json
+import mimetypes
+import os
+import shutil
+from assets import DIST_DIRNAME, MANIFEST_FILENAME, file_sha256
+
+# --- Configuration ---
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+ASSET_EXTENSIONS = ('.js', '.css', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.ico', '.woff2', '.map')
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.svg', '.map')
+MIN_COMPRESS_BYTES = 256 # Below this the encoding headers cost more than they save
+HASH_LENGTH = 12
+# --- End Configuration ---
+
+def hashed_name(relpath, digest):
+    """js/quiz.js -> js/quiz.<hash>.js"""
+    root, ext = os.path.splitext(relpath)
+    return f"{root}.{digest[:HASH_LENGTH]}{ext}"
+
+def _write_if_smaller(path, data, original_size):
+    if len(data) >= original_size:
+        return False
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+def compress_variants(path, data):
+    """Writes path.gz (and path.br when the brotli package is installed). Returns the encodings written."""
+    written = []
+    # mtime=0 keeps the .gz byte-identical across builds of the same content
+    if _write_if_smaller(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0), len(data)):
+        written.append('gzip')
+    try:
+        import brotli
+    except ImportError:
+        return written
+    if _write_if_smaller(path + '.br', brotli.compress(data, quality=11), len(data)):
+        written.append('br')
+    return written
+
+def build(static_dir=STATIC_DIR, clean=True):
+    """
+    Copies every asset under static/ (except static/dist) to static/dist/ under a
+    content-hashed name, writes precompressed variants and the manifest.
+
+    Returns:
+        dict: The manifest's {source relpath: entry} mapping.
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+    if clean and os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir, exist_ok=True)
+
+    files = {}
+    for root, dirs, filenames in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [d for d in dirs if d != DIST_DIRNAME]
+        for filename in sorted(filenames):
+            if not filename.endswith(ASSET_EXTENSIONS):
+                continue
+            source = os.path.join(root, filename)
+            relpath = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            digest = file_sha256(source)
+            target_rel = hashed_name(relpath, digest)
+            target = os.path.join(dist_dir, target_rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            encodings = []
+            if filename.endswith(COMPRESSIBLE_EXTENSIONS) and len(data) >= MIN_COMPRESS_BYTES:
+                encodings = compress_variants(target, data)
+            files[relpath] = {"path": target_rel, "sha256": digest, "bytes": len(data),
+                              "mimetype": mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                              "encodings": encodings}
+
+    with open(os.path.join(dist_dir, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump({"files": files}, f, indent=2, sort_keys=True)
+    return files
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets into static/dist/.")
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    parser.add_argument('--no-clean', action='store_true', help="Keep previously built files (e.g. during a rolling deploy).")
+    args = parser.parse_args()
+
+    manifest = build(args.static_dir, clean=not args.no_clean)
+    for relpath, entry in sorted(manifest.items()):
+        sizes = []
+        for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+            if encoding in entry["encodings"]:
+                sizes.append(f"{encoding} {os.path.getsize(os.path.join(args.static_dir, DIST_DIRNAME, entry['path'] + suffix))}")
+        print(f"{relpath:24s} -> {entry['path']:36s} {entry['bytes']:7d} B  {', '.join(sizes)}")
+    print(f"Built {len(manifest)} assets into {os.path.join(args.static_dir, DIST_DIRNAME)}.")
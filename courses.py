@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from instrumentation import metrics, timed
+
+# Course registry and the shared, memory-capped question-bank cache.
+# Each course has its own data/notes directories; its weekly banks are parsed on first
+# access and kept in one LRU for the whole process, evicted by (approximate) bytes, so worker
+# memory stays flat however many courses are registered.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+metrics.describe('quiz_question_bank_cache_bytes', 'gauge', "Approximate memory held by cached question banks.")
+metrics.describe('quiz_question_bank_cache_entries', 'gauge', "Number of (course, week) banks in the cache.")
+metrics.describe('quiz_question_bank_cache_limit_bytes', 'gauge', "Configured question-bank cache capacity.")
+metrics.describe('quiz_question_bank_cache_events_total', 'counter', "Question-bank cache hits, misses and evictions.")
+
+class Course:
+    """One course: where its parsed weekly banks and notes PDFs live."""
+
+    def __init__(self, slug, title, data_dir, notes_dir, total_weeks=12):
+        self.slug = slug
+        self.title = title
+        self.data_dir = data_dir
+        self.notes_dir = notes_dir
+        self.total_weeks = total_weeks
+
+    def questions_path(self, week_number):
+        return os.path.join(self.data_dir, f"week_{week_number}_questions.json")
+
+    def notes_filename(self, week_number):
+        return f"week_{week_number}.pdf"
+
+    def has_week(self, week_number):
+        return 1 <= week_number <= self.total_weeks
+
+    def available_weeks(self):
+        return [w for w in range(1, self.total_weeks + 1) if os.path.exists(self.questions_path(w))]
+
+def _deep_sizeof(obj, seen=None):
+    """Approximate memory footprint of a parsed JSON structure (dicts, lists, strings, numbers)."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
+
+class QuestionBankCache:
+    """
+    Thread-safe LRU of parsed question banks keyed by (course slug, week), capped by bytes.
+    Entries are invalidated when their JSON file's mtime changes. A single bank larger than
+    the whole capacity is returned but not cached.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # (slug, week) -> (mtime, questions, nbytes)
+        self.current_bytes = 0
+        metrics.set_gauge('quiz_question_bank_cache_limit_bytes', max_bytes)
+
+    def get(self, course, week_number):
+        """Returns the week's questions (sorted by question_number, read-only) or None."""
+        key = (course.slug, week_number)
+        path = course.questions_path(week_number)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            logger.error("question_file_missing", extra={"course": course.slug, "week": week_number, "path": path})
+            return None
+
+        cached = self._lookup(key, mtime)
+        if cached is not None:
+            return cached
+
+        # Parse outside the lock; concurrent misses for the same bank just both load it
+        try:
+            with timed('json_load'), open(path, 'r', encoding='utf-8') as f:
+                questions = json.load(f)
+            questions.sort(key=lambda x: x.get('question_number', float('inf')))
+        except Exception as e:
+            logger.error("question_file_unreadable", extra={"course": course.slug, "week": week_number, "error": str(e)})
+            return None
+        nbytes = _deep_sizeof(questions)
+
+        with self._lock:
+            metrics.inc('quiz_question_bank_cache_events_total', {"event": "miss"})
+            old = self._entries.pop(key, None)
+            if old:
+                self.current_bytes -= old[2]
+            if nbytes <= self.max_bytes:
+                self._entries[key] = (mtime, questions, nbytes)
+                self.current_bytes += nbytes
+                while self.current_bytes > self.max_bytes:
+                    evicted_key, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                    self.current_bytes -= evicted_bytes
+                    metrics.inc('quiz_question_bank_cache_events_total', {"event": "eviction"})
+                    logger.debug("question_bank_evicted", extra={"course": evicted_key[0], "week": evicted_key[1],
+                                                                  "bytes": evicted_bytes})
+            self._report()
+        return questions
+
+    def peek(self, course, week_number):
+        """The cached bank if it is current, else None. Never reads the JSON file itself."""
+        try:
+            mtime = os.stat(course.questions_path(week_number)).st_mtime
+        except OSError:
+            return None
+        return self._lookup((course.slug, week_number), mtime)
+
+    def _lookup(self, key, mtime):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == mtime:
+                self._entries.move_to_end(key)
+                metrics.inc('quiz_question_bank_cache_events_total', {"event": "hit"})
+                return entry[1]
+        return None
+
+    def _report(self):
+        metrics.set_gauge('quiz_question_bank_cache_bytes', self.current_bytes)
+        metrics.set_gauge('quiz_question_bank_cache_entries', len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self._report()
+
+class CourseRegistry:
+    """Courses by slug, loaded from a JSON registry file plus the built-in default course."""
+
+    def __init__(self, default_course, registry_path=None, cache_bytes=DEFAULT_CACHE_BYTES):
+        self.default = default_course
+        self._courses = {default_course.slug: default_course}
+        self.cache = QuestionBankCache(cache_bytes)
+        if registry_path and os.path.exists(registry_path):
+            self._load(registry_path)
+
+    def _load(self, registry_path):
+        base_dir = os.path.dirname(os.path.abspath(registry_path))
+        with open(registry_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        for entry in entries:
+            slug = entry['slug']
+            course = Course(slug, entry.get('title', slug),
+                            os.path.join(base_dir, entry.get('data_dir', os.path.join('courses', slug, 'data'))),
+                            os.path.join(base_dir, entry.get('notes_dir', os.path.join('courses', slug, 'weekly_pdfs'))),
+                            int(entry.get('total_weeks', 12)))
+            self._courses[slug] = course
+            if slug == self.default.slug:
+                self.default = course
+        logger.info("courses_loaded", extra={"count": len(self._courses), "path": registry_path})
+
+    def get(self, slug):
+        return self._courses.get(slug or self.default.slug)
+
+    def all(self):
+        return sorted(self._courses.values(), key=lambda c: c.slug)
+
+    def load_questions(self, course, week_number):
+        return self.cache.get(course, week_number)
+
+    def cached_questions(self, course, week_number):
+        """Like load_questions(), but None instead of parsing a bank that is not cached."""
+        return self.cache.peek(course, week_number)
+
+def init_courses(app, default_course):
+    """Builds the registry from app.config['COURSES_FILE'] / ['QUESTION_BANK_CACHE_BYTES'] and attaches it to the app."""
+    registry = CourseRegistry(default_course, app.config.get('COURSES_FILE'),
+                              int(app.config.get('QUESTION_BANK_CACHE_BYTES', DEFAULT_CACHE_BYTES)))
+    app.extensions['courses'] = registry
+    return registry
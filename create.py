@@ -1,5 +1,4 @@
 
-import fitz  # PyMuPDF library
 import os
 
 # --- Configuration ---
@@ -37,10 +36,15 @@ def split_pdf_by_week(pdf_path, week_starts, output_dir):
         week_starts (dict): Dictionary mapping week number (int) to
                             1-based start page number (int).
         output_dir (str): Directory to save the output weekly PDFs.
+
+    Returns:
+        bool: True if every week was written.
     """
+    import fitz  # PyMuPDF library, imported here so the module's constants are cheap to import
+
     if not os.path.exists(pdf_path):
         print(f"Error: Source PDF not found at '{pdf_path}'")
-        return
+        return False
 
     if not os.path.exists(output_dir):
         try:
@@ -48,8 +52,9 @@ def split_pdf_by_week(pdf_path, week_starts, output_dir):
             print(f"Created output directory: {output_dir}")
         except OSError as e:
             print(f"Error creating output directory '{output_dir}': {e}")
-            return
+            return False
 
+    all_written = True
     try:
         source_doc = fitz.open(pdf_path)
         total_pages_in_doc = source_doc.page_count
@@ -70,6 +75,7 @@ def split_pdf_by_week(pdf_path, week_starts, output_dir):
             # Basic validation for page numbers
             if start_page_0_based < 0 or start_page_0_based >= total_pages_in_doc:
                  print(f"Warning: Invalid start page index {start_page_0_based} for Week {week_num}. Skipping.")
+                 all_written = False
                  continue
             if end_page_0_based < start_page_0_based or end_page_0_based >= total_pages_in_doc:
                  print(f"Warning: Invalid end page index {end_page_0_based} (Start was {start_page_0_based}) for Week {week_num}. Adjusting to end of document if possible.")
@@ -87,6 +93,7 @@ def split_pdf_by_week(pdf_path, week_starts, output_dir):
 
             if end_page_0_based < start_page_0_based:
                  print(f"Error: Calculated start index {start_page_0_based} is after end index {end_page_0_based} for Week {week_num}. Skipping.")
+                 all_written = False
                  continue
 
 
@@ -107,6 +114,7 @@ def split_pdf_by_week(pdf_path, week_starts, output_dir):
 
         source_doc.close()
         print("\nFinished splitting PDF.")
+        return all_written
 
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -114,6 +122,7 @@ def split_pdf_by_week(pdf_path, week_starts, output_dir):
             source_doc.close()
         if 'new_doc' in locals() and new_doc:
             new_doc.close() # Ensure new doc is closed on error during save
+        return False
 
 # --- Run the splitter ---
 if __name__ == "__main__":
@@ -1,8 +1,80 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
 
 db = SQLAlchemy()
 
 def init_app(app):
     db.init_app(app)
+
+def create_schema(app):
+    # Kept separate from init_app so it runs once (e.g. in the gunicorn master with --preload),
+    # not on every import in every worker.
     with app.app_context():
         db.create_all()
+        add_missing_columns()
+        add_autoincrement()
+        add_missing_indexes()
+
+def add_missing_columns():
+    """
+    create_all() never alters existing tables, so columns added to a model later are added
+    here with ALTER TABLE. Only columns that are nullable or have a server default qualify;
+    anything else (constraint changes, new NOT NULL columns) needs a real migration.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} without a server default.")
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}"
+            if column.server_default is not None:
+                ddl += f" NOT NULL DEFAULT '{column.server_default.arg}'" if not column.nullable else f" DEFAULT '{column.server_default.arg}'"
+            with db.engine.begin() as conn:
+                conn.execute(text(ddl))
+
+def add_autoincrement():
+    """
+    Rebuilds SQLite tables whose model sets sqlite_autoincrement but which were created without
+    it. Without AUTOINCREMENT SQLite hands out max(id) + 1, so deleting the newest rows (e.g.
+    archiving) lets their ids be reused. SQLite cannot alter this in place, so the table is
+    copied into a new one; the copy sets sqlite_sequence to the highest id present.
+    Run after add_missing_columns() and before add_missing_indexes(), which recreates indexes.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if not table.dialect_options['sqlite'].get('autoincrement') or table.name not in existing_tables:
+            continue
+        with db.engine.begin() as conn:
+            ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                               {"name": table.name}).scalar()
+            if 'AUTOINCREMENT' in ddl.upper():
+                continue
+            rebuilt = f"{table.name}_rebuild"
+            create = str(CreateTable(table).compile(db.engine)).strip()
+            conn.execute(text(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {rebuilt} ", 1)))
+            columns = ", ".join(c.name for c in table.columns)
+            conn.execute(text(f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {table.name}"))
+            conn.execute(text(f"DROP TABLE {table.name}"))
+            conn.execute(text(f"ALTER TABLE {rebuilt} RENAME TO {table.name}"))
+
+def add_missing_indexes():
+    """Creates indexes declared on existing tables after the table itself was created."""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in present:
+                index.create(db.engine)
@@ -0,0 +1,263 @@
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Randomized exam papers for offline sittings.
+# Each paper draws its questions from the selected weeks' banks and shuffles the question
+# and option order, all from random.Random(f"{seed}-{paper}"), so the same seed always yields
+# the same papers. Questions with an option that points at the others ("All of the above",
+# "Both A and B") keep their printed option order, or the letters would point elsewhere.
+# Papers are rendered across a process pool. Each worker builds a question's ReportLab
+# paragraphs once and reuses the parsed text in every paper that includes it, with the
+# paper's own question number and option letters as bullets.
+# answer_keys.csv maps every printed question back to the bank, and --translate turns
+# scanned responses into the CSV that grading.py imports.
+
+# --- Configuration ---
+OUTPUT_DIR = 'exam_papers'
+DEFAULT_QUESTIONS = 30
+DEFAULT_PAPERS = 10
+KEYS_FILENAME = 'answer_keys.csv'
+MANIFEST_FILENAME = 'exam.json'
+LETTERS = 'ABCD'
+PAPERS_PER_TASK = 10 # Papers rendered per worker task
+# --- End Configuration ---
+
+def build_pool(registry, course, weeks):
+    """Valid questions of the given weeks, each tagged with its week and whether its option order is fixed."""
+    from grading import correct_option_index
+    from grounding import refers_to_other_options
+    pool = []
+    for week in weeks:
+        for mcq in registry.load_questions(course, week) or []:
+            if correct_option_index(mcq) == -1 or len(mcq.get('options', [])) != len(LETTERS):
+                continue # No usable answer key
+            pool.append(dict(mcq, week=week, fixed_order=any(refers_to_other_options(o) for o in mcq['options'])))
+    return pool
+
+def draw_paper(pool, questions, seed, paper):
+    """[(pool index, option order)] for one paper; option order lists original option indexes as printed."""
+    rng = random.Random(f"{seed}-{paper}")
+    items = []
+    for index in rng.sample(range(len(pool)), questions):
+        order = list(range(len(LETTERS)))
+        rng.shuffle(order) # Drawn even when unused, so other questions' orders do not depend on it
+        if pool[index].get('fixed_order'):
+            order.sort()
+        items.append((index, tuple(order)))
+    return items
+
+def draw_papers(pool, questions, papers, seed):
+    """
+    Draws `papers` distinct papers. A draw identical to an earlier paper (same questions in
+    the same order with the same options) is redrawn from the next sub-seed.
+    Returns a list of (paper number, seed label, items).
+    """
+    if questions > len(pool):
+        raise ValueError(f"Only {len(pool)} usable questions for {questions} per paper")
+    drawn, seen = [], set()
+    attempt = 0
+    for paper in range(1, papers + 1):
+        while True:
+            label = f"{paper}" if attempt == 0 else f"{paper}.{attempt}"
+            items = draw_paper(pool, questions, seed, label)
+            signature = tuple(items)
+            if signature not in seen:
+                break
+            attempt += 1
+        seen.add(signature)
+        attempt = 0
+        drawn.append((paper, label, items))
+    return drawn
+
+def answer_key_rows(pool, drawn):
+    """
+    Answer key rows for the drawn papers. Raises ValueError if a key letter would not print the
+    correct answer's text, or a fixed-order question was shuffled.
+    """
+    for paper, _, items in drawn:
+        for position, (index, order) in enumerate(items, start=1):
+            mcq = pool[index]
+            correct = order.index(mcq['options'].index(mcq['correct_answer_text']))
+            if mcq['options'][order[correct]] != mcq['correct_answer_text'] or \
+               (mcq.get('fixed_order') and list(order) != sorted(order)):
+                raise ValueError(f"Answer key mismatch: paper {paper}, question {position} "
+                                 f"(week {mcq['week']}, question {mcq['question_number']})")
+            yield {"paper": paper, "position": position, "week": mcq['week'], "question_number": mcq['question_number'],
+                   "correct": LETTERS[correct], "option_order": "".join(str(i) for i in order)}
+
+# --- Rendering (worker processes) ---
+_worker = {}
+
+def _init_worker(pool, title):
+    # Runs once per worker: the pool arrives pickled once, and the flowable cache lives here
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    styles = getSampleStyleSheet()
+    _worker.update(pool=pool, title=title, styles=styles, paragraphs={},
+                   question_style=ParagraphStyle('ExamQuestion', parent=styles['Normal'], leftIndent=18, bulletIndent=0),
+                   option_style=ParagraphStyle('ExamOption', parent=styles['Normal'], leftIndent=38, bulletIndent=20))
+
+def _escape(text):
+    return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def _paragraph(key, text, style, bullet):
+    """
+    A Paragraph for `text` labelled with `bullet`. The markup is parsed once per worker into a
+    cached prototype; each use is a copy sharing its parsed fragments, with its own number/letter.
+    """
+    from reportlab.platypus import Paragraph
+    prototype = _worker['paragraphs'].get(key)
+    if prototype is None:
+        prototype = _worker['paragraphs'][key] = Paragraph(_escape(text), style)
+    return Paragraph(prototype.text, style, bulletText=bullet, frags=prototype.frags)
+
+def render_paper(path, paper, items):
+    from reportlab.lib.pagesizes import letter as PAGE_SIZE
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, KeepTogether
+
+    styles = _worker['styles']
+    title = _worker['title']
+    story = [Paragraph(_escape(title), styles['h1']),
+             Paragraph(f"Paper {paper:03d} &nbsp;&nbsp; Name: ______________________ &nbsp;&nbsp; ID: ____________", styles['Normal']),
+             Spacer(1, 0.2 * inch)]
+    pool = _worker['pool']
+    for position, (index, order) in enumerate(items, start=1):
+        mcq = pool[index]
+        block = [_paragraph((index,), mcq.get('question', ''), _worker['question_style'], f"{position}."),
+                 Spacer(1, 0.1 * inch)]
+        for letter, option in zip(LETTERS, order):
+            block.append(_paragraph((index, option), mcq['options'][option], _worker['option_style'], f"{letter}."))
+            block.append(Spacer(1, 0.05 * inch))
+        story.append(KeepTogether(block)) # Never split a question from its options
+        story.append(Spacer(1, 0.2 * inch))
+
+    def footer(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.drawRightString(PAGE_SIZE[0] - 0.75 * inch, 0.5 * inch, f"Paper {paper:03d} - page {doc.page}")
+        canvas.restoreState()
+
+    SimpleDocTemplate(path, pagesize=PAGE_SIZE, title=f"{title} - Paper {paper:03d}").build(
+        story, onFirstPage=footer, onLaterPages=footer)
+
+def _render_batch(output_dir, batch):
+    for paper, items in batch:
+        render_paper(os.path.join(output_dir, f"paper_{paper:03d}.pdf"), paper, items)
+    return len(batch)
+
+def generate_exam(pool, title, output_dir, questions=DEFAULT_QUESTIONS, papers=DEFAULT_PAPERS, seed=0, jobs=None):
+    """
+    Draws and renders the papers and writes answer_keys.csv and exam.json to output_dir.
+
+    Args:
+        pool (list): Questions from build_pool().
+        title (str): Heading printed on every paper.
+        questions (int): Questions per paper.
+        papers (int): Number of distinct papers.
+        seed: Any value; the same seed and pool give the same papers.
+        jobs (int, optional): Worker processes (default: CPU count).
+
+    Returns:
+        int: Number of papers written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    drawn = draw_papers(pool, questions, papers, seed)
+
+    with open(os.path.join(output_dir, KEYS_FILENAME), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["paper", "position", "week", "question_number", "correct", "option_order"])
+        writer.writeheader()
+        writer.writerows(answer_key_rows(pool, drawn))
+    with open(os.path.join(output_dir, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump({"title": title, "seed": seed, "questions": questions,
+                   "papers": [{"paper": paper, "seed": label} for paper, label, _ in drawn]}, f, indent=2)
+
+    work = [(paper, items) for paper, _, items in drawn]
+    batches = [work[i:i + PAPERS_PER_TASK] for i in range(0, len(work), PAPERS_PER_TASK)]
+    written = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(pool, title)) as executor:
+        for count in executor.map(_render_batch, [output_dir] * len(batches), batches):
+            written += count
+    return written
+
+def weeks_label(weeks):
+    """[3] -> 'Week 3'; [1, 2, 3] -> 'Weeks 1-3'; [2, 5] -> 'Weeks 2, 5'."""
+    weeks = sorted(weeks)
+    if len(weeks) == 1:
+        return f"Week {weeks[0]}"
+    if len(weeks) > 2 and weeks == list(range(weeks[0], weeks[-1] + 1)):
+        return f"Weeks {weeks[0]}-{weeks[-1]}"
+    return f"Weeks {', '.join(str(w) for w in weeks)}"
+
+# --- Responses -> grading.py ---
+def translate_responses(responses_path, keys_path, output_path):
+    """
+    Converts scanned responses (columns: paper, username, position, letter) into the answer
+    CSV grading.py imports, using the option order in answer_keys.csv. A grading.py sheet
+    covers one week, so each (paper, username, week) becomes its own sheet and attempt.
+    Returns (rows written, rows skipped).
+    """
+    keys = {}
+    with open(keys_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            keys[(int(row['paper']), int(row['position']))] = row
+    translated = []
+    skipped = 0
+    with open(responses_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            key = keys.get((int(row['paper']), int(row['position'])))
+            if key is None:
+                skipped += 1
+                continue
+            letter = (row.get('letter') or '').strip().upper()
+            selected = int(key['option_order'][LETTERS.index(letter)]) if letter and letter in LETTERS else ''
+            username = row['username'].strip()
+            translated.append((f"paper{int(row['paper'])}-{username}-week{key['week']}", username,
+                               int(key['week']), int(key['question_number']), selected))
+    translated.sort(key=lambda r: r[0]) # grading.py needs each sheet's rows to be contiguous
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sheet_id', 'username', 'week', 'question_number', 'selected'])
+        writer.writerows(translated)
+    return len(translated), skipped
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render seeded, randomized exam papers with answer keys.")
+    parser.add_argument('--course', help="Course slug (default: the default course).")
+    parser.add_argument('--weeks', type=int, nargs='+', help="Weeks to draw from (default: all available).")
+    parser.add_argument('--questions', type=int, default=DEFAULT_QUESTIONS, help="Questions per paper.")
+    parser.add_argument('--papers', type=int, default=DEFAULT_PAPERS, help="Number of distinct papers.")
+    parser.add_argument('--seed', default='0', help="Same seed, same papers.")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--jobs', '-j', type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument('--title', help="Heading on each paper (default: course title and weeks).")
+    parser.add_argument('--translate', nargs=2, metavar=('RESPONSES_CSV', 'OUTPUT_CSV'),
+                        help="Convert scanned responses (paper, username, position, letter) using the answer keys in --output-dir, then exit.")
+    args = parser.parse_args()
+
+    if args.translate:
+        written, skipped = translate_responses(args.translate[0], os.path.join(args.output_dir, KEYS_FILENAME), args.translate[1])
+        print(f"Wrote {written} answer rows to {args.translate[1]} ({skipped} rows without a matching key skipped).")
+        raise SystemExit(0)
+
+    from app import app
+    with app.app_context():
+        registry = app.extensions['courses']
+        course = registry.get(args.course)
+        if course is None:
+            parser.error(f"Unknown course '{args.course}'")
+        weeks = args.weeks or course.available_weeks()
+        pool = build_pool(registry, course, weeks)
+    title = args.title or f"{course.title} - {weeks_label(weeks)}"
+
+    started = time.perf_counter()
+    try:
+        count = generate_exam(pool, title, args.output_dir, args.questions, args.papers, args.seed, args.jobs)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Wrote {count} papers of {args.questions} questions from {len(pool)} to {args.output_dir} "
+          f"in {time.perf_counter() - started:.1f}s (seed {args.seed}).")
@@ -1,10 +1,7 @@
+import argparse
 import os
 import re
-import fitz  # PyMuPDF
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
+# fitz (PyMuPDF) and reportlab are imported where they are used, keeping startup and --help fast.
 
 # Folders
 INPUT_PDF_DIR = "mcq_pdfs"             # Where your original MCQ PDFs are located
@@ -17,6 +14,7 @@ def extract_text_from_pdf(pdf_path):
     Extracts text from the given PDF using PyMuPDF.
     Returns the entire text as a string.
     """
+    import fitz  # PyMuPDF
     try:
         doc = fitz.open(pdf_path)
         all_text = ""
@@ -79,6 +77,11 @@ def save_blocks_to_pdf(blocks, output_path, title="MCQs (Filtered)"):
     """
     Saves each block as a paragraph in a new PDF, with re-numbered questions.
     """
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+
     doc = SimpleDocTemplate(output_path, pagesize=letter)
     styles = getSampleStyleSheet()
     story = []
@@ -100,18 +103,21 @@ def save_blocks_to_pdf(blocks, output_path, title="MCQs (Filtered)"):
     try:
         doc.build(story)
         print(f"Saved filtered PDF: {output_path}")
+        return True
     except Exception as e:
         print(f"Error saving PDF {output_path}: {e}")
+        return False
 
 def process_pdf(input_pdf, output_pdf):
     """
     Orchestrates reading, splitting, filtering, re-numbering, and saving a single PDF.
+    Returns True if a filtered PDF was written.
     """
     print(f"Processing {input_pdf}...")
     text = extract_text_from_pdf(input_pdf)
     if not text:
         print("No text found, skipping.")
-        return
+        return False
 
     # 1) Split into question blocks
     blocks = split_into_question_blocks(text)
@@ -126,11 +132,17 @@ def process_pdf(input_pdf, output_pdf):
 
     # 4) Save to PDF
     if renumbered:
-        save_blocks_to_pdf(renumbered, output_pdf)
-    else:
-        print("No valid questions remain after filtering. Skipping output.")
+        return save_blocks_to_pdf(renumbered, output_pdf)
+    print("No valid questions remain after filtering. Skipping output.")
+    return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove placeholder questions from MCQ PDFs and renumber the rest.")
+    parser.add_argument('--input-dir', default=INPUT_PDF_DIR, help=f"Directory with the original MCQ PDFs (default: {INPUT_PDF_DIR}).")
+    parser.add_argument('--output-dir', default=OUTPUT_PDF_DIR, help=f"Directory for the cleaned PDFs (default: {OUTPUT_PDF_DIR}).")
+    args = parser.parse_args()
+    INPUT_PDF_DIR, OUTPUT_PDF_DIR = args.input_dir, args.output_dir
+
     # Make sure output directory exists
     os.makedirs(OUTPUT_PDF_DIR, exist_ok=True)
 
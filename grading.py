@@ -0,0 +1,333 @@
+import argparse
+import csv
+import json
+import logging
+import time
+from datetime import datetime
+from sqlalchemy import insert
+from database import db
+from models import User, QuizAttempt, AnswerLog
+from progress_stats import record_attempt_batch
+
+# Grading shared by the web submit path and offline bulk imports.
+# grade_submission() grades one served quiz; import_answer_file() streams a CSV of answer
+# sheets, grades each chunk with NumPy against per-(course, week) answer keys and bulk-loads
+# QuizAttempt/AnswerLog rows (plus the progress aggregates) one transaction per chunk.
+#
+# Answer file columns (header row required):
+#   sheet_id, username, week, question_number, selected   and optionally course, submitted_at
+# `selected` is a 0-based option index or a letter A-D; empty means unanswered.
+# Rows of one sheet must be contiguous; each sheet becomes one QuizAttempt.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 50000
+REQUIRED_COLUMNS = ('sheet_id', 'username', 'week', 'question_number', 'selected')
+_LETTERS = {letter: i for i, letter in enumerate('ABCDEFGH')}
+
+def correct_option_index(mcq):
+    """Index of correct_answer_text within the question's options, or -1 if it cannot be found."""
+    options = mcq.get('options', [])
+    correct_text = mcq.get('correct_answer_text')
+    if correct_text and isinstance(options, list) and options:
+        try: return options.index(correct_text)
+        except ValueError: return -1
+    return -1
+
+def grade_submission(mcqs, answers):
+    """
+    Grades one served quiz.
+
+    Args:
+        mcqs (list): Questions in the order they were served (as stored in the session).
+        answers (dict): {"q_<i>": selected option index} from the client.
+
+    Returns:
+        tuple: (score, results_log) where results_log has one dict per question with
+               question_id, question_text, options, selected_option_index, correct_option_index, is_correct.
+    """
+    score = 0
+    results_log = []
+    for i, mcq in enumerate(mcqs):
+        question_id = f"q_{i}"
+        selected_index = answers.get(question_id)
+        valid_selection = False
+
+        # Validate selected_index
+        if selected_index is not None:
+            try: selected_index = int(selected_index); valid_selection = True
+            except (ValueError, TypeError): selected_index = None
+
+        correct_index = correct_option_index(mcq)
+        is_correct = valid_selection and correct_index != -1 and selected_index == correct_index
+        if is_correct:
+            score += 1
+
+        results_log.append({
+            "question_id": question_id,
+            "question_text": mcq.get("question", "N/A"),
+            "options": mcq.get("options", []),
+            "selected_option_index": selected_index, # User's answer index (or None)
+            "correct_option_index": correct_index, # Correct answer index (or -1)
+            "is_correct": is_correct
+        })
+    return score, results_log
+
+# --- Bulk grading ---
+class AnswerKeys:
+    """
+    Answer keys for every (course, week) seen so far, packed into one flat NumPy array so a
+    whole chunk is graded with a single fancy-index: key position = offset[(course, week)] + question_number.
+    """
+
+    def __init__(self, registry):
+        import numpy as np
+        self._np = np
+        self.registry = registry
+        self.offsets = {} # (course, week) -> offset, or None when the bank is unavailable
+        self.sizes = {}
+        # -1: broken question, -2: no such question number. Position 0 is a sentinel that rows
+        # which cannot be placed (unknown bank, bad question number) point at.
+        self.correct = np.full(1, -2, dtype=np.int16)
+        self.texts = [None]
+        self.options_json = [None]
+
+    def offset(self, course_slug, week_number):
+        key = (course_slug, week_number)
+        if key in self.offsets:
+            return self.offsets[key]
+        np = self._np
+        course = self.registry.get(course_slug)
+        questions = self.registry.load_questions(course, week_number) if course and course.has_week(week_number) else None
+        if not questions:
+            self.offsets[key] = None
+            return None
+        size = max(q.get('question_number', 0) for q in questions) + 1
+        block = np.full(size, -2, dtype=np.int16)
+        texts = [None] * size
+        options_json = [None] * size
+        for q in questions:
+            n = q.get('question_number')
+            if n is None:
+                continue
+            block[n] = correct_option_index(q)
+            texts[n] = q.get("question", "N/A")
+            options_json[n] = json.dumps(q.get("options", []))
+        self.offsets[key] = len(self.correct)
+        self.sizes[key] = size
+        self.correct = np.concatenate([self.correct, block])
+        self.texts.extend(texts)
+        self.options_json.extend(options_json)
+        return self.offsets[key]
+
+def _parse_selected(value):
+    """Option index from '2' or 'C'; -1 for blank; -3 for anything unparseable or beyond the last letter."""
+    value = value.strip()
+    if not value:
+        return -1
+    if value.isdecimal() and value.isascii():
+        index = int(value)
+        return index if index < len(_LETTERS) else -3
+    return _LETTERS.get(value.upper(), -3)
+
+def _read_chunks(path, chunk_rows):
+    """Yields lists of CSV rows, never splitting one sheet's contiguous rows across chunks."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Answer file is missing column(s): {', '.join(missing)}")
+        chunk = []
+        for row in reader:
+            if len(chunk) >= chunk_rows and row['sheet_id'] != chunk[-1]['sheet_id']:
+                yield chunk
+                chunk = []
+            chunk.append(row)
+        if chunk:
+            yield chunk
+
+def _resolve_users(usernames, user_ids):
+    """Fills user_ids {username: id} for the given names, creating missing users."""
+    missing = sorted(set(usernames) - user_ids.keys())
+    for i in range(0, len(missing), 500):
+        for user in User.query.filter(User.username.in_(missing[i:i + 500])):
+            user_ids[user.username] = user.id
+    new_users = [User(username=name) for name in missing if name not in user_ids]
+    if new_users:
+        db.session.add_all(new_users)
+        db.session.flush()
+        for user in new_users:
+            user_ids[user.username] = user.id
+
+def grade_chunk(rows, keys, default_course, default_timestamp, seen_sheets, report):
+    """
+    Grades one chunk of CSV rows. Returns (attempts, answers, question_counts) ready for
+    bulk insertion, where attempts is a list of per-sheet dicts and answers an array-backed
+    description of the graded rows.
+    """
+    np = keys._np
+    n = len(rows)
+    sheet_codes = np.empty(n, dtype=np.int64)
+    positions = np.empty(n, dtype=np.int64)
+    selected = np.empty(n, dtype=np.int16)
+    sheets = [] # (sheet_id, username, course, week, submitted_at, offset)
+    sheet_index = {}
+    split_sheets = set()
+
+    # The only per-row Python work: decoding the CSV fields into integer arrays
+    for i, row in enumerate(rows):
+        sheet_id = row['sheet_id']
+        code = sheet_index.get(sheet_id)
+        if code is None:
+            if sheet_id in seen_sheets:
+                if sheet_id not in split_sheets:
+                    split_sheets.add(sheet_id)
+                    report['errors'].append(f"sheet {sheet_id}: rows are not contiguous; later rows skipped")
+                sheet_codes[i] = positions[i] = selected[i] = 0
+                continue
+            course = (row.get('course') or '').strip() or default_course
+            try: week = int(row['week'])
+            except ValueError: week = -1
+            offset = keys.offset(course, week)
+            if offset is None:
+                report['errors'].append(f"sheet {sheet_id}: no question bank for course '{course}' week {row['week']}")
+            code = sheet_index[sheet_id] = len(sheets)
+            sheets.append((sheet_id, row['username'].strip(), course, week, row.get('submitted_at'), offset))
+        sheet_codes[i] = code
+        offset = sheets[code][5]
+        try: number = int(row['question_number'])
+        except ValueError: number = -1
+        if offset is None or not (0 <= number < keys.sizes[(sheets[code][2], sheets[code][3])]):
+            positions[i] = 0
+        else:
+            positions[i] = offset + number
+        selected[i] = _parse_selected(row['selected'])
+
+    # Vectorized grading
+    correct = keys.correct[positions]
+    valid = correct != -2 # Unplaceable rows and question numbers missing from the bank
+    report['skipped_rows'] += int(n - valid.sum())
+    report['invalid_selections'] += int(((selected == -3) & valid).sum())
+    is_correct = valid & (correct >= 0) & (selected == correct)
+    scores = np.bincount(sheet_codes[valid], weights=is_correct[valid], minlength=len(sheets)).astype(np.int64)
+    totals = np.bincount(sheet_codes[valid], minlength=len(sheets))
+
+    attempts = []
+    for code, (sheet_id, username, course, week, submitted_at, offset) in enumerate(sheets):
+        seen_sheets.add(sheet_id)
+        if not totals[code]:
+            continue
+        timestamp = default_timestamp
+        if submitted_at:
+            try: timestamp = datetime.fromisoformat(submitted_at.strip())
+            except ValueError: report['errors'].append(f"sheet {sheet_id}: bad submitted_at '{submitted_at}', using import time")
+        attempts.append({"code": code, "username": username, "course_slug": course, "week_number": week,
+                         "score": int(scores[code]), "total_questions": int(totals[code]), "timestamp": timestamp})
+
+    # Per-question counts for QuestionStat, one bincount over key positions
+    answered = np.bincount(positions[valid], minlength=len(keys.correct))
+    right = np.bincount(positions[valid], weights=is_correct[valid], minlength=len(keys.correct))
+    question_counts = {}
+    for (course, week), offset in keys.offsets.items():
+        if offset is None:
+            continue
+        for pos in np.nonzero(answered[offset:offset + keys.sizes[(course, week)]])[0] + offset:
+            # Banks can repeat a question text; its counts add up, as on the web path
+            key = (course, week, keys.texts[pos])
+            prev = question_counts.get(key, (0, 0))
+            question_counts[key] = (prev[0] + int(answered[pos]), prev[1] + int(right[pos]))
+
+    answers = {"sheet_count": len(sheets), "valid": valid, "sheet_codes": sheet_codes, "positions": positions,
+               "selected": selected, "correct": correct, "is_correct": is_correct}
+    return attempts, answers, question_counts
+
+def _store_chunk(attempts, answers, question_counts, keys, user_ids):
+    """Bulk-inserts one graded chunk and folds it into the progress aggregates (no commit)."""
+    np = keys._np
+    _resolve_users([a["username"] for a in attempts], user_ids)
+    rows = [QuizAttempt(user_id=user_ids[a["username"]], course_slug=a["course_slug"], week_number=a["week_number"],
+                        score=a["score"], total_questions=a["total_questions"], timestamp=a["timestamp"])
+            for a in attempts]
+    db.session.add_all(rows)
+    db.session.flush() # Batched INSERTs; assigns the ids the answer rows point at
+
+    attempt_ids = np.full(answers["sheet_count"], -1, dtype=np.int64)
+    for a, row in zip(attempts, rows):
+        attempt_ids[a["code"]] = row.id
+    keep = np.nonzero(answers["valid"])[0]
+    ids = attempt_ids[answers["sheet_codes"][keep]].tolist()
+    positions = answers["positions"][keep].tolist()
+    selected = answers["selected"][keep].tolist()
+    correct = answers["correct"][keep].tolist()
+    is_correct = answers["is_correct"][keep].tolist()
+    texts, options_json = keys.texts, keys.options_json
+    # Unanswered (-1) and unparseable (-3) selections are stored as NULL, like the web path
+    db.session.execute(insert(AnswerLog), [
+        {"attempt_id": ids[i], "question_text": texts[positions[i]], "options_text": options_json[positions[i]],
+         "selected_option_index": selected[i] if selected[i] >= 0 else None,
+         "correct_option_index": correct[i], "is_correct": is_correct[i]}
+        for i in range(len(keep))])
+
+    record_attempt_batch([(user_ids[a["username"]], a["course_slug"], a["week_number"], a["score"],
+                           a["total_questions"], a["timestamp"]) for a in attempts], question_counts)
+    return len(keep)
+
+def import_answer_file(path, registry, chunk_rows=DEFAULT_CHUNK_ROWS, dry_run=False):
+    """
+    Grades and imports an answer CSV. Each chunk (sheets never straddle chunks) is committed
+    in its own transaction; a failing chunk is rolled back and the import stops.
+
+    Args:
+        path (str): CSV file (see the column list at the top of this module).
+        registry (CourseRegistry): Source of the question banks.
+        chunk_rows (int): Approximate rows graded and committed per transaction.
+        dry_run (bool): Grade only; write nothing.
+
+    Returns:
+        dict: Counts of rows, sheets, stored answers, skipped rows and a list of error messages.
+    """
+    keys = AnswerKeys(registry)
+    report = {"rows": 0, "sheets": 0, "answers_stored": 0, "skipped_rows": 0, "invalid_selections": 0,
+              "errors": [], "seconds": 0.0}
+    seen_sheets = set()
+    user_ids = {}
+    default_timestamp = datetime.utcnow()
+    started = time.perf_counter()
+    for rows in _read_chunks(path, chunk_rows):
+        attempts, answers, question_counts = grade_chunk(rows, keys, registry.default.slug,
+                                                         default_timestamp, seen_sheets, report)
+        report["rows"] += len(rows)
+        report["sheets"] += len(attempts)
+        if dry_run or not attempts:
+            continue
+        try:
+            report["answers_stored"] += _store_chunk(attempts, answers, question_counts, keys, user_ids)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("bulk_import_chunk_failed", extra={"path": path, "rows_before": report["rows"] - len(rows),
+                                                            "error": str(e)})
+            report["errors"].append(f"chunk ending at row {report['rows']} rolled back: {e}")
+            break
+        logger.info("bulk_import_chunk", extra={"rows": report["rows"], "sheets": report["sheets"]})
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grade and import an answer-sheet CSV into QuizAttempt/AnswerLog.")
+    parser.add_argument('answer_file', help="CSV with sheet_id, username, week, question_number, selected [, course, submitted_at].")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Rows graded and committed per transaction.")
+    parser.add_argument('--dry-run', action='store_true', help="Grade and report without writing to the database.")
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        result = import_answer_file(args.answer_file, app.extensions['courses'], args.chunk_rows, args.dry_run)
+    for error in result["errors"][:20]:
+        print(f"Warning: {error}")
+    if len(result["errors"]) > 20:
+        print(f"... and {len(result['errors']) - 20} more warnings.")
+    rate = result["rows"] / result["seconds"] if result["seconds"] else 0
+    print(f"Graded {result['rows']} rows into {result['sheets']} attempts in {result['seconds']}s ({rate:,.0f} rows/s); "
+          f"{result['answers_stored']} answers stored, {result['skipped_rows']} rows skipped, "
+          f"{result['invalid_selections']} unreadable selections.")
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import re
+
+# Grounding check for generated MCQs.
+# The generator is told to use only the week's notes; this verifies it. The notes text (as
+# nlp.get_text_from_pdf extracts it for generation) is reduced to content-word tokens, and the
+# hashes of every unigram, bigram and trigram go into one set per week. A question or correct
+# answer is then scored by the share of its own n-grams found in that set: one pass over each
+# item's words, so a bank is verified in time linear in its size, with no pairwise matching.
+
+# --- Configuration ---
+WEEKLY_PDF_DIR = 'weekly_pdfs'
+PARSED_DATA_DIR = 'data'
+TOTAL_WEEKS = 12
+MAX_N = 3
+# Minimum support (0-1). Separate so that question stems, which are often phrased generically
+# ("According to the text, ..."), can be given a different bar from answers; equal for now.
+ANSWER_THRESHOLD = 0.3
+QUESTION_THRESHOLD = 0.3
+# --- End Configuration ---
+
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be because been being between both but by can could
+did do does doing down during each few for from further had has have having how i if in into is it its
+itself just may might more most much must no nor not of off on once only or other our out over own same
+should so some such than that the their them then there these they this those through to too under until
+up very was we were what when where which while who whom why will with would you your according text
+following best describes statement true primary main
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Answers that point at the other options; "all of the above" is scored on those options
+_ALL_OF_THE_ABOVE_RE = re.compile(r"^\s*all of the above\b", re.IGNORECASE)
+_UNCHECKABLE_ANSWER_RE = re.compile(r"^\s*(none of the above|both [a-d] and [a-d])\b", re.IGNORECASE)
+
+_SUFFIXES = ('ingly', 'edly', 'ing', 'ies', 'ied', 'ed', 'es', 'ly', 's', 'e')
+
+def stem(word):
+    """Crude suffix stripping, applied alike to notes and questions ('traded'/'trade' -> 'trad')."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+def content_tokens(text):
+    """Lower-cased, stemmed word tokens without stopwords."""
+    return [stem(word) for word in _WORD_RE.findall((text or "").lower()) if word not in STOPWORDS]
+
+def ngram_hashes(tokens, n):
+    return [hash(" ".join(tokens[i:i + n])) for i in range(len(tokens) - n + 1)]
+
+class NgramIndex:
+    """Hashed 1..MAX_N-gram set for one week's notes."""
+
+    def __init__(self, text, max_n=MAX_N):
+        tokens = content_tokens(text)
+        self.max_n = max_n
+        self.hashes = set()
+        for n in range(1, max_n + 1):
+            self.hashes.update(ngram_hashes(tokens, n))
+        self.token_count = len(tokens)
+
+    def support(self, text):
+        """
+        Share of the text's n-grams present in the notes, 0-1. Word coverage counts double
+        the longer n-grams, which only reward phrasing taken over from the notes (lists and
+        paraphrases reorder words). 0.0 for text with no content words.
+        """
+        tokens = content_tokens(text)
+        if not tokens:
+            return 0.0
+        total, weights = 0.0, 0
+        for n in range(1, min(self.max_n, len(tokens)) + 1):
+            grams = ngram_hashes(tokens, n)
+            weight = 2 if n == 1 else 1
+            total += weight * sum(1 for g in grams if g in self.hashes) / len(grams)
+            weights += weight
+        return total / weights
+
+def build_week_index(week, weekly_dir=WEEKLY_PDF_DIR):
+    """Index of week_N.pdf, or None if the notes cannot be read."""
+    from nlp import get_text_from_pdf # Same extraction the generator was given
+    text = get_text_from_pdf(os.path.join(weekly_dir, f"week_{week}.pdf"))
+    return NgramIndex(text) if text else None
+
+def check_mcqs(mcqs, index, answer_threshold=ANSWER_THRESHOLD, question_threshold=QUESTION_THRESHOLD):
+    """
+    Scores every MCQ against a week's index.
+
+    Returns:
+        list: One dict per MCQ with question_number, question_support, answer_support and
+              'unsupported' (list of 'question'/'answer'; empty when grounded).
+    """
+    results = []
+    for mcq in mcqs:
+        question_support = index.support(mcq.get('question'))
+        answer_support = answer_support_of(mcq, index)
+        unsupported = []
+        if question_support < question_threshold:
+            unsupported.append('question')
+        if answer_support is not None and answer_support < answer_threshold:
+            unsupported.append('answer')
+        results.append({"question_number": mcq.get('question_number'), "question_support": round(question_support, 3),
+                        "answer_support": None if answer_support is None else round(answer_support, 3),
+                        "unsupported": unsupported})
+    return results
+
+def refers_to_other_options(text):
+    """True for an option that points at the other options ("All of the above", "Both A and B")."""
+    return bool(_ALL_OF_THE_ABOVE_RE.match(text or '') or _UNCHECKABLE_ANSWER_RE.match(text or ''))
+
+def answer_support_of(mcq, index):
+    """Support of the correct answer; None when it cannot be checked on its own (e.g. "None of the above")."""
+    answer = mcq.get('correct_answer_text') or ''
+    if _UNCHECKABLE_ANSWER_RE.match(answer):
+        return None
+    if _ALL_OF_THE_ABOVE_RE.match(answer):
+        others = [o for o in mcq.get('options', []) if o != answer]
+        return sum(index.support(o) for o in others) / len(others) if others else None
+    return index.support(answer)
+
+def _scores_text(result):
+    answer = '-' if result['answer_support'] is None else f"{result['answer_support']:.2f}"
+    return f"question {result['question_support']:.2f}, answer {answer}"
+
+def verify_week(week, mcqs, weekly_dir=WEEKLY_PDF_DIR, drop=False):
+    """
+    Checks a parsed bank before it is saved, printing the unsupported items.
+    Returns the MCQs to keep: all of them, or only the grounded ones when `drop` is set.
+    If the notes are missing the bank is returned unchecked.
+    """
+    index = build_week_index(week, weekly_dir)
+    if index is None:
+        print(f" -> Grounding check skipped for Week {week}: notes not available.")
+        return mcqs
+    results = check_mcqs(mcqs, index)
+    flagged = {r["question_number"] for r in results if r["unsupported"]}
+    for r in results:
+        if r["unsupported"]:
+            print(f"    Unsupported Q{r['question_number']} ({', '.join(r['unsupported'])}): {_scores_text(r)}")
+    print(f" -> Grounding: {len(flagged)} of {len(mcqs)} MCQs not supported by week_{week}.pdf"
+          + (" (dropped)" if drop and flagged else ""))
+    if drop:
+        return [m for m in mcqs if m.get('question_number') not in flagged]
+    return mcqs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report parsed MCQs whose question or answer is not supported by the week's notes.")
+    parser.add_argument('--weeks', type=int, nargs='+', default=list(range(1, TOTAL_WEEKS + 1)))
+    parser.add_argument('--weekly-dir', default=WEEKLY_PDF_DIR)
+    parser.add_argument('--data-dir', default=PARSED_DATA_DIR)
+    parser.add_argument('--json', action='store_true', help="Print every score as JSON lines instead of a summary.")
+    args = parser.parse_args()
+
+    for week in args.weeks:
+        path = os.path.join(args.data_dir, f"week_{week}_questions.json")
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            mcqs = json.load(f)
+        index = build_week_index(week, args.weekly_dir)
+        if index is None:
+            print(f"Week {week}: notes not available, skipped.")
+            continue
+        results = check_mcqs(mcqs, index)
+        if args.json:
+            for r in results:
+                print(json.dumps(dict(r, week=week)))
+            continue
+        flagged = [r for r in results if r["unsupported"]]
+        print(f"Week {week}: {len(flagged)} of {len(results)} unsupported")
+        for r in flagged:
+            print(f"  Q{r['question_number']} ({', '.join(r['unsupported'])}): {_scores_text(r)}")
@@ -0,0 +1,22 @@
+# gunicorn.conf.py - used by `gunicorn -c gunicorn.conf.py app:app`
+import gc
+import os
+
+bind = os.environ.get('QUIZ_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+
+# Import the app once in the master: schema creation and the question-bank warm-up in
+# create_app() run a single time, and the loaded bank is inherited by every worker.
+preload_app = True
+
+def pre_fork(server, worker):
+    # Move everything loaded so far into the permanent generation so the workers' garbage
+    # collector does not touch (and un-share) the warmed pages.
+    gc.freeze()
+
+def post_fork(server, worker):
+    # Pooled DB connections opened in the master must not be shared across processes.
+    from app import app
+    from database import db
+    with app.app_context():
+        db.engine.dispose(close=False)
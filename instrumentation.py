@@ -0,0 +1,258 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response, abort
+from flask.sessions import SecureCookieSessionInterface
+from sqlalchemy import event
+from database import db
+
+# Request timing, DB query accounting and hot-path section timers for the Flask app,
+# exposed on a local-only /metrics endpoint in the Prometheus text format.
+# Metrics live in-process: under gunicorn every worker keeps (and reports) its own.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (256, 512, 1024, 2048, 3072, 4096, 8192)
+LOCAL_ADDRESSES = ('127.0.0.1', '::1', 'localhost')
+
+logger = logging.getLogger(__name__)
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms keyed by (name, sorted label items)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {} # name -> (type, help)
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def describe(self, name, metric_type, help_text):
+        self._meta[name] = (metric_type, help_text)
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, labels=None, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear(); self._gauges.clear(); self._histograms.clear()
+
+    def render(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            histograms = [(key, list(h.counts), h.total, h.count, h.buckets) for key, h in self._histograms.items()]
+
+        lines = []
+        seen = set()
+
+        def header(name, default_type):
+            if name in seen:
+                return
+            seen.add(name)
+            metric_type, help_text = self._meta.get(name, (default_type, name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, labels), value in sorted(counters):
+            header(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges):
+            header(name, 'gauge')
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), counts, total, count, buckets in sorted(histograms, key=lambda h: h[0]):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, c in zip(buckets, counts):
+                cumulative += c
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+metrics = MetricsRegistry()
+metrics.describe('quiz_http_request_duration_seconds', 'histogram', "Request latency by endpoint.")
+metrics.describe('quiz_http_requests_total', 'counter', "Requests by endpoint, method and status.")
+metrics.describe('quiz_db_queries_per_request', 'histogram', "SQL statements executed per request.")
+metrics.describe('quiz_db_time_per_request_seconds', 'histogram', "Time spent in SQL per request.")
+metrics.describe('quiz_db_queries_total', 'counter', "SQL statements executed.")
+metrics.describe('quiz_db_query_errors_total', 'counter', "SQL statements that raised, by exception type.")
+metrics.describe('quiz_section_duration_seconds', 'histogram', "Time spent in hot-path sections (json_load, sampling, grading).")
+metrics.describe('quiz_session_cookie_bytes', 'histogram', "Size of the session cookie set on responses.")
+
+_enabled = False
+
+@contextmanager
+def timed(section):
+    """Times a hot-path section into quiz_section_duration_seconds{section=...}."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe('quiz_section_duration_seconds', time.perf_counter() - start, {"section": section})
+
+# --- Structured logging ---
+_RESERVED_LOG_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event message and any `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_LOG_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level=logging.INFO):
+    """Installs the structured formatter on the root logger (once)."""
+    root = logging.getLogger()
+    if any(isinstance(h.formatter, StructuredFormatter) for h in root.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter())
+    root.addHandler(handler)
+    root.setLevel(level)
+
+# --- Flask / SQLAlchemy hooks ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    metrics.inc('quiz_db_queries_total')
+    if has_request_context():
+        g._db_queries = g.get('_db_queries', 0) + 1
+        g._db_time = g.get('_db_time', 0.0) + elapsed
+
+def _handle_error(context):
+    # after_cursor_execute does not run for a statement that raised: drop its start time here,
+    # or the stack grows on the pooled connection and later timings pair with the wrong start
+    starts = context.connection.info.get('query_start') if context.connection is not None else None
+    if starts and context.execution_context is not None:
+        starts.pop()
+    metrics.inc('quiz_db_query_errors_total', {"error": type(context.original_exception).__name__})
+
+def _before_request():
+    g._request_start = time.perf_counter()
+    g._db_queries = 0
+    g._db_time = 0.0
+
+def _after_request(response):
+    start = g.get('_request_start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.endpoint or 'unmatched'
+    if endpoint == 'metrics':
+        return response
+    labels = {"endpoint": endpoint}
+    metrics.observe('quiz_http_request_duration_seconds', elapsed, labels)
+    metrics.inc('quiz_http_requests_total', {"endpoint": endpoint, "method": request.method, "status": response.status_code})
+    metrics.observe('quiz_db_queries_per_request', g._db_queries, labels, buckets=COUNT_BUCKETS)
+    metrics.observe('quiz_db_time_per_request_seconds', g._db_time, labels)
+
+    logger.debug("request", extra={"method": request.method, "path": request.path, "status": response.status_code,
+                                   "duration_ms": round(elapsed * 1000, 2), "db_queries": g._db_queries,
+                                   "db_ms": round(g._db_time * 1000, 2)})
+    return response
+
+class MeasuredSessionInterface(SecureCookieSessionInterface):
+    """Default cookie sessions, recording the size of every session cookie written."""
+
+    def save_session(self, app, session, response):
+        super().save_session(app, session, response)
+        cookie_name = self.get_cookie_name(app)
+        for header in response.headers.getlist('Set-Cookie'):
+            if header.startswith(cookie_name + '='):
+                value = header.split(';', 1)[0]
+                metrics.observe('quiz_session_cookie_bytes', len(value) - len(cookie_name) - 1, buckets=BYTES_BUCKETS)
+
+def _metrics_view():
+    if request.remote_addr not in LOCAL_ADDRESSES:
+        abort(404)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def init_instrumentation(app):
+    """
+    Wires request timing, SQL accounting and the /metrics endpoint into `app`.
+    Controlled by app.config['METRICS_ENABLED'] (env QUIZ_METRICS_ENABLED, on by default).
+    """
+    global _enabled
+    configure_logging()
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    _enabled = True
+    # Session cookies are written after after_request handlers run, so measure them in the session interface
+    if type(app.session_interface) is SecureCookieSessionInterface:
+        app.session_interface = MeasuredSessionInterface()
+
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', _metrics_view)
@@ -0,0 +1,198 @@
+import argparse
+import threading
+import time
+from sqlalchemy import case, func, insert, select
+from database import db
+from instrumentation import metrics
+from models import User, WeekStat, LeaderboardTotal, ScoreBucket
+
+# Weekly and overall leaderboards, maintained incrementally from WeekStat best scores.
+# A weekly board reads WeekStat through ix_week_stat_leaderboard; the overall board reads
+# LeaderboardTotal (sum of a user's best percentage per week). ScoreBucket counts users per
+# score, so "my rank" is one indexed row lookup plus a sum over the distinct scores above it,
+# never a scan of the users. Everything is updated by progress_stats in the transaction that
+# saves the attempt; top-k responses are cached per process for a few seconds.
+
+OVERALL = 0 # ScoreBucket.week_number of the overall board
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+DEFAULT_CACHE_SECONDS = 5.0
+
+metrics.describe('quiz_leaderboard_cache_events_total', 'counter', "Leaderboard top-k cache hits and misses.")
+
+# --- Write path ---
+def apply_best_changes(changes):
+    """
+    Moves users between score buckets after their best percentage for a week changed.
+    Called by progress_stats inside the attempt's transaction. No commit.
+
+    Args:
+        changes (dict): {(user_id, course_slug, week_number): (old_best, new_best)};
+                        old_best is None for a user's first attempt at the week.
+    """
+    if not changes:
+        return
+    bucket_deltas = {}
+    total_deltas = {}
+    for (user_id, course_slug, week_number), (old_best, new_best) in changes.items():
+        if old_best is not None:
+            _add(bucket_deltas, (course_slug, week_number, old_best), -1)
+        _add(bucket_deltas, (course_slug, week_number, new_best), 1)
+        points, weeks = total_deltas.get((user_id, course_slug), (0, 0))
+        total_deltas[(user_id, course_slug)] = (points + new_best - (old_best or 0), weeks + (old_best is None))
+
+    user_ids = sorted({user_id for user_id, _ in total_deltas})
+    totals = {}
+    for i in range(0, len(user_ids), 500): # Stay under SQLite's bound-parameter limit
+        for total in LeaderboardTotal.query.filter(LeaderboardTotal.user_id.in_(user_ids[i:i + 500])).with_for_update():
+            totals[(total.user_id, total.course_slug)] = total
+    for (user_id, course_slug), (points, weeks) in total_deltas.items():
+        total = totals.get((user_id, course_slug))
+        if total is None:
+            total = LeaderboardTotal(user_id=user_id, course_slug=course_slug, points=0, weeks=0)
+            db.session.add(total)
+        else:
+            _add(bucket_deltas, (course_slug, OVERALL, total.points), -1)
+        total.points += points
+        total.weeks += weeks
+        _add(bucket_deltas, (course_slug, OVERALL, total.points), 1)
+    _apply_bucket_deltas(bucket_deltas)
+
+def _add(deltas, key, value):
+    deltas[key] = deltas.get(key, 0) + value
+
+def _apply_bucket_deltas(deltas):
+    by_board = {}
+    for (course_slug, week_number, score), delta in deltas.items():
+        if delta:
+            by_board.setdefault((course_slug, week_number), {})[score] = delta
+    for (course_slug, week_number), scores in by_board.items():
+        existing = {b.score: b for b in ScoreBucket.query.filter(
+            ScoreBucket.course_slug == course_slug,
+            ScoreBucket.week_number == week_number,
+            ScoreBucket.score.in_(list(scores))).with_for_update()}
+        for score, delta in scores.items():
+            bucket = existing.get(score)
+            if bucket is None:
+                bucket = ScoreBucket(course_slug=course_slug, week_number=week_number, score=score, users=0)
+                db.session.add(bucket)
+            bucket.users += delta
+
+def rebuild_leaderboards():
+    """
+    Recomputes LeaderboardTotal and ScoreBucket from WeekStat with a few set-based
+    statements. Needed once for databases whose WeekStat rows predate the leaderboards.
+    """
+    for table in (LeaderboardTotal.__table__, ScoreBucket.__table__):
+        table.drop(db.engine, checkfirst=True)
+        table.create(db.engine)
+    db.session.execute(insert(LeaderboardTotal).from_select(
+        ['user_id', 'course_slug', 'points', 'weeks'],
+        select(WeekStat.user_id, WeekStat.course_slug, func.sum(WeekStat.best_percentage), func.count())
+        .where(WeekStat.attempt_count > 0)
+        .group_by(WeekStat.user_id, WeekStat.course_slug)))
+    db.session.execute(insert(ScoreBucket).from_select(
+        ['course_slug', 'week_number', 'score', 'users'],
+        select(WeekStat.course_slug, WeekStat.week_number, WeekStat.best_percentage, func.count())
+        .where(WeekStat.attempt_count > 0)
+        .group_by(WeekStat.course_slug, WeekStat.week_number, WeekStat.best_percentage)))
+    db.session.execute(insert(ScoreBucket).from_select(
+        ['course_slug', 'week_number', 'score', 'users'],
+        select(LeaderboardTotal.course_slug, OVERALL, LeaderboardTotal.points, func.count())
+        .group_by(LeaderboardTotal.course_slug, LeaderboardTotal.points)))
+    db.session.commit()
+    clear_cache()
+    return db.session.query(func.count(LeaderboardTotal.id)).scalar()
+
+# --- Read path ---
+def top_entries(course_slug, week_number, limit=DEFAULT_LIMIT):
+    """
+    Returns the top `limit` entries of a weekly board (or the overall board for week 0),
+    with competition ranking (equal scores share a rank).
+    """
+    if week_number == OVERALL:
+        rows = (db.session.query(LeaderboardTotal.points, LeaderboardTotal.weeks, User.username)
+                .join(User, User.id == LeaderboardTotal.user_id)
+                .filter(LeaderboardTotal.course_slug == course_slug)
+                .order_by(LeaderboardTotal.points.desc(), LeaderboardTotal.user_id)
+                .limit(limit).all())
+        entries = [{"username": r.username, "points": r.points, "weeks": r.weeks, "score": r.points} for r in rows]
+    else:
+        rows = (db.session.query(WeekStat.best_percentage, WeekStat.best_score, WeekStat.best_total, User.username)
+                .join(User, User.id == WeekStat.user_id)
+                .filter(WeekStat.course_slug == course_slug, WeekStat.week_number == week_number,
+                        WeekStat.attempt_count > 0)
+                .order_by(WeekStat.best_percentage.desc(), WeekStat.user_id)
+                .limit(limit).all())
+        entries = [{"username": r.username, "percentage": r.best_percentage, "best_score": r.best_score,
+                    "best_total": r.best_total, "score": r.best_percentage} for r in rows]
+    rank, previous = 0, None
+    for position, entry in enumerate(entries, start=1):
+        score = entry.pop("score")
+        if score != previous:
+            rank, previous = position, score
+        entry["rank"] = rank
+    return entries
+
+def user_standing(user_id, course_slug, week_number):
+    """Returns {"rank", "of", and the user's score fields} on one board, or None if the user is not on it."""
+    if week_number == OVERALL:
+        row = LeaderboardTotal.query.filter_by(user_id=user_id, course_slug=course_slug).first()
+        if row is None:
+            return None
+        score, standing = row.points, {"points": row.points, "weeks": row.weeks}
+    else:
+        row = WeekStat.query.filter_by(user_id=user_id, course_slug=course_slug, week_number=week_number).first()
+        if row is None or not row.attempt_count:
+            return None
+        score, standing = row.best_percentage, {"percentage": row.best_percentage, "best_score": row.best_score,
+                                                "best_total": row.best_total}
+    above, total = db.session.query(
+        func.coalesce(func.sum(case((ScoreBucket.score > score, ScoreBucket.users), else_=0)), 0),
+        func.coalesce(func.sum(ScoreBucket.users), 0)
+    ).filter(ScoreBucket.course_slug == course_slug, ScoreBucket.week_number == week_number).one()
+    standing.update(rank=above + 1, of=total)
+    return standing
+
+# --- Top-k cache ---
+# Short TTL instead of invalidation: submissions from other workers cannot reach this process,
+# and a board a few seconds old is fine. The caller's own standing is never cached.
+_cache = {}
+_cache_lock = threading.Lock()
+
+def cached_top_entries(course_slug, week_number, limit, ttl=DEFAULT_CACHE_SECONDS):
+    key = (course_slug, week_number, limit)
+    now = time.monotonic()
+    hit = _cache.get(key)
+    if hit is not None and hit[0] > now:
+        metrics.inc('quiz_leaderboard_cache_events_total', {"event": "hit"})
+        return hit[1]
+    metrics.inc('quiz_leaderboard_cache_events_total', {"event": "miss"})
+    entries = top_entries(course_slug, week_number, limit)
+    with _cache_lock:
+        # Keys are bounded by courses x weeks x limits, but drop expired ones now and then
+        if len(_cache) > 1000:
+            for stale in [k for k, (expires, _) in _cache.items() if expires <= now]:
+                del _cache[stale]
+        _cache[key] = (now + ttl, entries)
+    return entries
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or print the leaderboards.")
+    parser.add_argument('--rebuild', action='store_true', help="Recompute the leaderboard tables from WeekStat.")
+    parser.add_argument('--course', default=None, help="Course slug to print (default course when omitted).")
+    parser.add_argument('--week', type=int, default=OVERALL, help="Week to print (0 = overall).")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        if args.rebuild:
+            print(f"Rebuilt leaderboards for {rebuild_leaderboards()} user/course totals.")
+        course_slug = args.course or app.extensions['courses'].default.slug
+        for entry in top_entries(course_slug, args.week, args.limit):
+            print(entry)
@@ -1,21 +1,33 @@
 from database import db
 from datetime import datetime
 
+# Slug of the original single course; rows written before multi-course support belong to it
+DEFAULT_COURSE_SLUG = 'conservation-economics'
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     quiz_attempts = db.relationship('QuizAttempt', backref='user', lazy=True)
 
 class QuizAttempt(db.Model):
+    # Ids are never reused once rows are archived away (analytics high-water mark, archive dedupe)
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    course_slug = db.Column(db.String(80), nullable=False, default=DEFAULT_COURSE_SLUG, server_default=DEFAULT_COURSE_SLUG)
     week_number = db.Column(db.Integer, nullable=False)
     score = db.Column(db.Integer, nullable=False)
     total_questions = db.Column(db.Integer, nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ability = db.Column(db.Float, nullable=True) # Adaptive attempts only: final ability estimate (logits)
     answers = db.relationship('AnswerLog', backref='attempt', lazy=True, cascade="all, delete-orphan") # Added cascade delete
 
+    @property
+    def is_adaptive(self):
+        return self.ability is not None
+
 class AnswerLog(db.Model):
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempt.id'), nullable=False)
     question_text = db.Column(db.String, nullable=False)
@@ -23,3 +35,94 @@ class AnswerLog(db.Model):
     selected_option_index = db.Column(db.Integer, nullable=True)
     correct_option_index = db.Column(db.Integer, nullable=False)
     is_correct = db.Column(db.Boolean, nullable=False)
+
+# --- Pre-aggregated progress statistics (kept in step by submit_quiz) ---
+class WeekStat(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'course_slug', 'week_number', name='uq_week_stat_user_course_week'),
+                      # Weekly leaderboard: top-k is a backward scan of this index
+                      db.Index('ix_week_stat_leaderboard', 'course_slug', 'week_number', 'best_percentage'))
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    course_slug = db.Column(db.String(80), nullable=False, default=DEFAULT_COURSE_SLUG, server_default=DEFAULT_COURSE_SLUG)
+    week_number = db.Column(db.Integer, nullable=False)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0) # Sum of scores, for the average
+    question_sum = db.Column(db.Integer, nullable=False, default=0) # Sum of total_questions, for the average
+    best_score = db.Column(db.Integer, nullable=False, default=0)
+    best_total = db.Column(db.Integer, nullable=False, default=0)
+    best_percentage = db.Column(db.Integer, nullable=False, default=0)
+    last_percentage = db.Column(db.Integer, nullable=True)
+    previous_percentage = db.Column(db.Integer, nullable=True) # Percentage of the attempt before the last one (for trend)
+    last_attempt_at = db.Column(db.DateTime, nullable=True)
+
+class QuestionStat(db.Model):
+    __table_args__ = (db.UniqueConstraint('course_slug', 'week_number', 'question_key', name='uq_question_stat_course_week_key'),)
+    id = db.Column(db.Integer, primary_key=True)
+    course_slug = db.Column(db.String(80), nullable=False, default=DEFAULT_COURSE_SLUG, server_default=DEFAULT_COURSE_SLUG)
+    week_number = db.Column(db.Integer, nullable=False)
+    question_key = db.Column(db.String(40), nullable=False) # sha1 of the question text
+    question_text = db.Column(db.String, nullable=False)
+    times_answered = db.Column(db.Integer, nullable=False, default=0)
+    times_correct = db.Column(db.Integer, nullable=False, default=0)
+
+# --- Leaderboards (maintained from WeekStat best scores by leaderboard.py) ---
+class LeaderboardTotal(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'course_slug', name='uq_leaderboard_total_user_course'),
+                      db.Index('ix_leaderboard_total_points', 'course_slug', 'points'))
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    course_slug = db.Column(db.String(80), nullable=False, default=DEFAULT_COURSE_SLUG, server_default=DEFAULT_COURSE_SLUG)
+    points = db.Column(db.Integer, nullable=False, default=0) # Sum of the user's best percentage per week
+    weeks = db.Column(db.Integer, nullable=False, default=0) # Weeks attempted
+
+class ScoreBucket(db.Model):
+    # How many users hold each score, so a rank is one sum over at most a few hundred rows
+    __table_args__ = (db.UniqueConstraint('course_slug', 'week_number', 'score', name='uq_score_bucket_course_week_score'),)
+    id = db.Column(db.Integer, primary_key=True)
+    course_slug = db.Column(db.String(80), nullable=False, default=DEFAULT_COURSE_SLUG, server_default=DEFAULT_COURSE_SLUG)
+    week_number = db.Column(db.Integer, nullable=False) # 0 = overall (LeaderboardTotal.points)
+    score = db.Column(db.Integer, nullable=False) # Best percentage, or points for week 0
+    users = db.Column(db.Integer, nullable=False, default=0)
+
+# --- Per-question analytics (filled in by the question_analytics.py batch job) ---
+class QuestionAnalytics(db.Model):
+    __table_args__ = (db.UniqueConstraint('course_slug', 'week_number', 'question_key', name='uq_question_analytics_course_week_key'),)
+    id = db.Column(db.Integer, primary_key=True)
+    course_slug = db.Column(db.String(80), nullable=False, default=DEFAULT_COURSE_SLUG, server_default=DEFAULT_COURSE_SLUG)
+    week_number = db.Column(db.Integer, nullable=False)
+    question_key = db.Column(db.String(40), nullable=False) # Same key as QuestionStat
+    question_text = db.Column(db.String, nullable=False)
+    # Sufficient statistics, additive across runs
+    n_answers = db.Column(db.Integer, nullable=False, default=0)
+    n_correct = db.Column(db.Integer, nullable=False, default=0)
+    n_unanswered = db.Column(db.Integer, nullable=False, default=0)
+    n_broken = db.Column(db.Integer, nullable=False, default=0) # Answers logged with correct_option_index == -1
+    option_counts = db.Column(db.String, nullable=False, default='[]') # JSON list: times each option index was chosen
+    rest_sum = db.Column(db.Float, nullable=False, default=0.0) # Sum of rest scores (attempt score minus this item)
+    rest_sq_sum = db.Column(db.Float, nullable=False, default=0.0)
+    correct_rest_sum = db.Column(db.Float, nullable=False, default=0.0) # Sum of rest scores where the item was correct
+    # Derived from the sums after each run
+    difficulty = db.Column(db.Float, nullable=True) # Proportion correct (p-value)
+    discrimination = db.Column(db.Float, nullable=True) # Point-biserial of item vs rest score
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+class AnalyticsState(db.Model):
+    job_name = db.Column(db.String(80), primary_key=True)
+    high_water_mark = db.Column(db.Integer, nullable=False, default=0) # Last AnswerLog.id processed
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+# --- Archived attempts (archive_attempts.py moves old attempts to instance/archive/) ---
+class ArchivedAttemptSummary(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'course_slug', 'week_number', 'month', name='uq_archived_summary'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    course_slug = db.Column(db.String(80), nullable=False, default=DEFAULT_COURSE_SLUG, server_default=DEFAULT_COURSE_SLUG)
+    week_number = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.String(7), nullable=False) # 'YYYY-MM', also names the archive partition
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    question_sum = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Integer, nullable=False, default=0)
+    best_total = db.Column(db.Integer, nullable=False, default=0)
+    first_attempt_at = db.Column(db.DateTime, nullable=True)
+    last_attempt_at = db.Column(db.DateTime, nullable=True)
@@ -1,13 +1,10 @@
-import fitz
+import argparse
 import re
 import os
 import json
-from reportlab.lib.pagesizes import letter as PAGE_SIZE
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
 from dotenv import load_dotenv
-import google.generativeai as genai
+# fitz, reportlab and google.generativeai are imported inside the functions that use them,
+# so importing this module (or running it with --help) stays fast.
 
 # Load environment variables from file (adjust the filename if needed)
 load_dotenv('t.env')  # Or '.env'
@@ -26,6 +23,7 @@ def get_text_from_pdf(pdf_path):
     if not os.path.exists(pdf_path):
         print(f"Error: PDF file not found at '{pdf_path}'")
         return None
+    import fitz
     try:
         doc = fitz.open(pdf_path)
         full_text = "".join(page.get_text("text") for page in doc)
@@ -50,6 +48,7 @@ def generate_mcqs_with_gemini(text_content, week_number, target_count=100):
         }] * target_count
 
     try:
+        import google.generativeai as genai
         genai.configure(api_key=GEMINI_API_KEY)
         model = genai.GenerativeModel('gemini-1.5-flash-latest')
     except Exception as e:
@@ -136,6 +135,11 @@ def save_mcqs_to_pdf(mcqs, output_pdf_path):
     Saves the provided MCQs to a PDF file using ReportLab.
     Returns True if successful, False otherwise.
     """
+    from reportlab.lib.pagesizes import letter as PAGE_SIZE
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+
     success = False
     try:
         doc = SimpleDocTemplate(output_pdf_path, pagesize=PAGE_SIZE)
@@ -186,7 +190,40 @@ def save_mcqs_to_pdf(mcqs, output_pdf_path):
         success = False
     return success
 
+def generate_week(week, weekly_dir=WEEKLY_PDF_DIR, output_dir=MCQ_OUTPUT_DIR):
+    """
+    Reads week_N.pdf, generates its MCQs and saves them to week_N_mcqs.pdf.
+    Returns True if the MCQ PDF was written.
+    """
+    print(f"\nProcessing Week {week} PDF...")
+    pdf_file = os.path.join(weekly_dir, f"week_{week}.pdf")
+    week_text = get_text_from_pdf(pdf_file)
+    if not week_text:
+        print(f"   -> Could not read text from {pdf_file}.")
+        return False
+
+    generated_mcqs = generate_mcqs_with_gemini(week_text, week, target_count=QUESTIONS_PER_WEEK)
+    if not generated_mcqs or generated_mcqs[0]['question'].startswith("Error:"):
+        print(f"   -> No MCQs generated or an error occurred during generation for Week {week}.")
+        return False
+
+    for mcq in generated_mcqs:
+        mcq['week_num'] = week
+
+    output_pdf = os.path.join(output_dir, f"week_{week}_mcqs.pdf")
+    if save_mcqs_to_pdf(generated_mcqs, output_pdf):
+        print(f" -> Successfully saved MCQs for Week {week} to {output_pdf}")
+        return True
+    print(f"   -> Failed to save PDF for Week {week} due to errors.")
+    return False
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate MCQ PDFs for each week's notes with the Gemini API.")
+    parser.add_argument('--weekly-dir', default=WEEKLY_PDF_DIR, help=f"Directory with week_N.pdf notes (default: {WEEKLY_PDF_DIR}).")
+    parser.add_argument('--output-dir', default=MCQ_OUTPUT_DIR, help=f"Directory for week_N_mcqs.pdf (default: {MCQ_OUTPUT_DIR}).")
+    args = parser.parse_args()
+    WEEKLY_PDF_DIR, MCQ_OUTPUT_DIR = args.weekly_dir, args.output_dir
+
     if not os.path.exists(WEEKLY_PDF_DIR):
         print(f"Error: Input directory '{WEEKLY_PDF_DIR}' not found.")
     elif not GEMINI_API_KEY:
@@ -204,29 +241,7 @@ if __name__ == "__main__":
         all_successful = True
 
         for week in range(1, TOTAL_WEEKS + 1):
-            print(f"\nProcessing Week {week} PDF...")
-            pdf_file = os.path.join(WEEKLY_PDF_DIR, f"week_{week}.pdf")
-            week_text = get_text_from_pdf(pdf_file)
-
-            if week_text:
-                generated_mcqs = generate_mcqs_with_gemini(week_text, week, target_count=QUESTIONS_PER_WEEK)
-
-                if generated_mcqs and not generated_mcqs[0]['question'].startswith("Error:"):
-                    for mcq in generated_mcqs:
-                        mcq['week_num'] = week
-
-                    output_pdf = os.path.join(MCQ_OUTPUT_DIR, f"week_{week}_mcqs.pdf")
-                    success = save_mcqs_to_pdf(generated_mcqs, output_pdf)
-                    if success:
-                        print(f" -> Successfully saved MCQs for Week {week} to {output_pdf}")
-                    else:
-                        print(f"   -> Failed to save PDF for Week {week} due to errors.")
-                        all_successful = False
-                else:
-                    print(f"   -> No MCQs generated or an error occurred during generation for Week {week}.")
-                    all_successful = False
-            else:
-                print(f"   -> Could not read text from {pdf_file}.")
+            if not generate_week(week, WEEKLY_PDF_DIR, MCQ_OUTPUT_DIR):
                 all_successful = False
 
         print("\nMCQ PDF generation process complete.")
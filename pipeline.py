@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# --- Configuration ---
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+PIPELINE_STATE_FILE = os.path.join(BASE_DIR, '.pipeline_state.json')
+SOURCE_PDF_PATH = os.path.join(BASE_DIR, '102104086 .pdf') # Same source as create.py
+WEEKLY_PDF_DIR = os.path.join(BASE_DIR, 'weekly_pdfs')
+MCQ_PDF_DIR = os.path.join(BASE_DIR, 'mcq_pdfs')
+FILTERED_PDF_DIR = os.path.join(BASE_DIR, 'filtered_mcq_pdfs')
+PARSED_DATA_DIR = os.path.join(BASE_DIR, 'data')
+TOTAL_WEEKS = 12
+STAGES = ('split', 'generate', 'filter', 'preprocess')
+
+# Source files whose contents are part of a stage's fingerprint: editing the parser re-runs
+# preprocessing. 'generate' is deliberately left out - regenerating through the Gemini API is
+# slow, paid and non-deterministic, so only a changed week_N.pdf triggers it.
+STAGE_CODE = {
+    'split': ['create.py'],
+    'generate': [],
+    'filter': ['filter.py'],
+    'preprocess': ['preprocess_mcqs.py', os.path.join('utils', 'mcq_parser.py'), 'grounding.py'],
+}
+# Stages whose existing outputs are adopted on a first run whatever their mtimes. A fresh clone
+# checks files out in no particular order, so committed MCQ PDFs can look older than the notes
+# they were generated from; regenerating them all would overwrite them through the paid API.
+ADOPT_EXISTING = frozenset(('generate',))
+# --- End Configuration ---
+
+class Task:
+    """One node of the pipeline graph: a stage for one week (or all weeks, for 'split')."""
+
+    def __init__(self, stage, week, inputs, outputs, deps):
+        self.stage = stage
+        self.week = week
+        self.name = stage if week is None else f"{stage}:{week}"
+        self.inputs = inputs
+        self.outputs = outputs
+        self.deps = deps
+
+def build_graph(weeks, stages, dirs):
+    """
+    Builds the task graph: split -> generate(week) -> {filter(week), preprocess(week)}.
+    Dependencies on stages that were not selected are dropped (their outputs are treated as given).
+    """
+    tasks = {}
+    if 'split' in stages:
+        tasks['split'] = Task('split', None, [dirs['source_pdf']],
+                              [os.path.join(dirs['weekly'], f"week_{w}.pdf") for w in range(1, TOTAL_WEEKS + 1)], [])
+    for week in weeks:
+        notes_pdf = os.path.join(dirs['weekly'], f"week_{week}.pdf")
+        mcq_pdf = os.path.join(dirs['mcq'], f"week_{week}_mcqs.pdf")
+        if 'generate' in stages:
+            tasks[f"generate:{week}"] = Task('generate', week, [notes_pdf], [mcq_pdf],
+                                             [d for d in ('split',) if d in tasks])
+        upstream = [f"generate:{week}"] if f"generate:{week}" in tasks else []
+        if 'filter' in stages:
+            tasks[f"filter:{week}"] = Task('filter', week, [mcq_pdf],
+                                           [os.path.join(dirs['filtered'], f"week_{week}_mcqs_filtered.pdf")], upstream)
+        if 'preprocess' in stages:
+            tasks[f"preprocess:{week}"] = Task('preprocess', week, [mcq_pdf],
+                                               [os.path.join(dirs['data'], f"week_{week}_questions.json")], upstream)
+    return tasks
+
+# --- Fingerprints ---
+_hash_cache = {}
+
+def file_digest(path):
+    """sha256 of a file, memoised on (size, mtime) so unchanged files are hashed once per run."""
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    digest = _hash_cache.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = _hash_cache[key] = h.hexdigest()
+    return digest
+
+def task_fingerprint(task):
+    """Fingerprint of a task's inputs and stage code, or None if an input is missing."""
+    h = hashlib.sha256(task.name.encode('utf-8'))
+    for path in task.inputs + [os.path.join(BASE_DIR, p) for p in STAGE_CODE[task.stage]]:
+        if not os.path.exists(path):
+            return None
+        h.update(path.encode('utf-8'))
+        h.update(file_digest(path).encode('ascii'))
+    return h.hexdigest()
+
+def is_up_to_date(task, fingerprint, state):
+    """
+    A task is up to date when its recorded fingerprint matches and its outputs are unchanged.
+    With no record yet (first pipeline run over existing files), outputs newer than every
+    input are adopted as up to date, like make; for ADOPT_EXISTING stages any existing outputs are.
+    """
+    if not all(os.path.exists(p) for p in task.outputs):
+        return False
+    record = state.get(task.name)
+    if record is None:
+        if task.stage in ADOPT_EXISTING:
+            return True
+        newest_input = max(os.path.getmtime(p) for p in task.inputs)
+        return all(os.path.getmtime(p) >= newest_input for p in task.outputs)
+    if record.get('fingerprint') != fingerprint:
+        return False
+    return all(record.get('outputs', {}).get(p) == file_digest(p) for p in task.outputs)
+
+def load_state(path=PIPELINE_STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable pipeline state '{path}': {e}")
+        return {}
+
+def save_state(state, path=PIPELINE_STATE_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# --- Stage execution (runs in worker processes) ---
+def run_stage(stage, week, dirs):
+    """Runs one stage for one week. Returns (success, error message or None, seconds)."""
+    started = time.perf_counter()
+    ok, error = _run_stage(stage, week, dirs)
+    return ok, error, time.perf_counter() - started
+
+def _run_stage(stage, week, dirs):
+    try:
+        if stage == 'split':
+            import create
+            ok = create.split_pdf_by_week(dirs['source_pdf'], create.WEEK_START_PAGES_1_BASED, dirs['weekly'])
+        elif stage == 'generate':
+            import nlp
+            os.makedirs(dirs['mcq'], exist_ok=True)
+            ok = nlp.generate_week(week, dirs['weekly'], dirs['mcq'])
+        elif stage == 'filter':
+            import filter as mcq_filter
+            os.makedirs(dirs['filtered'], exist_ok=True)
+            ok = mcq_filter.process_pdf(os.path.join(dirs['mcq'], f"week_{week}_mcqs.pdf"),
+                                        os.path.join(dirs['filtered'], f"week_{week}_mcqs_filtered.pdf"))
+        elif stage == 'preprocess':
+            import preprocess_mcqs
+            os.makedirs(dirs['data'], exist_ok=True)
+            ok = preprocess_mcqs.preprocess_week(week, dirs['mcq'], dirs['data'], weekly_pdf_dir=dirs['weekly'])
+        else:
+            return False, f"Unknown stage '{stage}'"
+        return bool(ok), None if ok else "stage reported failure"
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}"
+
+# --- Scheduler ---
+def run_pipeline(tasks, dirs, jobs=None, force=False, dry_run=False):
+    """
+    Runs the task graph on a process pool. Each task starts as soon as its dependencies are
+    done, so independent weeks proceed concurrently; a failed task only blocks its own
+    dependents. Returns {task name: (status, seconds, error)}.
+    Statuses: done, up-to-date, would-run (dry run), failed, blocked.
+    """
+    state = load_state()
+    results = {}
+    pending = dict(tasks)
+    running = {}
+    satisfied = ('done', 'up-to-date', 'would-run')
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name, task in list(pending.items()):
+                dep_status = [results.get(d, (None,))[0] for d in task.deps]
+                if any(s in ('failed', 'blocked') for s in dep_status):
+                    results[name] = ('blocked', 0.0, f"dependency failed: {', '.join(task.deps)}")
+                    del pending[name]
+                    continue
+                if not all(s in satisfied for s in dep_status):
+                    continue
+                del pending[name]
+                if dry_run and 'would-run' in dep_status:
+                    results[name] = ('would-run', 0.0, None)
+                    continue
+                fingerprint = task_fingerprint(task)
+                if fingerprint is None:
+                    missing = [p for p in task.inputs if not os.path.exists(p)]
+                    results[name] = ('failed', 0.0, f"missing input: {', '.join(missing)}")
+                elif not force and is_up_to_date(task, fingerprint, state):
+                    results[name] = ('up-to-date', 0.0, None)
+                    if name not in state:
+                        state[name] = {"fingerprint": fingerprint, "outputs": {p: file_digest(p) for p in task.outputs}}
+                elif dry_run:
+                    results[name] = ('would-run', 0.0, None)
+                else:
+                    future = pool.submit(run_stage, task.stage, task.week, dirs)
+                    running[future] = (name, fingerprint)
+
+            if not running:
+                if pending and not any(all(results.get(d, (None,))[0] is not None for d in t.deps) for t in pending.values()):
+                    for name in pending:
+                        results[name] = ('blocked', 0.0, "unresolvable dependencies")
+                    pending.clear()
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fingerprint = running.pop(future)
+                ok, error, elapsed = future.result()
+                task = tasks[name]
+                if ok and all(os.path.exists(p) for p in task.outputs):
+                    results[name] = ('done', elapsed, None)
+                    state[name] = {"fingerprint": fingerprint, "outputs": {p: file_digest(p) for p in task.outputs}}
+                    save_state(state)
+                else:
+                    results[name] = ('failed', elapsed, error or "outputs missing after run")
+                    state.pop(name, None)
+
+    if not dry_run:
+        save_state(state)
+    return results
+
+def print_summary(tasks, results, wall_time):
+    print("\n--- Pipeline Summary ---")
+    for name in tasks:
+        status, seconds, error = results.get(name, ('blocked', 0.0, None))
+        line = f"{name:16s} {status:11s} {seconds:7.1f}s"
+        if error:
+            line += f"  ({error})"
+        print(line)
+    print(f"Wall time: {wall_time:.1f}s, sum of task times: {sum(r[1] for r in results.values()):.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run create -> nlp -> filter -> preprocess as a per-week dependency graph.")
+    parser.add_argument('--weeks', type=int, nargs='+', default=list(range(1, TOTAL_WEEKS + 1)), help="Weeks to build (default: all).")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help="Stages to include (default: all).")
+    parser.add_argument('--jobs', '-j', type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument('--force', action='store_true', help="Re-run selected tasks even if up to date.")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would run.")
+    parser.add_argument('--source-pdf', default=SOURCE_PDF_PATH, help="Full course PDF for the split stage.")
+    args = parser.parse_args()
+
+    stages = list(args.stages)
+    if 'split' in stages and not os.path.exists(args.source_pdf):
+        # Weekly PDFs are usually committed; without the source there is nothing to split
+        print(f"Note: source PDF '{args.source_pdf}' not found; using existing weekly PDFs.")
+        stages.remove('split')
+
+    dirs = {"source_pdf": os.path.abspath(args.source_pdf), "weekly": WEEKLY_PDF_DIR, "mcq": MCQ_PDF_DIR,
+            "filtered": FILTERED_PDF_DIR, "data": PARSED_DATA_DIR}
+    tasks = build_graph(args.weeks, stages, dirs)
+    started = time.perf_counter()
+    results = run_pipeline(tasks, dirs, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    print_summary(tasks, results, time.perf_counter() - started)
+    sys.exit(1 if any(r[0] in ('failed', 'blocked') for r in results.values()) else 0)
@@ -1,14 +1,48 @@
+import argparse
 import os
 import json
-from utils.mcq_parser import parse_mcq_pdf # Assuming mcq_parser.py is in utils folder
+from utils.mcq_parser import parse_mcq_pdf, PARSER_MODES # Assuming mcq_parser.py is in utils folder
+import grounding
 
 # --- Configuration ---
 MCQ_PDF_DIR = 'mcq_pdfs' # Directory containing week_1_mcqs.pdf etc.
 PARSED_DATA_DIR = 'data' # Directory to save parsed JSON question files
+WEEKLY_PDF_DIR = 'weekly_pdfs' # Notes the MCQs were generated from, for the grounding check
 TOTAL_WEEKS = 12
 # --- End Configuration ---
 
-def run_mcq_preprocessing():
+def preprocess_week(week, mcq_pdf_dir=MCQ_PDF_DIR, parsed_data_dir=PARSED_DATA_DIR, mode='layout',
+                    weekly_pdf_dir=WEEKLY_PDF_DIR, drop_unsupported=False):
+    """
+    Parses week_N_mcqs.pdf and writes week_N_questions.json.
+    `mode` selects the parser ('layout' or 'text', see utils.mcq_parser).
+    Questions whose stem or answer is not found in weekly_pdf_dir/week_N.pdf are reported
+    (see grounding.py) and left out when `drop_unsupported` is set; weekly_pdf_dir=None skips the check.
+    Returns True if the JSON file was written.
+    """
+    mcq_pdf_path = os.path.join(mcq_pdf_dir, f"week_{week}_mcqs.pdf")
+    print(f"Processing: {mcq_pdf_path}")
+
+    parsed_mcqs = parse_mcq_pdf(mcq_pdf_path, mode)
+    if not parsed_mcqs:
+        print(f" -> Failed to parse MCQs for Week {week} or PDF not found/empty.")
+        return False
+    if weekly_pdf_dir:
+        parsed_mcqs = grounding.verify_week(week, parsed_mcqs, weekly_pdf_dir, drop=drop_unsupported)
+
+    json_output_path = os.path.join(parsed_data_dir, f"week_{week}_questions.json")
+    try:
+        # Ensure questions are sorted by original number before saving
+        parsed_mcqs.sort(key=lambda x: x.get('question_number', float('inf')))
+        with open(json_output_path, 'w', encoding='utf-8') as f:
+            json.dump(parsed_mcqs, f, indent=2, ensure_ascii=False)
+        print(f" -> Successfully parsed {len(parsed_mcqs)} MCQs and saved to {json_output_path}")
+        return True
+    except Exception as e:
+        print(f" -> Error saving JSON for Week {week}: {e}")
+        return False
+
+def run_mcq_preprocessing(mode='layout', weekly_pdf_dir=WEEKLY_PDF_DIR, drop_unsupported=False):
     if not os.path.exists(MCQ_PDF_DIR):
         print(f"Error: MCQ PDF directory '{MCQ_PDF_DIR}' not found.")
         return
@@ -24,24 +58,7 @@ def run_mcq_preprocessing():
     print("\n--- Starting MCQ PDF Parsing ---")
     all_successful = True
     for week in range(1, TOTAL_WEEKS + 1):
-        mcq_pdf_path = os.path.join(MCQ_PDF_DIR, f"week_{week}_mcqs.pdf")
-        print(f"Processing: {mcq_pdf_path}")
-
-        parsed_mcqs = parse_mcq_pdf(mcq_pdf_path)
-
-        if parsed_mcqs:
-            json_output_path = os.path.join(PARSED_DATA_DIR, f"week_{week}_questions.json")
-            try:
-                # Ensure questions are sorted by original number before saving
-                parsed_mcqs.sort(key=lambda x: x.get('question_number', float('inf')))
-                with open(json_output_path, 'w', encoding='utf-8') as f:
-                    json.dump(parsed_mcqs, f, indent=2, ensure_ascii=False)
-                print(f" -> Successfully parsed {len(parsed_mcqs)} MCQs and saved to {json_output_path}")
-            except Exception as e:
-                print(f" -> Error saving JSON for Week {week}: {e}")
-                all_successful = False
-        else:
-            print(f" -> Failed to parse MCQs for Week {week} or PDF not found/empty.")
+        if not preprocess_week(week, MCQ_PDF_DIR, PARSED_DATA_DIR, mode, weekly_pdf_dir, drop_unsupported):
             all_successful = False
 
     print("\n--- MCQ PDF Parsing Complete ---")
@@ -49,4 +66,11 @@ def run_mcq_preprocessing():
         print("*** WARNING: Errors occurred during parsing. Some JSON files may be missing or incomplete. ***")
 
 if __name__ == "__main__":
-    run_mcq_preprocessing()
+    parser = argparse.ArgumentParser(description="Parse the weekly MCQ PDFs into data/week_N_questions.json.")
+    parser.add_argument('--parser', choices=PARSER_MODES, default='layout',
+                        help="'layout' reads span positions and fonts (keeps wrapped lines); 'text' is the original regex parser.")
+    parser.add_argument('--no-grounding', action='store_true', help="Skip checking questions against the weekly notes.")
+    parser.add_argument('--drop-unsupported', action='store_true',
+                        help="Leave out questions whose stem or answer is not supported by the notes (default: only report them).")
+    args = parser.parse_args()
+    run_mcq_preprocessing(args.parser, None if args.no_grounding else WEEKLY_PDF_DIR, args.drop_unsupported)
@@ -0,0 +1,210 @@
+import hashlib
+from database import db
+from models import QuizAttempt, AnswerLog, WeekStat, QuestionStat, LeaderboardTotal, ScoreBucket, DEFAULT_COURSE_SLUG
+from leaderboard import apply_best_changes
+
+# Pre-aggregated progress statistics.
+# WeekStat holds one row per (user, course, week) and QuestionStat one row per (course, week, question),
+# both updated incrementally inside the same transaction that saves a QuizAttempt.
+# Reading a user's summary is therefore O(weeks), however many attempts they have logged.
+# Changes to a user's best percentage are passed on to the leaderboards (leaderboard.py).
+# Adaptive attempts are scored on a different, shorter test, so they only feed QuestionStat:
+# they are left out of WeekStat (attempt counts, averages, best scores) and the leaderboards.
+
+def question_key(question_text):
+    """Stable key for a question, derived from its text (sha1 hex digest)."""
+    return hashlib.sha1((question_text or "").encode('utf-8')).hexdigest()
+
+def percentage(score, total):
+    """Whole-number percentage, rounded the same way as /api/progress."""
+    return round((score / total) * 100) if total > 0 else 0
+
+def record_attempt_stats(user_id, week_number, score, total_questions, results_log, timestamp,
+                         course_slug=DEFAULT_COURSE_SLUG, adaptive=False):
+    """
+    Folds one graded attempt into WeekStat and QuestionStat.
+
+    Must be called inside the caller's transaction (after the QuizAttempt is added,
+    before commit) so the attempt and its aggregates are committed or rolled back together.
+
+    Args:
+        user_id (int): Owner of the attempt.
+        week_number (int): Week the quiz was taken for.
+        score (int): Number of correct answers.
+        total_questions (int): Number of questions served.
+        results_log (list): Graded items as built by submit_quiz
+                            (needs 'question_text' and 'is_correct').
+        timestamp (datetime): Time the attempt was saved.
+        course_slug (str): Course the week belongs to.
+        adaptive (bool): An adaptive attempt; only its per-question counts are recorded.
+    """
+    if not adaptive:
+        stat = WeekStat.query.filter_by(user_id=user_id, course_slug=course_slug,
+                                        week_number=week_number).with_for_update().first()
+        if stat is None:
+            stat = _new_week_stat(user_id, course_slug, week_number)
+        old_best = stat.best_percentage if stat.attempt_count else None
+        _fold_attempt(stat, score, total_questions, timestamp)
+        if stat.best_percentage != old_best:
+            apply_best_changes({(user_id, course_slug, week_number): (old_best, stat.best_percentage)})
+
+    # One set-based lookup for all questions in the attempt
+    answered = {}
+    for item in results_log:
+        key = question_key(item["question_text"])
+        entry = answered.setdefault(key, {"text": item["question_text"], "answered": 0, "correct": 0})
+        entry["answered"] += 1
+        entry["correct"] += 1 if item["is_correct"] else 0
+    _fold_questions(course_slug, week_number, answered)
+
+def record_attempt_batch(attempts, question_counts):
+    """
+    Folds many graded attempts at once (bulk imports). Same effect as calling
+    record_attempt_stats for each attempt in timestamp order, but with one WeekStat lookup
+    per batch of users and one QuestionStat lookup per course week. No commit.
+
+    Args:
+        attempts (list): (user_id, course_slug, week_number, score, total_questions, timestamp) tuples.
+        question_counts (dict): {(course_slug, week_number, question_text): (times_answered, times_correct)}.
+    """
+    user_ids = sorted({a[0] for a in attempts})
+    stats = {}
+    for i in range(0, len(user_ids), 500): # Stay under SQLite's bound-parameter limit
+        for stat in WeekStat.query.filter(WeekStat.user_id.in_(user_ids[i:i + 500])).with_for_update():
+            stats[(stat.user_id, stat.course_slug, stat.week_number)] = stat
+    old_best = {}
+    for user_id, course_slug, week_number, score, total_questions, timestamp in sorted(attempts, key=lambda a: a[5]):
+        key = (user_id, course_slug, week_number)
+        stat = stats.get(key)
+        if stat is None:
+            stat = stats[key] = _new_week_stat(user_id, course_slug, week_number)
+        if key not in old_best:
+            old_best[key] = stat.best_percentage if stat.attempt_count else None
+        _fold_attempt(stat, score, total_questions, timestamp)
+    apply_best_changes({key: (old, stats[key].best_percentage) for key, old in old_best.items()
+                        if stats[key].best_percentage != old})
+
+    by_week = {}
+    for (course_slug, week_number, text), (n_answered, n_correct) in question_counts.items():
+        entry = by_week.setdefault((course_slug, week_number), {}).setdefault(
+            question_key(text), {"text": text, "answered": 0, "correct": 0})
+        entry["answered"] += n_answered
+        entry["correct"] += n_correct
+    for (course_slug, week_number), answered in by_week.items():
+        _fold_questions(course_slug, week_number, answered)
+
+def _new_week_stat(user_id, course_slug, week_number):
+    stat = WeekStat(user_id=user_id, course_slug=course_slug, week_number=week_number, attempt_count=0,
+                    score_sum=0, question_sum=0, best_score=0, best_total=0, best_percentage=0)
+    db.session.add(stat)
+    return stat
+
+def _fold_attempt(stat, score, total_questions, timestamp):
+    pct = percentage(score, total_questions)
+    stat.attempt_count += 1
+    stat.score_sum += score
+    stat.question_sum += total_questions
+    if stat.attempt_count == 1 or pct > stat.best_percentage:
+        stat.best_score, stat.best_total, stat.best_percentage = score, total_questions, pct
+    stat.previous_percentage = stat.last_percentage
+    stat.last_percentage = pct
+    stat.last_attempt_at = timestamp
+
+def _fold_questions(course_slug, week_number, answered):
+    """Adds {question_key: {"text", "answered", "correct"}} counts to QuestionStat for one course week."""
+    if not answered:
+        return
+    existing = {qs.question_key: qs for qs in QuestionStat.query.filter(
+        QuestionStat.course_slug == course_slug,
+        QuestionStat.week_number == week_number,
+        QuestionStat.question_key.in_(list(answered.keys()))).with_for_update().all()}
+    for key, entry in answered.items():
+        qs = existing.get(key)
+        if qs is None:
+            qs = QuestionStat(course_slug=course_slug, week_number=week_number, question_key=key, question_text=entry["text"],
+                              times_answered=0, times_correct=0)
+            db.session.add(qs)
+        qs.times_answered += entry["answered"]
+        qs.times_correct += entry["correct"]
+
+def get_week_summary(user_id):
+    """
+    Returns the per-week progress summary for a user, ordered by course and week.
+    Each entry has attempts, best, average, last and trend (last minus previous percentage).
+    """
+    stats = WeekStat.query.filter_by(user_id=user_id).order_by(WeekStat.course_slug, WeekStat.week_number).all()
+    return summarize_week_stats(stats)
+
+def summarize_week_stats(stats):
+    """Formats WeekStat rows as get_week_summary() entries (also used by the async views in asgi.py)."""
+    summary = []
+    for stat in stats:
+        trend = None
+        if stat.previous_percentage is not None and stat.last_percentage is not None:
+            trend = stat.last_percentage - stat.previous_percentage
+        summary.append({
+            "course": stat.course_slug,
+            "week": stat.week_number,
+            "attempts": stat.attempt_count,
+            "best_score": stat.best_score,
+            "best_total": stat.best_total,
+            "best_percentage": stat.best_percentage,
+            "average_percentage": percentage(stat.score_sum, stat.question_sum),
+            "last_percentage": stat.last_percentage,
+            "trend": trend,
+            "last_attempt": stat.last_attempt_at.strftime("%Y-%m-%d %H:%M:%S UTC") if stat.last_attempt_at else None
+        })
+    return summary
+
+def get_question_stats(week_number, course_slug=DEFAULT_COURSE_SLUG):
+    """Returns per-question accuracy for a course week, hardest questions first."""
+    stats = QuestionStat.query.filter_by(course_slug=course_slug, week_number=week_number).all()
+    rows = [{
+        "question_key": qs.question_key,
+        "question_text": qs.question_text,
+        "times_answered": qs.times_answered,
+        "times_correct": qs.times_correct,
+        "accuracy": percentage(qs.times_correct, qs.times_answered)
+    } for qs in stats]
+    rows.sort(key=lambda r: (r["accuracy"], -r["times_answered"]))
+    return rows
+
+def rebuild_progress_stats(archive_dir=None):
+    """
+    Recomputes WeekStat and QuestionStat from scratch out of QuizAttempt/AnswerLog.
+    Needed once for databases that already held attempts before the aggregates existed (or
+    before they were keyed by course): the tables are dropped and recreated with the current schema.
+    Attempts moved out by archive_attempts.py are replayed from the archive partitions first.
+    The leaderboard tables are rebuilt along the way.
+    Returns the number of attempts folded in.
+    """
+    from datetime import datetime
+    from archive_attempts import iter_archived_attempts, ARCHIVE_DIR
+    for table in (WeekStat.__table__, QuestionStat.__table__, LeaderboardTotal.__table__, ScoreBucket.__table__):
+        table.drop(db.engine, checkfirst=True)
+        table.create(db.engine)
+    count = 0
+    for record in iter_archived_attempts(archive_dir or ARCHIVE_DIR):
+        record_attempt_stats(record["user_id"], record["week_number"], record["score"], record["total_questions"],
+                             record["answers"], datetime.fromisoformat(record["timestamp"]), record["course_slug"],
+                             adaptive=record.get("ability") is not None)
+        db.session.flush()
+        count += 1
+    attempt_ids = [row.id for row in db.session.query(QuizAttempt.id).order_by(QuizAttempt.timestamp, QuizAttempt.id)]
+    for attempt_id in attempt_ids:
+        attempt = db.session.get(QuizAttempt, attempt_id)
+        results_log = [{"question_text": a.question_text, "is_correct": a.is_correct}
+                       for a in AnswerLog.query.filter_by(attempt_id=attempt.id)]
+        record_attempt_stats(attempt.user_id, attempt.week_number, attempt.score,
+                             attempt.total_questions, results_log, attempt.timestamp, attempt.course_slug,
+                             adaptive=attempt.is_adaptive)
+        db.session.flush()
+        count += 1
+    db.session.commit()
+    return count
+
+if __name__ == "__main__":
+    from app import app
+    with app.app_context():
+        rebuilt = rebuild_progress_stats()
+        print(f"Rebuilt progress statistics from {rebuilt} attempts.")
@@ -0,0 +1,225 @@
+import argparse
+import json
+import logging
+import math
+from datetime import datetime
+from sqlalchemy import select
+from database import db
+from models import QuizAttempt, AnswerLog, QuestionAnalytics, AnalyticsState
+from progress_stats import question_key
+
+# Batch per-question analytics over AnswerLog.
+# Streams new AnswerLog rows (id above the stored high-water mark) in fixed-size chunks,
+# folds them into additive sufficient statistics per question, and commits each chunk together
+# with the new high-water mark. Memory is bounded by the chunk size, and an interrupted or
+# nightly run resumes where the last committed chunk stopped.
+# The high-water mark assumes AnswerLog ids become visible in id order. That holds on SQLite,
+# which has a single writer and never reuses ids (the table is AUTOINCREMENT). It does not hold
+# on MySQL or Postgres: a transaction holding a lower id can commit after a higher id has been
+# processed, and those answers would be skipped until a --full run. Run this only while no
+# attempts are being saved there, or follow each run with --full periodically.
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = 'question_analytics'
+DEFAULT_CHUNK_SIZE = 5000
+
+# Thresholds used when flagging questions in the report
+TOO_EASY_DIFFICULTY = 0.90
+TOO_HARD_DIFFICULTY = 0.20
+LOW_DISCRIMINATION = 0.10
+MIN_ANSWERS_FOR_FLAGS = 30
+
+def _new_accumulator(course_slug, week_number, question_text):
+    return {"course": course_slug, "week": week_number, "text": question_text, "n": 0, "correct": 0, "unanswered": 0,
+            "broken": 0, "options": [], "rest": 0.0, "rest_sq": 0.0, "correct_rest": 0.0}
+
+def _add_counts(target, counts):
+    """Element-wise adds option counts, growing the target list as needed."""
+    if len(target) < len(counts):
+        target.extend([0] * (len(counts) - len(target)))
+    for i, c in enumerate(counts):
+        target[i] += c
+
+def point_biserial(n, n_correct, rest_sum, rest_sq_sum, correct_rest_sum):
+    """
+    Point-biserial correlation between item correctness and rest score,
+    computed from the stored sums. Returns None when either variance is zero.
+    """
+    if n < 2:
+        return None
+    var_x = n * n_correct - n_correct * n_correct
+    var_s = n * rest_sq_sum - rest_sum * rest_sum
+    if var_x <= 0 or var_s <= 0:
+        return None
+    return (n * correct_rest_sum - n_correct * rest_sum) / math.sqrt(var_x * var_s)
+
+def _fetch_chunk(high_water_mark, chunk_size):
+    stmt = (select(AnswerLog.id, AnswerLog.question_text, AnswerLog.selected_option_index,
+                   AnswerLog.correct_option_index, AnswerLog.is_correct,
+                   QuizAttempt.course_slug, QuizAttempt.week_number, QuizAttempt.score)
+            .join(QuizAttempt, AnswerLog.attempt_id == QuizAttempt.id)
+            .where(AnswerLog.id > high_water_mark)
+            .order_by(AnswerLog.id)
+            .limit(chunk_size)
+            .execution_options(stream_results=True, yield_per=chunk_size))
+    return db.session.execute(stmt)
+
+def _accumulate(rows):
+    """Folds a chunk of joined rows into per-question accumulators. Returns (accumulators, last_id, row_count)."""
+    acc = {}
+    last_id = None
+    count = 0
+    for row in rows:
+        count += 1
+        last_id = row.id
+        key = (row.course_slug, row.week_number, question_key(row.question_text))
+        a = acc.get(key)
+        if a is None:
+            a = acc[key] = _new_accumulator(row.course_slug, row.week_number, row.question_text)
+        x = 1 if row.is_correct else 0
+        rest = row.score - x
+        a["n"] += 1
+        a["correct"] += x
+        a["rest"] += rest
+        a["rest_sq"] += rest * rest
+        a["correct_rest"] += rest * x
+        if row.correct_option_index is None or row.correct_option_index < 0:
+            a["broken"] += 1
+        if row.selected_option_index is None:
+            a["unanswered"] += 1
+        elif row.selected_option_index >= 0:
+            options = a["options"]
+            if len(options) <= row.selected_option_index:
+                options.extend([0] * (row.selected_option_index + 1 - len(options)))
+            options[row.selected_option_index] += 1
+    return acc, last_id, count
+
+def _merge(acc, now):
+    """Merges chunk accumulators into QuestionAnalytics rows (one lookup per course week)."""
+    by_week = {}
+    for (course, week, key), a in acc.items():
+        by_week.setdefault((course, week), {})[key] = a
+
+    for (course, week), items in by_week.items():
+        existing = {qa.question_key: qa for qa in QuestionAnalytics.query.filter(
+            QuestionAnalytics.course_slug == course,
+            QuestionAnalytics.week_number == week,
+            QuestionAnalytics.question_key.in_(list(items.keys())))}
+        for key, a in items.items():
+            qa = existing.get(key)
+            if qa is None:
+                qa = QuestionAnalytics(course_slug=course, week_number=week, question_key=key, question_text=a["text"],
+                                       n_answers=0, n_correct=0, n_unanswered=0, n_broken=0,
+                                       option_counts='[]', rest_sum=0.0, rest_sq_sum=0.0, correct_rest_sum=0.0)
+                db.session.add(qa)
+            qa.n_answers += a["n"]
+            qa.n_correct += a["correct"]
+            qa.n_unanswered += a["unanswered"]
+            qa.n_broken += a["broken"]
+            counts = json.loads(qa.option_counts or '[]')
+            _add_counts(counts, a["options"])
+            qa.option_counts = json.dumps(counts)
+            qa.rest_sum += a["rest"]
+            qa.rest_sq_sum += a["rest_sq"]
+            qa.correct_rest_sum += a["correct_rest"]
+            qa.difficulty = qa.n_correct / qa.n_answers if qa.n_answers else None
+            qa.discrimination = point_biserial(qa.n_answers, qa.n_correct, qa.rest_sum,
+                                               qa.rest_sq_sum, qa.correct_rest_sum)
+            qa.updated_at = now
+
+def run_question_analytics(chunk_size=DEFAULT_CHUNK_SIZE, full=False):
+    """
+    Processes all AnswerLog rows above the stored high-water mark.
+
+    Args:
+        chunk_size (int): Rows read, folded and committed per transaction.
+        full (bool): Discard existing results and recompute from the first row.
+
+    Returns:
+        int: Number of answer rows processed in this run.
+    """
+    state = db.session.get(AnalyticsState, JOB_NAME)
+    if state is None:
+        state = AnalyticsState(job_name=JOB_NAME, high_water_mark=0)
+        db.session.add(state)
+    if full:
+        # Recreated rather than emptied so the table always matches the current model
+        QuestionAnalytics.__table__.drop(db.engine, checkfirst=True)
+        QuestionAnalytics.__table__.create(db.engine)
+        state.high_water_mark = 0
+    db.session.commit()
+
+    processed = 0
+    while True:
+        hwm = state.high_water_mark
+        acc, last_id, count = _accumulate(_fetch_chunk(hwm, chunk_size))
+        if not count:
+            break
+        now = datetime.utcnow()
+        _merge(acc, now)
+        state.high_water_mark = last_id
+        state.updated_at = now
+        db.session.commit() # Results and high-water mark move together
+        processed += count
+        logger.info("question_analytics_progress", extra={"processed": processed, "high_water_mark": last_id})
+        if count < chunk_size:
+            break
+    return processed
+
+def question_report(week_number=None, course_slug=None):
+    """
+    Returns analytics rows with distractor rates and flags
+    ('broken', 'too_easy', 'too_hard', 'low_discrimination'), worst questions first.
+    """
+    query = QuestionAnalytics.query
+    if course_slug is not None:
+        query = query.filter_by(course_slug=course_slug)
+    if week_number is not None:
+        query = query.filter_by(week_number=week_number)
+    report = []
+    for qa in query.all():
+        counts = json.loads(qa.option_counts or '[]')
+        rates = [round(c / qa.n_answers, 3) if qa.n_answers else 0.0 for c in counts]
+        flags = []
+        if qa.n_broken:
+            flags.append('broken')
+        if qa.n_answers >= MIN_ANSWERS_FOR_FLAGS:
+            if qa.difficulty is not None and qa.difficulty >= TOO_EASY_DIFFICULTY:
+                flags.append('too_easy')
+            if qa.difficulty is not None and qa.difficulty <= TOO_HARD_DIFFICULTY:
+                flags.append('too_hard')
+            if qa.discrimination is not None and qa.discrimination < LOW_DISCRIMINATION:
+                flags.append('low_discrimination')
+        report.append({
+            "course": qa.course_slug,
+            "week": qa.week_number,
+            "question_key": qa.question_key,
+            "question_text": qa.question_text,
+            "answers": qa.n_answers,
+            "difficulty": round(qa.difficulty, 3) if qa.difficulty is not None else None,
+            "discrimination": round(qa.discrimination, 3) if qa.discrimination is not None else None,
+            "option_rates": rates,
+            "unanswered_rate": round(qa.n_unanswered / qa.n_answers, 3) if qa.n_answers else 0.0,
+            "flags": flags
+        })
+    report.sort(key=lambda r: (-len(r["flags"]), r["course"], r["week"], r["discrimination"] if r["discrimination"] is not None else 0.0))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-question analytics over AnswerLog (resumes from the last high-water mark).")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Answer rows per chunk/transaction.")
+    parser.add_argument('--full', action='store_true', help="Recompute everything from the first answer row.")
+    parser.add_argument('--report', type=int, metavar='WEEK', nargs='?', const=0,
+                        help="Print the flagged-question report (optionally for one week) after the run.")
+    parser.add_argument('--course', help="Limit the report to one course slug.")
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        total = run_question_analytics(chunk_size=args.chunk_size, full=args.full)
+        logger.info("question_analytics_complete", extra={"processed": total})
+        if args.report is not None:
+            for row in question_report(args.report or None, args.course):
+                if row["flags"]:
+                    print(json.dumps(row, ensure_ascii=False))
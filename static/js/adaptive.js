@@ -0,0 +1,119 @@
+// static/js/adaptive.js
+// Adaptive quiz: one question at a time; the server picks the next question from the answers so far.
+document.addEventListener('DOMContentLoaded', () => {
+    const quizContainer = document.getElementById('quiz-container');
+    const submitBtn = document.getElementById('submit-btn');
+    const statusElement = document.getElementById('adaptive-status');
+    const resultsContainer = document.getElementById('results-container');
+    const scoreElement = document.getElementById('score');
+    const errorMessageDiv = document.getElementById('error-message');
+    const detailedResultsList = document.getElementById('detailed-results-list');
+    let maxQuestions = null;
+
+    function postJson(url, body) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(body || {}),
+        }).then(response => {
+            if (!response.ok) {
+                return response.json().then(err => { throw new Error(err.error || `HTTP error! status: ${response.status}`) });
+            }
+            return response.json();
+        });
+    }
+
+    function escapeHtml(text) {
+        var map = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#039;'};
+        return String(text).replace(/[&<>"']/g, function(m) { return map[m]; });
+    }
+
+    function renderQuestion(question) {
+        quizContainer.innerHTML = `
+            <div class="question">
+                <p><strong>${question.position}. ${escapeHtml(question.question)}</strong></p>
+                <div class="options">
+                    ${question.options.map((option, optionIndex) => `
+                        <label>
+                            <input type="radio" name="adaptive-answer" value="${optionIndex}" required>
+                            <span>${escapeHtml(option)}</span>
+                        </label><br>
+                    `).join('')}
+                </div>
+            </div>
+        `;
+        statusElement.textContent = maxQuestions
+            ? `Question ${question.position} (at most ${maxQuestions})`
+            : `Question ${question.position}`;
+        submitBtn.style.display = 'block';
+        submitBtn.disabled = false;
+    }
+
+    function renderResults(result) {
+        quizContainer.style.display = 'none';
+        submitBtn.style.display = 'none';
+        statusElement.textContent = result.message;
+        scoreElement.textContent = `Your score: ${result.score} / ${result.total_questions} ` +
+            `(estimated level ${result.ability.toFixed(2)} ± ${result.standard_error.toFixed(2)})`;
+        const letters = ['A', 'B', 'C', 'D'];
+        detailedResultsList.innerHTML = '';
+        result.results.forEach((item, index) => {
+            const li = document.createElement('li');
+            li.classList.add('result-item');
+            if (!item.is_correct) li.classList.add('incorrect-result');
+            li.innerHTML = `<p><strong>${index + 1}. ${escapeHtml(item.question_text)}</strong></p>`;
+            const optionsUl = document.createElement('ul');
+            optionsUl.classList.add('result-options');
+            (item.options || []).forEach((option, optionIndex) => {
+                const optionLi = document.createElement('li');
+                optionLi.innerHTML = `${letters[optionIndex] ? letters[optionIndex] + '. ' : ''}${escapeHtml(option)}`;
+                if (optionIndex === item.correct_option_index) {
+                    optionLi.classList.add('correct-answer');
+                    optionLi.innerHTML += ' ✔️ (Correct)';
+                }
+                if (optionIndex === item.selected_option_index) {
+                    optionLi.classList.add('user-answer');
+                    if (!item.is_correct) optionLi.innerHTML += ' ❌ (Your Answer)';
+                }
+                optionsUl.appendChild(optionLi);
+            });
+            li.appendChild(optionsUl);
+            detailedResultsList.appendChild(li);
+        });
+        resultsContainer.style.display = 'block';
+    }
+
+    postJson(adaptiveStartUrl)
+        .then(data => {
+            maxQuestions = data.max_questions;
+            renderQuestion(data.question);
+        })
+        .catch(error => {
+            console.error('Error starting adaptive quiz:', error);
+            quizContainer.innerHTML = `<p>Failed to start the adaptive quiz for Week ${currentWeekNumber}.</p>`;
+            errorMessageDiv.textContent = `Error: ${error.message}`;
+        });
+
+    submitBtn.addEventListener('click', () => {
+        const selectedOption = quizContainer.querySelector('input[name="adaptive-answer"]:checked');
+        errorMessageDiv.textContent = '';
+        if (!selectedOption) {
+            errorMessageDiv.textContent = 'Please choose an answer.';
+            return;
+        }
+        submitBtn.disabled = true;
+        postJson(adaptiveAnswerUrl, { selected: parseInt(selectedOption.value, 10) })
+            .then(result => {
+                if (result.finished) {
+                    renderResults(result);
+                } else {
+                    renderQuestion(result.question);
+                }
+            })
+            .catch(error => {
+                console.error('Error submitting answer:', error);
+                errorMessageDiv.textContent = `Submission failed: ${error.message}`;
+                submitBtn.disabled = false;
+            });
+    });
+});
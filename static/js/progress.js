@@ -3,7 +3,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const errorMessageDiv = document.getElementById('error-message');
     errorMessageDiv.textContent = ''; // Clear error
 
-    fetch('/api/progress')
+    // Pre-aggregated per-week summary: cost does not grow with the number of attempts
+    fetch('/api/progress/summary')
         .then(response => {
              if (!response.ok) {
                  return response.json().then(err => { throw new Error(err.error || `HTTP error! status: ${response.status}`) });
@@ -20,23 +21,33 @@ document.addEventListener('DOMContentLoaded', () => {
                  return;
             }
 
+            // Only show the course column once attempts span more than one course
+            const multiCourse = new Set(data.map(week => week.course)).size > 1;
             const table = document.createElement('table');
             table.innerHTML = `
                 <thead>
                     <tr>
+                        ${multiCourse ? '<th>Course</th>' : ''}
                         <th>Week</th>
-                        <th>Score</th>
-                        <th>Percentage</th>
-                        <th>Timestamp</th>
+                        <th>Attempts</th>
+                        <th>Best</th>
+                        <th>Average</th>
+                        <th>Last</th>
+                        <th>Trend</th>
+                        <th>Last Attempt</th>
                     </tr>
                 </thead>
                 <tbody>
-                    ${data.map(attempt => `
+                    ${data.map(week => `
                         <tr>
-                            <td>${attempt.week}</td>
-                            <td>${attempt.score} / ${attempt.total}</td>
-                            <td>${attempt.percentage}%</td>
-                            <td>${attempt.timestamp}</td>
+                            ${multiCourse ? `<td>${escapeHtml(week.course)}</td>` : ''}
+                            <td>${week.week}</td>
+                            <td>${week.attempts}</td>
+                            <td>${week.best_score} / ${week.best_total} (${week.best_percentage}%)</td>
+                            <td>${week.average_percentage}%</td>
+                            <td>${week.last_percentage}%</td>
+                            <td>${formatTrend(week.trend)}</td>
+                            <td>${week.last_attempt}</td>
                         </tr>
                     `).join('')}
                 </tbody>
@@ -48,4 +59,17 @@ document.addEventListener('DOMContentLoaded', () => {
             progressList.innerHTML = '<p>Failed to load progress. Please try again later.</p>';
             errorMessageDiv.textContent = `Error: ${error.message}`;
         });
+
+    function escapeHtml(text) {
+        var map = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#039;'};
+        const strText = String(text); // Ensure it's a string
+        return strText.replace(/[&<>"']/g, function(m) { return map[m]; });
+    }
+
+    function formatTrend(trend) {
+        if (trend === null || trend === undefined) return '-';
+        if (trend > 0) return `▲ +${trend}%`;
+        if (trend < 0) return `▼ ${trend}%`;
+        return '= 0%';
+    }
 });
\ No newline at end of file
@@ -18,7 +18,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     console.log(`Workspaceing quiz for week ${currentWeekNumber}`);
 
-    fetch(`/api/quiz/${currentWeekNumber}`)
+    fetch(quizApiUrl)
         .then(response => {
             if (!response.ok) {
                  return response.json().then(err => { throw new Error(err.error || `HTTP error! status: ${response.status}`) });
@@ -99,7 +99,7 @@ document.addEventListener('DOMContentLoaded', () => {
         fetch('/api/submit', {
             method: 'POST',
             headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify({ week_number: currentWeekNumber, answers: answers }),
+            body: JSON.stringify({ course: currentCourseSlug, week_number: currentWeekNumber, answers: answers }),
         })
         .then(response => {
              if (!response.ok) {
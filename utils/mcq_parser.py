@@ -1,22 +1,57 @@
-import fitz # PyMuPDF
 import re
 import json
 import os
 
-def parse_mcq_pdf(pdf_path):
+PLACEHOLDER_PREFIX = "Placeholder: Generation failed/incomplete"
+CORRECT_MARKER_RE = re.compile(r'\s*\(Correct\)$', re.IGNORECASE)
+QUESTION_RE = re.compile(r'^(\d+)\.\s*(.*)')
+OPTION_RE = re.compile(r'^([A-D])\.\s*(.*)', re.IGNORECASE)
+PARSER_MODES = ('layout', 'text')
+INDENT_TOLERANCE = 2.0 # Points; options are drawn 20pt right of the question (leftIndent in nlp.save_mcqs_to_pdf)
+BOLD_FLAG = 16 # TEXT_FONT_BOLD in PyMuPDF span flags
+
+def _is_valid_mcq(mcq, pdf_path):
+    """Shared checks for both parsers; prints why a question is skipped."""
+    label = mcq.get('question_number', 'N/A')
+    if mcq['question'].startswith(PLACEHOLDER_PREFIX):
+        return False
+    if len(mcq['options']) != 4:
+        print(f"Warning: Question {label} in {pdf_path} does not have exactly 4 options. Skipping.")
+        return False
+    if mcq['correct_answer_text'] is None:
+        print(f"Warning: Question {label} in {pdf_path} does not have a '(Correct)' marker. Skipping.")
+        return False
+    if mcq['correct_answer_text'] not in mcq['options']:
+        print(f"Warning: Correct answer text for Q {label} not found in options list. Skipping.")
+        return False
+    return True
+
+def parse_mcq_pdf(pdf_path, mode='layout'):
     """
     Parses an MCQ PDF to extract questions, options, and the correct answer.
     Skips questions that start with "Placeholder: Generation failed/incomplete".
+
+    Args:
+        pdf_path (str): Path to a week_N_mcqs.pdf written by nlp.save_mcqs_to_pdf.
+        mode (str): 'layout' (span positions and fonts, keeps wrapped lines) or
+            'text' (regexes over the flattened page text; the original parser).
     """
+    if mode not in PARSER_MODES:
+        raise ValueError(f"Unknown MCQ parser mode '{mode}' (expected one of {PARSER_MODES})")
     if not os.path.exists(pdf_path):
         print(f"Error: MCQ PDF not found at '{pdf_path}'")
         return []
+    if mode == 'layout':
+        return parse_mcq_pdf_layout(pdf_path)
+    return parse_mcq_pdf_text(pdf_path)
 
+def parse_mcq_pdf_text(pdf_path):
+    """Original parser: regexes over page.get_text("text"). Lines that wrap are dropped."""
     mcqs = []
     current_mcq = None
     current_options = []
-    placeholder_prefix = "Placeholder: Generation failed/incomplete"
 
+    import fitz # PyMuPDF, imported lazily so importing this module stays cheap
     try:
         doc = fitz.open(pdf_path)
         full_text = ""
@@ -31,26 +66,11 @@ def parse_mcq_pdf(pdf_path):
             if not line:
                 continue
 
-            q_match = re.match(r'^(\d+)\.\s*(.*)', line)
+            q_match = QUESTION_RE.match(line)
             if q_match:
                 if current_mcq:
                     current_mcq['options'] = current_options
-                    is_placeholder = current_mcq['question'].startswith(placeholder_prefix)
-                    is_valid = True
-                    if is_placeholder:
-                         #print(f"Skipping placeholder question: {current_mcq.get('question_number','N/A')}")
-                         is_valid = False
-                    elif len(current_mcq['options']) != 4:
-                         print(f"Warning: Question {current_mcq.get('question_number','N/A')} in {pdf_path} does not have exactly 4 options. Skipping.")
-                         is_valid = False
-                    elif current_mcq['correct_answer_text'] is None:
-                         print(f"Warning: Question {current_mcq.get('question_number','N/A')} in {pdf_path} does not have a '(Correct)' marker. Skipping.")
-                         is_valid = False
-                    elif current_mcq['correct_answer_text'] not in current_mcq['options']:
-                         print(f"Warning: Correct answer text for Q {current_mcq.get('question_number','N/A')} not found in options list. Skipping.")
-                         is_valid = False
-
-                    if is_valid:
+                    if _is_valid_mcq(current_mcq, pdf_path):
                          mcqs.append(current_mcq)
 
                 q_num = int(q_match.group(1))
@@ -60,13 +80,12 @@ def parse_mcq_pdf(pdf_path):
                 continue
 
             if current_mcq:
-                opt_match = re.match(r'^([A-D])\.\s*(.*)', line, re.IGNORECASE)
+                opt_match = OPTION_RE.match(line)
                 if opt_match:
-                    letter = opt_match.group(1).upper()
                     text = opt_match.group(2).strip()
 
                     if text.endswith("(Correct)"):
-                        processed_text = re.sub(r'\s*\(Correct\)$', '', text, flags=re.IGNORECASE).strip()
+                        processed_text = CORRECT_MARKER_RE.sub('', text).strip()
                         if current_mcq['correct_answer_text'] is None:
                              current_mcq['correct_answer_text'] = processed_text
                         current_options.append(processed_text)
@@ -75,22 +94,7 @@ def parse_mcq_pdf(pdf_path):
 
         if current_mcq:
             current_mcq['options'] = current_options
-            is_placeholder = current_mcq['question'].startswith(placeholder_prefix)
-            is_valid = True
-            if is_placeholder:
-                 #print(f"Skipping placeholder question: {current_mcq.get('question_number','N/A')}")
-                 is_valid = False
-            elif len(current_mcq['options']) != 4:
-                 print(f"Warning: Final Question {current_mcq.get('question_number','N/A')} in {pdf_path} does not have exactly 4 options. Skipping.")
-                 is_valid = False
-            elif current_mcq['correct_answer_text'] is None:
-                 print(f"Warning: Final Question {current_mcq.get('question_number','N/A')} in {pdf_path} does not have a '(Correct)' marker. Skipping.")
-                 is_valid = False
-            elif current_mcq['correct_answer_text'] not in current_mcq['options']:
-                 print(f"Warning: Final correct answer text for Q {current_mcq.get('question_number','N/A')} not found in options list. Skipping.")
-                 is_valid = False
-
-            if is_valid:
+            if _is_valid_mcq(current_mcq, pdf_path):
                  mcqs.append(current_mcq)
 
     except Exception as e:
@@ -101,3 +105,78 @@ def parse_mcq_pdf(pdf_path):
 
     print(f"Parsed {len(mcqs)} valid (non-placeholder) MCQs from {pdf_path}")
     return mcqs
+
+# --- Layout-aware parsing ---
+def _page_lines(page, text_flags):
+    """Yields (x0, text, bold) per text line of a page, in drawing order."""
+    for block in page.get_text("dict", flags=text_flags)["blocks"]:
+        for line in block.get("lines", ()):
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            if not spans:
+                continue
+            text = "".join(s["text"] for s in spans).strip()
+            bold = all(s["flags"] & BOLD_FLAG or "Bold" in s["font"] for s in spans)
+            yield line["bbox"][0], text, bold
+
+def _finish_layout_mcq(mcq, options, pdf_path):
+    """Turns collected option parts into option texts and picks the correct one."""
+    mcq['options'] = []
+    for parts, bold in options:
+        text = " ".join(parts)
+        marked = bool(CORRECT_MARKER_RE.search(text))
+        text = CORRECT_MARKER_RE.sub('', text).strip()
+        # Bold is how the PDF renders the answer; the text marker is the fallback for other generators
+        if (bold or marked) and mcq['correct_answer_text'] is None:
+            mcq['correct_answer_text'] = text
+        mcq['options'].append(text)
+    mcq['question'] = " ".join(mcq['question'])
+    return mcq if _is_valid_mcq(mcq, pdf_path) else None
+
+def parse_mcq_pdf_layout(pdf_path):
+    """
+    Layout-aware parser: one get_text("dict") pass per page (images excluded). A numbered
+    line at the question indent starts a question, a lettered line indented further starts an
+    option, and any other line continues whatever came before it, so wrapped questions and
+    options are kept whole. The correct option is the one drawn in bold.
+    """
+    mcqs = []
+    current_mcq = None
+    options = [] # [parts, bold] per option
+    question_x = None # Indent of the first question line; numbered lines elsewhere are continuations
+
+    import fitz # PyMuPDF, imported lazily so importing this module stays cheap
+    text_flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    try:
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                for x0, text, bold in _page_lines(page, text_flags):
+                    q_match = QUESTION_RE.match(text)
+                    if q_match and (question_x is None or abs(x0 - question_x) <= INDENT_TOLERANCE):
+                        if current_mcq and _finish_layout_mcq(current_mcq, options, pdf_path):
+                            mcqs.append(current_mcq)
+                        question_x = x0
+                        current_mcq = {"question_number": int(q_match.group(1)), "question": [q_match.group(2).strip()],
+                                       "options": [], "correct_answer_text": None}
+                        options = []
+                        continue
+                    if current_mcq is None:
+                        continue # Title and anything else before the first question
+
+                    opt_match = OPTION_RE.match(text)
+                    if opt_match and x0 > question_x + INDENT_TOLERANCE:
+                        options.append([[opt_match.group(2).strip()], bold])
+                    elif options:
+                        options[-1][0].append(text)
+                        options[-1][1] = options[-1][1] and bold
+                    else:
+                        current_mcq['question'].append(text)
+
+            if current_mcq and _finish_layout_mcq(current_mcq, options, pdf_path):
+                mcqs.append(current_mcq)
+
+    except Exception as e:
+        print(f"Error parsing MCQ PDF {pdf_path}: {e}")
+        return []
+
+    print(f"Parsed {len(mcqs)} valid (non-placeholder) MCQs from {pdf_path}")
+    return mcqs